@@ -14,7 +14,7 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from app.models.base import Base
 from app.models.user import User, InviteToken
 from app.models.alumni import AlumniProfile
-from app.models.chat import ChatMessage
+from app.models.chat import ChatMessage, ChatMessageKey, ChatOutbox, ChatRoom, ChatRoomMember, rebuild_sqlite_search
 from app.models.event import Event
 from app.models.notice import Notice
 
@@ -31,6 +31,19 @@ if config.config_file_name is not None:
 # for 'autogenerate' support
 target_metadata = Base.metadata
 
+
+
+def include_object(object, name, type_, reflected, compare_to):
+    """Leave out chat_messages' partitions and full-text search objects, which are
+    managed by hand-written DDL rather than the models"""
+    if type_ == "table" and reflected and compare_to is None and name.startswith("chat_messages_"):
+        return False
+    if type_ == "column" and name == "text_search":
+        return False
+    if type_ == "index" and name == "ix_chat_messages_text_search":
+        return False
+    return True
+
 # other values from the config, defined by the needs of env.py,
 # can be acquired:
 # my_important_option = config.get_main_option("my_important_option")
@@ -54,6 +67,7 @@ def run_migrations_offline() -> None:
         url=url,
         target_metadata=target_metadata,
         literal_binds=True,
+        include_object=include_object,
         dialect_opts={"paramstyle": "named"},
     )
 
@@ -76,11 +90,14 @@ def run_migrations_online() -> None:
 
     with connectable.connect() as connection:
         context.configure(
-            connection=connection, target_metadata=target_metadata
+            connection=connection, target_metadata=target_metadata, include_object=include_object
         )
 
         with context.begin_transaction():
             context.run_migrations()
+            # Batch migrations copy chat_messages, renumbering the rowids the SQLite
+            # full-text index is keyed on; re-sync it after every run (see rebuild_sqlite_search)
+            rebuild_sqlite_search(connection)
 
 
 if context.is_offline_mode():
@@ -0,0 +1,37 @@
+"""add chat message idempotency keys
+
+Revision ID: add_chat_message_keys
+Revises: add_chat_message_search
+Create Date: 2026-10-19 15:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_chat_message_keys'
+down_revision: Union[str, None] = 'add_chat_message_search'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('chat_message_keys',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('sender_id', sa.String(length=36), nullable=False),
+    sa.Column('client_id', sa.String(length=64), nullable=False),
+    sa.Column('message_id', sa.String(length=36), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['sender_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('sender_id', 'client_id')
+    )
+    op.create_index(op.f('ix_chat_message_keys_created_at'), 'chat_message_keys', ['created_at'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_chat_message_keys_created_at'), table_name='chat_message_keys')
+    op.drop_table('chat_message_keys')
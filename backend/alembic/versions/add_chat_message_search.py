@@ -0,0 +1,61 @@
+"""add chat message full-text search
+
+Revision ID: add_chat_message_search
+Revises: add_chat_outbox
+Create Date: 2026-10-19 14:00:00.000000
+
+PostgreSQL: a generated tsvector column with a GIN index (created on the partitioned
+parent, so every partition gets it). SQLite: an external-content FTS5 table kept in
+sync by triggers, rebuilt from the existing rows.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_chat_message_search'
+down_revision: Union[str, None] = 'add_chat_outbox'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute(
+            "ALTER TABLE chat_messages ADD COLUMN text_search tsvector "
+            "GENERATED ALWAYS AS (to_tsvector('english', text)) STORED"
+        )
+        op.execute("CREATE INDEX ix_chat_messages_text_search ON chat_messages USING gin (text_search)")
+    elif dialect == 'sqlite':
+        op.execute(
+            "CREATE VIRTUAL TABLE chat_messages_fts USING fts5("
+            "text, content='chat_messages', tokenize='porter unicode61')"
+        )
+        op.execute(
+            "CREATE TRIGGER chat_messages_fts_insert AFTER INSERT ON chat_messages BEGIN "
+            "INSERT INTO chat_messages_fts (rowid, text) VALUES (new.rowid, new.text); END"
+        )
+        op.execute(
+            "CREATE TRIGGER chat_messages_fts_delete AFTER DELETE ON chat_messages BEGIN "
+            "INSERT INTO chat_messages_fts (chat_messages_fts, rowid, text) VALUES ('delete', old.rowid, old.text); END"
+        )
+        op.execute(
+            "CREATE TRIGGER chat_messages_fts_update AFTER UPDATE OF text ON chat_messages BEGIN "
+            "INSERT INTO chat_messages_fts (chat_messages_fts, rowid, text) VALUES ('delete', old.rowid, old.text); "
+            "INSERT INTO chat_messages_fts (rowid, text) VALUES (new.rowid, new.text); END"
+        )
+        op.execute("INSERT INTO chat_messages_fts (chat_messages_fts) VALUES ('rebuild')")
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute("DROP INDEX ix_chat_messages_text_search")
+        op.execute("ALTER TABLE chat_messages DROP COLUMN text_search")
+    elif dialect == 'sqlite':
+        op.execute("DROP TRIGGER chat_messages_fts_update")
+        op.execute("DROP TRIGGER chat_messages_fts_delete")
+        op.execute("DROP TRIGGER chat_messages_fts_insert")
+        op.execute("DROP TABLE chat_messages_fts")
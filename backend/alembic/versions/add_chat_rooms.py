@@ -0,0 +1,60 @@
+"""add chat rooms
+
+Revision ID: add_chat_rooms
+Revises: add_poster_path
+Create Date: 2026-10-19 10:00:00.000000
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_chat_rooms'
+down_revision: Union[str, None] = 'add_poster_path'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('chat_rooms',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('name', sa.String(length=150), nullable=False),
+    sa.Column('kind', sa.String(length=20), nullable=False),
+    sa.Column('cohort', sa.String(length=100), nullable=True),
+    sa.Column('created_by_id', sa.String(length=36), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['created_by_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('cohort')
+    )
+    op.create_table('chat_room_members',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('room_id', sa.String(length=36), nullable=False),
+    sa.Column('user_id', sa.String(length=36), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['room_id'], ['chat_rooms.id'], ),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('room_id', 'user_id')
+    )
+    op.create_index(op.f('ix_chat_room_members_room_id'), 'chat_room_members', ['room_id'], unique=False)
+    op.create_index(op.f('ix_chat_room_members_user_id'), 'chat_room_members', ['user_id'], unique=False)
+    # Batch mode so the foreign key can be added on SQLite as well
+    with op.batch_alter_table('chat_messages') as batch_op:
+        batch_op.add_column(sa.Column('room_id', sa.String(length=36), nullable=True))
+        batch_op.create_foreign_key('fk_chat_messages_room_id', 'chat_rooms', ['room_id'], ['id'])
+        batch_op.create_index('ix_chat_messages_room_id_created_at', ['room_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    with op.batch_alter_table('chat_messages') as batch_op:
+        batch_op.drop_index('ix_chat_messages_room_id_created_at')
+        batch_op.drop_constraint('fk_chat_messages_room_id', type_='foreignkey')
+        batch_op.drop_column('room_id')
+    op.drop_index(op.f('ix_chat_room_members_user_id'), table_name='chat_room_members')
+    op.drop_index(op.f('ix_chat_room_members_room_id'), table_name='chat_room_members')
+    op.drop_table('chat_room_members')
+    op.drop_table('chat_rooms')
@@ -0,0 +1,35 @@
+"""index events.poster_path for the upload collector
+
+Revision ID: add_event_poster_path_index
+Revises: add_hot_path_indexes
+Create Date: 2026-10-19 18:00:00.000000
+
+``app.services.upload_gc`` looks up batches of 500 poster paths with ``IN``; without an
+index each batch scans ``events``. Built concurrently on PostgreSQL.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_event_poster_path_index'
+down_revision: Union[str, None] = 'add_hot_path_indexes'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        op.create_index('ix_events_poster_path', 'events', ['poster_path'], unique=False)
+        return
+    with op.get_context().autocommit_block():
+        op.create_index('ix_events_poster_path', 'events', ['poster_path'], unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    if op.get_bind().dialect.name != 'postgresql':
+        op.drop_index('ix_events_poster_path', table_name='events')
+        return
+    with op.get_context().autocommit_block():
+        op.drop_index('ix_events_poster_path', table_name='events', postgresql_concurrently=True)
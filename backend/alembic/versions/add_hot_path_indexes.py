@@ -0,0 +1,84 @@
+"""add indexes for hot listing, report and delete predicates
+
+Revision ID: add_hot_path_indexes
+Revises: add_chat_message_keys
+Create Date: 2026-10-19 16:00:00.000000
+
+On PostgreSQL every index is built with ``CREATE INDEX CONCURRENTLY`` outside the
+migration transaction, so writes are not blocked while it builds. A partitioned table
+cannot be indexed concurrently, so for ``chat_messages`` the index is created on the
+parent only (``ON ONLY``, invalid until complete), built concurrently on each partition
+and attached; partitions created later inherit it. If a concurrent build fails it leaves
+an invalid index behind: drop it before running the upgrade again.
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'add_hot_path_indexes'
+down_revision: Union[str, None] = 'add_chat_message_keys'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# (index name, table, columns)
+INDEXES = [
+    ('ix_chat_messages_created_at', 'chat_messages', ['created_at']),
+    ('ix_chat_messages_sender_id_created_at', 'chat_messages', ['sender_id', 'created_at']),
+    ('ix_events_date', 'events', ['date']),
+    ('ix_notices_created_at', 'notices', ['created_at']),
+    ('ix_users_role_first_name', 'users', ['role', 'first_name']),
+    ('ix_users_active', 'users', ['active']),
+    ('ix_users_created_at', 'users', ['created_at']),
+    ('ix_alumni_profiles_cohort', 'alumni_profiles', ['cohort']),
+]
+
+
+def _partitions(bind, table: str) -> list[str] | None:
+    """Partition names of a partitioned PostgreSQL table, or None for a plain table"""
+    kind = bind.execute(sa.text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:t)"), {'t': table}).scalar()
+    if kind != 'p':
+        return None
+    return list(bind.execute(sa.text(
+        "SELECT c.relname FROM pg_inherits i JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:t) ORDER BY c.relname"
+    ), {'t': table}).scalars())
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        for name, table, columns in INDEXES:
+            op.create_index(name, table, columns, unique=False)
+        return
+
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            column_list = ', '.join(columns)
+            partitions = _partitions(bind, table)
+            if partitions is None:
+                op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+                continue
+            op.execute(f"CREATE INDEX {name} ON ONLY {table} ({column_list})")
+            for partition in partitions:
+                partition_index = f"{partition}_{'_'.join(columns)}_idx"
+                op.execute(f"CREATE INDEX CONCURRENTLY {partition_index} ON {partition} ({column_list})")
+                op.execute(f"ALTER INDEX {name} ATTACH PARTITION {partition_index}")
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table)
+        return
+
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            if _partitions(bind, table) is None:
+                op.drop_index(name, table_name=table, postgresql_concurrently=True)
+            else:
+                # Dropping the parent's index drops the attached partition indexes
+                op.drop_index(name, table_name=table)
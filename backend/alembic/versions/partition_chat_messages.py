@@ -0,0 +1,105 @@
+"""partition chat messages by month (PostgreSQL only)
+
+Revision ID: partition_chat_messages
+Revises: add_chat_rooms
+Create Date: 2026-10-19 12:00:00.000000
+
+Rebuilds ``chat_messages`` as a table range-partitioned on ``created_at`` with one
+partition per month (``chat_messages_pYYYYMM``) and a default partition, so retention
+can archive and drop whole months (see ``app.services.chat_retention``). The partition
+key has to be part of the primary key, which becomes ``(id, created_at)``; ids stay
+unique UUIDs. Other databases are left unchanged and use batched deletes instead.
+"""
+from datetime import datetime, timedelta, timezone
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'partition_chat_messages'
+down_revision: Union[str, None] = 'add_chat_rooms'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+MONTHS_AHEAD = 2
+
+
+def _month_start(value: datetime) -> datetime:
+    return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(value: datetime) -> datetime:
+    return _month_start(_month_start(value) + timedelta(days=32))
+
+
+def upgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    op.execute("ALTER TABLE chat_messages RENAME TO chat_messages_legacy")
+    op.execute("ALTER TABLE chat_messages_legacy RENAME CONSTRAINT chat_messages_pkey TO chat_messages_legacy_pkey")
+    op.execute("DROP INDEX ix_chat_messages_room_id_created_at")
+    op.execute("""
+        CREATE TABLE chat_messages (
+            id VARCHAR(36) NOT NULL,
+            room_id VARCHAR(36) REFERENCES chat_rooms (id),
+            sender_id VARCHAR(36) NOT NULL REFERENCES users (id),
+            sender_name VARCHAR(150) NOT NULL,
+            text TEXT NOT NULL,
+            created_at TIMESTAMP WITH TIME ZONE NOT NULL,
+            CONSTRAINT chat_messages_pkey PRIMARY KEY (id, created_at)
+        ) PARTITION BY RANGE (created_at)
+    """)
+    op.execute("CREATE TABLE chat_messages_default PARTITION OF chat_messages DEFAULT")
+
+    oldest = bind.execute(sa.text("SELECT min(created_at) FROM chat_messages_legacy")).scalar()
+    now = datetime.now(timezone.utc)
+    start = _month_start((oldest or now).astimezone(timezone.utc))
+    last = _month_start(now)
+    for _ in range(MONTHS_AHEAD):
+        last = _next_month(last)
+    while start <= last:
+        end = _next_month(start)
+        op.execute(
+            f"CREATE TABLE chat_messages_p{start:%Y%m} PARTITION OF chat_messages "
+            f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+        )
+        start = end
+
+    op.execute(
+        "INSERT INTO chat_messages (id, room_id, sender_id, sender_name, text, created_at) "
+        "SELECT id, room_id, sender_id, sender_name, text, created_at FROM chat_messages_legacy"
+    )
+    op.execute("DROP TABLE chat_messages_legacy")
+    op.create_index('ix_chat_messages_room_id_created_at', 'chat_messages', ['room_id', 'created_at'], unique=False)
+
+
+def downgrade() -> None:
+    bind = op.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return
+
+    op.execute("ALTER TABLE chat_messages RENAME TO chat_messages_partitioned")
+    op.execute("ALTER TABLE chat_messages_partitioned RENAME CONSTRAINT chat_messages_pkey TO chat_messages_partitioned_pkey")
+    op.execute("DROP INDEX ix_chat_messages_room_id_created_at")
+    op.create_table('chat_messages',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('room_id', sa.String(length=36), nullable=True),
+    sa.Column('sender_id', sa.String(length=36), nullable=False),
+    sa.Column('sender_name', sa.String(length=150), nullable=False),
+    sa.Column('text', sa.Text(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), nullable=False),
+    sa.ForeignKeyConstraint(['room_id'], ['chat_rooms.id'], name='fk_chat_messages_room_id'),
+    sa.ForeignKeyConstraint(['sender_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.execute(
+        "INSERT INTO chat_messages (id, room_id, sender_id, sender_name, text, created_at) "
+        "SELECT id, room_id, sender_id, sender_name, text, created_at FROM chat_messages_partitioned"
+    )
+    # Dropping the parent drops every partition with it
+    op.execute("DROP TABLE chat_messages_partitioned")
+    op.create_index('ix_chat_messages_room_id_created_at', 'chat_messages', ['room_id', 'created_at'], unique=False)
@@ -0,0 +1,102 @@
+"""Maintenance commands.
+
+Run from the backend directory, e.g. ``python -m app.cli gc-uploads --dry-run``.
+"""
+import argparse
+import json
+import sys
+
+from .core import logs
+from .core.config import get_settings
+from .core.database import SessionLocal
+
+
+def gc_uploads(args: argparse.Namespace) -> int:
+  from .services.upload_gc import collect_orphaned_uploads
+
+  db = SessionLocal()
+  try:
+    report = collect_orphaned_uploads(
+      db,
+      grace_seconds=int(args.grace_hours * 3600),
+      dry_run=args.dry_run,
+    )
+  finally:
+    db.close()
+  print(json.dumps(report, indent=2))
+  return 0
+
+
+def chat_retention(args: argparse.Namespace) -> int:
+  from .services.chat_retention import apply_retention
+
+  db = SessionLocal()
+  try:
+    report = apply_retention(db, retention_days=args.days, batch_size=args.batch_size)
+  finally:
+    db.close()
+  print(json.dumps(report, indent=2))
+  return 0
+
+
+def rebuild_search(args: argparse.Namespace) -> int:
+  from .core.database import engine
+  from .models.chat import rebuild_sqlite_search
+
+  with engine.begin() as conn:
+    rebuilt = rebuild_sqlite_search(conn)
+  print(json.dumps({"rebuilt": rebuilt}, indent=2))
+  return 0
+
+
+def create_admin(args: argparse.Namespace) -> int:
+  from .services.admin_bootstrap import ensure_default_admin
+
+  created = ensure_default_admin(email=args.email, password=args.password)
+  print(json.dumps({"created": created}, indent=2))
+  return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+  settings = get_settings()
+  parser = argparse.ArgumentParser(prog="python -m app.cli", description=settings.project_name)
+  commands = parser.add_subparsers(dest="command", required=True)
+
+  gc = commands.add_parser("gc-uploads", help="Delete poster uploads no event refers to")
+  gc.add_argument("--grace-hours", type=float, default=settings.upload_gc_grace_hours,
+                  help="Only delete orphans older than this (default: %(default)s)")
+  gc.add_argument("--dry-run", action="store_true", help="Report reclaimable bytes without deleting")
+  gc.set_defaults(func=gc_uploads)
+
+  retention = commands.add_parser(
+    "chat-retention", help="Archive and delete expired chat messages; creates upcoming Postgres partitions"
+  )
+  retention.add_argument("--days", type=int, default=settings.chat_retention_days,
+                         help="Retention period in days, 0 keeps everything (default: %(default)s)")
+  retention.add_argument("--batch-size", type=int, default=settings.chat_delete_batch_size,
+                         help="Rows archived and deleted per transaction (default: %(default)s)")
+  retention.set_defaults(func=chat_retention)
+
+  search = commands.add_parser(
+    "rebuild-search", help="SQLite: re-sync the chat full-text index with chat_messages (run after VACUUM)"
+  )
+  search.set_defaults(func=rebuild_search)
+
+  admin = commands.add_parser("create-admin", help="Create the first admin account; does nothing if an admin exists")
+  admin.add_argument("--email", default=settings.default_admin_email,
+                     help="Admin email (default: %(default)s)")
+  admin.add_argument("--password", default=settings.default_admin_password,
+                     help="Admin password (default: DEFAULT_ADMIN_PASSWORD)")
+  admin.set_defaults(func=create_admin)
+
+  return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+  args = build_parser().parse_args(argv)
+  logs.setup_logging()
+  return args.func(args)
+
+
+if __name__ == "__main__":
+  sys.exit(main())
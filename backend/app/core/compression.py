@@ -0,0 +1,160 @@
+"""Response compression.
+
+Complete response bodies of at least ``COMPRESSION_MIN_BYTES`` with a text or JSON
+content type are compressed with the best encoding the client accepts: zstd and Brotli
+when the ``zstandard``/``brotli`` packages are installed, otherwise gzip. Streamed
+responses (uploaded files) and responses that already have a ``Content-Encoding`` pass
+through. Socket.IO never reaches this middleware: ``socketio.ASGIApp`` answers
+``/socket.io/`` before the FastAPI app.
+
+Bodies over ``OFFLOAD_BYTES`` are compressed in a worker thread (zlib, brotli and zstd
+release the GIL), so a large listing does not stall the event loop. Compressed GET bodies
+are kept in an LRU of ``COMPRESSION_CACHE_BYTES`` keyed by a digest of the body and the
+encoding, so a listing served unchanged to many clients (events, notices, chat history)
+is compressed once.
+"""
+import gzip
+import hashlib
+from collections import OrderedDict
+
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+from .config import get_settings
+
+try:
+  import brotli
+except ImportError:  # optional
+  brotli = None
+
+try:
+  import zstandard
+except ImportError:  # optional
+  zstandard = None
+
+settings = get_settings()
+
+COMPRESSIBLE_TYPES = ("application/json", "text/", "application/javascript", "application/xml", "image/svg+xml")
+OFFLOAD_BYTES = 64 * 1024
+GZIP_LEVEL = 6
+BROTLI_QUALITY = 5  # higher levels cost far more CPU than they save on dynamic responses
+ZSTD_LEVEL = 3
+
+_ENCODERS = {"gzip": lambda body: gzip.compress(body, GZIP_LEVEL, mtime=0)}
+if brotli is not None:
+  _ENCODERS["br"] = lambda body: brotli.compress(body, quality=BROTLI_QUALITY)
+if zstandard is not None:
+  _ENCODERS["zstd"] = lambda body: zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress(body)
+# Server preference among the encodings a client accepts
+PREFERENCE = [encoding for encoding in ("zstd", "br", "gzip") if encoding in _ENCODERS]
+
+
+class _Cache:
+  """LRU of compressed bodies bounded by their total size"""
+
+  def __init__(self, max_bytes: int):
+    self.max_bytes = max_bytes
+    self.size = 0
+    self._entries: OrderedDict[tuple[str, bytes], bytes] = OrderedDict()
+
+  def get(self, key: tuple[str, bytes]) -> bytes | None:
+    value = self._entries.get(key)
+    if value is not None:
+      self._entries.move_to_end(key)
+    return value
+
+  def put(self, key: tuple[str, bytes], value: bytes):
+    if len(value) > self.max_bytes or key in self._entries:
+      return
+    self._entries[key] = value
+    self.size += len(value)
+    while self.size > self.max_bytes:
+      _, evicted = self._entries.popitem(last=False)
+      self.size -= len(evicted)
+
+
+_cache = _Cache(settings.compression_cache_bytes)
+
+
+def negotiate(accept_encoding: str) -> str | None:
+  """The preferred available encoding the Accept-Encoding header allows, if any"""
+  accepted = {}
+  for part in accept_encoding.split(","):
+    name, _, params = part.strip().partition(";")
+    quality = 1.0
+    params = params.strip()
+    if params.startswith("q="):
+      try:
+        quality = float(params[2:])
+      except ValueError:
+        quality = 0.0
+    accepted[name.strip().lower()] = quality
+  for encoding in PREFERENCE:
+    if accepted.get(encoding, accepted.get("*", 0)) > 0:
+      return encoding
+  return None
+
+
+async def compress(body: bytes, encoding: str, cacheable: bool) -> bytes:
+  key = None
+  if cacheable and _cache.max_bytes > 0:
+    key = (encoding, hashlib.blake2b(body, digest_size=16).digest())
+    cached = _cache.get(key)
+    if cached is not None:
+      return cached
+  encoder = _ENCODERS[encoding]
+  compressed = await run_in_threadpool(encoder, body) if len(body) >= OFFLOAD_BYTES else encoder(body)
+  if key is not None:
+    _cache.put(key, compressed)
+  return compressed
+
+
+class CompressionMiddleware:
+  """Compress complete, compressible responses for clients that accept it"""
+
+  def __init__(self, app):
+    self.app = app
+
+  async def __call__(self, scope, receive, send):
+    if scope["type"] != "http":
+      await self.app(scope, receive, send)
+      return
+    encoding = negotiate(Headers(scope=scope).get("accept-encoding", ""))
+    if encoding is None:
+      await self.app(scope, receive, send)
+      return
+
+    start = None
+    passthrough = False
+
+    async def send_wrapper(message):
+      nonlocal start, passthrough
+      if passthrough:
+        await send(message)
+        return
+      if message["type"] == "http.response.start":
+        start = message
+        return
+      body = message.get("body", b"")
+      start["headers"] = list(start.get("headers", []))
+      headers = MutableHeaders(raw=start["headers"])
+      content_type = headers.get("content-type", "")
+      if (
+        message.get("more_body", False)
+        or "content-encoding" in headers
+        or len(body) < settings.compression_min_bytes
+        or not content_type.startswith(COMPRESSIBLE_TYPES)
+      ):
+        passthrough = True
+        await send(start)
+        await send(message)
+        return
+
+      compressed = await compress(body, encoding, scope["method"] == "GET" and start["status"] == 200)
+      headers["content-encoding"] = encoding
+      headers["content-length"] = str(len(compressed))
+      headers.add_vary_header("Accept-Encoding")
+      await send(start)
+      await send({"type": "http.response.body", "body": compressed})
+
+    await self.app(scope, receive, send_wrapper)
@@ -1,6 +1,9 @@
 from pydantic_settings import BaseSettings
 from pydantic import AnyUrl, EmailStr
 from functools import lru_cache
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parents[2]
 
 
 class Settings(BaseSettings):
@@ -14,7 +17,72 @@ class Settings(BaseSettings):
   default_admin_name: str = "System Admin"
   default_admin_email: EmailStr = "admin@acces.org"
   default_admin_password: str = "admin123"
-  redis_url: str = "redis://localhost:6379/0"
+  # Development conveniences run on every worker boot; turn both off once deployments
+  # run `alembic upgrade head` and `python -m app.cli create-admin`
+  db_create_all_on_startup: bool = True
+  bootstrap_admin_on_startup: bool = True
+  db_pool_size: int = 5  # connections kept per process (PostgreSQL; SQLite uses SQLAlchemy's defaults)
+  db_max_overflow: int = 10  # extra connections opened under load
+  redis_url: str = "redis://localhost:6379/0"  # "memory://" for a single process without Redis
+  chat_cache_size: int = 200  # recent messages kept in Redis; 0 disables the cache
+  chat_cache_ttl_seconds: int = 3600
+  chat_socketio_manager: str = "local"  # "redis" for multi-worker/multi-host Socket.IO delivery
+  chat_socketio_channel: str = "socketio"
+  chat_socketio_websocket_only: bool = False  # refuse long-polling; lets app.server run workers on one port without --sticky
+  chat_wire_format: str = "json"  # "json" or "msgpack" (needs the msgpack package)
+  chat_fanout_window_ms: int = 0  # >0 coalesces pub/sub messages into one batched emit per window
+  chat_fanout_max_batch: int = 100
+  chat_typing_throttle_ms: int = 1000  # a user's repeated typing state is forwarded at most this often
+  chat_ephemeral_window_ms: int = 250  # typing/presence changes are merged per room over this window
+  presence_heartbeat_seconds: int = 15  # instances missing 3 heartbeats are treated as gone
+  chat_rate_limit_per_second: float = 2  # per socket; 0 disables
+  chat_rate_limit_burst: int = 10
+  chat_user_rate_limit_per_second: float = 5  # per user across sockets and workers (Redis); 0 disables
+  chat_user_rate_limit_burst: int = 20
+  chat_outbound_queue_limit: int = 256  # pending packets per socket before it counts as a slow consumer
+  chat_slow_consumer_policy: str = "drop"  # "drop" skips slow sockets on fanout, "disconnect" closes them
+  chat_identity_cache_seconds: int = 60  # user existence + room ids looked up on socket connect
+  chat_dedupe_ttl_seconds: int = 3600  # how long a client message id makes retries no-ops
+  chat_dedupe_prune_interval_minutes: int = 10  # expired client message ids are deleted this often; 0 disables
+  chat_outbox_batch_size: int = 100  # outbox rows relayed to Redis per round trip
+  chat_outbox_poll_ms: int = 500  # relay poll interval when no local write has nudged it
+  chat_retention_days: int = 0  # messages older than this are archived and deleted; 0 keeps everything
+  chat_retention_interval_minutes: int = 0  # 0 disables the in-process job; use the CLI from cron instead
+  chat_partition_interval_minutes: int = 360  # PostgreSQL: create upcoming monthly partitions this often (and at startup)
+  chat_partition_months_ahead: int = 2  # months of partitions kept ahead of the current one
+  chat_archive_dir: str = "archives/chat"
+  chat_delete_batch_size: int = 1000
+  upload_dir: str = "uploads"  # served at /uploads; posters live in its posters/ subdirectory
+  upload_gc_grace_hours: int = 24
+  upload_gc_interval_minutes: int = 0  # 0 disables the in-process collector; use the CLI from cron instead
+  log_level: str = "INFO"
+  log_format: str = "json"  # "json" (one object per line) or "text"
+  log_sample_rate: float = 1.0  # fraction of per-connection/per-message chat INFO records kept
+  socketio_logger: bool = False  # python-socketio's own per-packet logging
+  engineio_logger: bool = False  # engine.io transport logging; very verbose, for debugging only
+  compression_enabled: bool = True  # gzip (zstd/Brotli when installed) for JSON and text responses
+  compression_min_bytes: int = 1024  # smaller bodies are sent as they are
+  compression_cache_bytes: int = 16 * 1024 * 1024  # compressed GET bodies reused for identical content; 0 disables
+  metrics_enabled: bool = False  # Prometheus /metrics and the request/statement instrumentation feeding it
+  metrics_token: str = ""  # when set, /metrics requires "Authorization: Bearer <token>"
+  slow_query_ms: float = 500  # statements at least this slow go to the slow query log; 0 logs nothing
+  slow_query_log_size: int = 100  # entries kept per process
+  slow_query_log_parameters: bool = False  # parameters may hold personal data; also gates plans outside SQLite
+  slow_query_explain: bool = True  # capture the plan of logged statements in a background thread
+  slow_query_explain_analyze: bool = False  # PostgreSQL: EXPLAIN ANALYZE reads (runs them again)
+  profiling_enabled: bool = False  # installs the admin profiling middleware (X-Profile: 1 or ?profile=1)
+  profiling_sample_rate: float = 0  # fraction of all requests profiled automatically
+  profiling_interval_ms: float = 5
+  profiling_dir: str = "profiles"
+  profiling_keep: int = 50  # newest profiles kept in profiling_dir
+  threadpool_size: int = 0  # threads for sync endpoints per process; 0 = the database pool's size + overflow
+  threadpool_auth_limit: int = 4  # concurrent bcrypt logins/registrations per process
+  threadpool_reports_limit: int = 2  # concurrent report requests per process
+  web_host: str = "0.0.0.0"  # `python -m app.server` settings
+  web_port: int = 8000
+  web_workers: int = 1
+  web_drain_seconds: float = 5  # Socket.IO clients are disconnected gradually over this long on shutdown
+  web_graceful_timeout_seconds: int = 30  # then in-flight requests get this long before workers are killed
 
   class Config:
     env_file = ".env"
@@ -26,3 +94,9 @@ class Settings(BaseSettings):
 def get_settings() -> Settings:
   return Settings()
 
+
+def resolve_path(path: str) -> Path:
+  """Relative paths in settings are relative to the backend directory, not the process CWD"""
+  resolved = Path(path)
+  return resolved if resolved.is_absolute() else BACKEND_DIR / resolved
+
@@ -1,25 +1,45 @@
+import os
+
 from sqlalchemy import create_engine
 from sqlalchemy.orm import sessionmaker
 
 from .config import get_settings
+from . import prometheus, threadpool
 from ..models.base import Base
 
 settings = get_settings()
 
-connect_args = {}
+engine_args = {"connect_args": {}}
 if str(settings.database_url).startswith("sqlite"):
-  connect_args = {"check_same_thread": False}
-
-engine = create_engine(str(settings.database_url), future=True, echo=False, connect_args=connect_args)
+  engine_args["connect_args"] = {"check_same_thread": False}
+else:
+  # Sized with THREADPOOL_SIZE: by default every worker thread can hold a connection
+  engine_args.update(pool_size=settings.db_pool_size, max_overflow=settings.db_max_overflow)
+
+engine = create_engine(str(settings.database_url), future=True, echo=False, **engine_args)
+if settings.metrics_enabled:
+  prometheus.instrument_engine(engine)
+# Optional instrumentation is only imported when it is turned on
+if settings.profiling_enabled:
+  from . import profiling
+  profiling.instrument_engine(engine)
+if settings.slow_query_ms > 0:
+  from . import slow_queries
+  slow_queries.instrument_engine(engine)
 
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False, future=True)
 
+if hasattr(os, "register_at_fork"):  # POSIX only
+  # Pooled connections must not be shared with workers forked by app.server
+  os.register_at_fork(after_in_child=lambda: engine.dispose(close=False))
+
 
 def init_db():
   Base.metadata.create_all(bind=engine)
 
 
 def get_db():
+  threadpool.observe_wait()
   db = SessionLocal()
   try:
     yield db
@@ -0,0 +1,169 @@
+"""Structured, non-blocking logging.
+
+``setup_logging`` routes the root logger through a queue: the event loop and threadpool
+workers only append records to an in-memory queue, and a listener thread formats them
+(JSON lines, or ``LOG_FORMAT=text``) and writes them to stderr. Records carry the
+current HTTP ``request_id`` (from ``X-Request-ID`` or generated, and echoed back) and
+Socket.IO ``sid`` from context variables.
+
+Per-connection and per-message chat logs go to the ``app.chat.events`` logger, whose
+INFO/DEBUG records are kept at ``LOG_SAMPLE_RATE``; warnings and errors always are.
+"""
+import atexit
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import re
+import sys
+import uuid
+from datetime import datetime, timezone
+from logging.handlers import QueueHandler, QueueListener
+
+from .config import get_settings
+
+EVENTS_LOGGER = "app.chat.events"
+
+request_id: contextvars.ContextVar[str | None] = contextvars.ContextVar("request_id", default=None)
+sid: contextvars.ContextVar[str | None] = contextvars.ContextVar("sid", default=None)
+
+# Attributes every LogRecord has; anything else was passed with extra= and is logged as a field
+# (uvicorn's color_message duplicates msg)
+_RECORD_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", None, None))) | {"message", "asctime", "color_message"}
+_FIELD_TYPES = (str, int, float, bool, list, tuple, dict)
+_REQUEST_ID = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+_queue_handler: QueueHandler | None = None
+_handlers: tuple[logging.Handler, ...] = ()
+_listener: QueueListener | None = None
+
+
+class ContextFilter(logging.Filter):
+  """Attach the correlation ids of the calling task or thread"""
+
+  def filter(self, record: logging.LogRecord) -> bool:
+    record.request_id = request_id.get()
+    record.sid = sid.get()
+    return True
+
+
+class SampleFilter(logging.Filter):
+  def __init__(self, rate: float):
+    super().__init__()
+    self.rate = rate
+
+  def filter(self, record: logging.LogRecord) -> bool:
+    return record.levelno >= logging.WARNING or self.rate >= 1 or random.random() < self.rate
+
+
+def _fields(record: logging.LogRecord) -> dict:
+  return {
+    key: value for key, value in vars(record).items()
+    if key not in _RECORD_ATTRS and isinstance(value, _FIELD_TYPES) and not key.startswith("_")
+  }
+
+
+class JsonFormatter(logging.Formatter):
+  def format(self, record: logging.LogRecord) -> str:
+    entry = {
+      "ts": datetime.fromtimestamp(record.created, timezone.utc).isoformat(),
+      "level": record.levelname,
+      "logger": record.name,
+      "msg": record.getMessage(),
+      **_fields(record),
+    }
+    if record.exc_info:
+      entry["exc"] = self.formatException(record.exc_info)
+    return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+  def __init__(self):
+    super().__init__("%(asctime)s %(levelname)s %(name)s: %(message)s")
+
+  def format(self, record: logging.LogRecord) -> str:
+    line = super().format(record)
+    fields = _fields(record)
+    if fields:
+      first, newline, rest = line.partition("\n")
+      line = first + " " + " ".join(f"{key}={value}" for key, value in fields.items()) + newline + rest
+    return line
+
+
+class _InProcessQueueHandler(QueueHandler):
+  def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+    # The record never leaves the process, so formatting is left to the listener thread
+    return record
+
+
+def _start_listener():
+  global _listener
+  _listener = QueueListener(_queue_handler.queue, *_handlers, respect_handler_level=True)
+  _listener.start()
+
+
+def _after_fork():
+  # The listener thread does not survive a fork (app.server preloads, then forks workers).
+  # The child gets a new queue too: the inherited one may hold the parent's pending records
+  # and the state of the parent's blocked reader.
+  if _listener is not None:
+    _queue_handler.queue = queue.SimpleQueue()
+    _start_listener()
+
+
+def shutdown():
+  """Write out queued records; called at exit"""
+  global _listener
+  if _listener is not None:
+    _listener.stop()
+    _listener = None
+
+
+def setup_logging():
+  """Configure the root logger once per process"""
+  global _queue_handler, _handlers
+  if _queue_handler is not None:
+    return
+  settings = get_settings()
+  handler = logging.StreamHandler(sys.stderr)
+  handler.setFormatter(TextFormatter() if settings.log_format == "text" else JsonFormatter())
+  _handlers = (handler,)
+
+  _queue_handler = _InProcessQueueHandler(queue.SimpleQueue())
+  _queue_handler.addFilter(ContextFilter())
+  root = logging.getLogger()
+  root.handlers = [_queue_handler]
+  root.setLevel(settings.log_level.upper())
+  logging.getLogger(EVENTS_LOGGER).addFilter(SampleFilter(settings.log_sample_rate))
+
+  _start_listener()
+  atexit.register(shutdown)
+  if hasattr(os, "register_at_fork"):  # POSIX only
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+class RequestIdMiddleware:
+  """Give every HTTP request a correlation id, taken from X-Request-ID when it is sane"""
+
+  def __init__(self, app):
+    self.app = app
+
+  async def __call__(self, scope, receive, send):
+    if scope["type"] != "http":
+      await self.app(scope, receive, send)
+      return
+    incoming = dict(scope["headers"]).get(b"x-request-id", b"").decode("latin-1")
+    value = incoming if _REQUEST_ID.match(incoming) else uuid.uuid4().hex
+
+    async def send_wrapper(message):
+      if message["type"] == "http.response.start":
+        message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", value.encode())]
+      await send(message)
+
+    token = request_id.set(value)
+    try:
+      await self.app(scope, receive, send_wrapper)
+    finally:
+      request_id.reset(token)
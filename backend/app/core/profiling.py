@@ -0,0 +1,228 @@
+"""On-demand request profiling for admins.
+
+Enabled with ``PROFILING_ENABLED``; otherwise the middleware and SQL hooks are not
+installed at all. A request is profiled when an admin sends ``X-Profile: 1`` (or
+``?profile=1``), or at random with probability ``PROFILING_SAMPLE_RATE``. While it runs, a
+sampler thread records the Python stack of every busy thread in the process every
+``PROFILING_INTERVAL_MS`` (sync endpoints run in the threadpool, so the event loop
+thread alone would only show them as awaited), and the SQL the request issues is
+timed. The profile is stored as JSON in ``PROFILING_DIR``; admins get its id in the
+``X-Profile-Id`` response header and read it from ``/api/admin/profiles``. Stacks are in folded format, which speedscope and
+flamegraph.pl render as a flame graph.
+
+Samples come from the whole process, so concurrent requests show up in a profile too;
+profile on a quiet instance when the picture needs to be clean.
+"""
+import contextvars
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from datetime import datetime, timezone
+from pathlib import Path
+
+import anyio.to_thread
+from jose import JWTError
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import get_settings, resolve_path
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# Innermost Python frames of a thread that is waiting rather than working
+IDLE_FRAMES = {("threading.py", "wait"), ("selectors.py", "select"), ("queue.py", "get"), ("thread.py", "_worker")}
+
+_current: contextvars.ContextVar["_Profile | None"] = contextvars.ContextVar("profile", default=None)
+_sampler_threads: set[int] = set()
+
+
+def _folded(frame) -> str | None:
+  """'outer;...;inner' for a thread's stack, or None if the thread is idle"""
+  if (os.path.basename(frame.f_code.co_filename), frame.f_code.co_name) in IDLE_FRAMES:
+    return None
+  names = []
+  while frame is not None:
+    code = frame.f_code
+    names.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+    frame = frame.f_back
+  return ";".join(reversed(names))
+
+
+class _Profile:
+  def __init__(self, interval: float):
+    self.interval = interval
+    self.stacks: Counter[str] = Counter()
+    self.sql: list[dict] = []
+    self._stop = threading.Event()
+    self._thread = threading.Thread(target=self._sample, name="request-profiler", daemon=True)
+
+  def _sample(self):
+    _sampler_threads.add(threading.get_ident())
+    try:
+      while not self._stop.wait(self.interval):
+        for ident, frame in sys._current_frames().items():
+          if ident in _sampler_threads:
+            continue
+          stack = _folded(frame)
+          if stack is not None:
+            self.stacks[stack] += 1
+    finally:
+      _sampler_threads.discard(threading.get_ident())
+
+  def start(self):
+    self._thread.start()
+
+  def stop(self):
+    self._stop.set()
+    self._thread.join()
+
+
+def instrument_engine(engine: Engine):
+  """Record statements issued while a profiled request is running"""
+
+  @event.listens_for(engine, "before_cursor_execute")
+  def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if _current.get() is not None:
+      context._profile_started = time.perf_counter()
+
+  @event.listens_for(engine, "after_cursor_execute")
+  def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current.get()
+    started = getattr(context, "_profile_started", None)
+    if profile is not None and started is not None:
+      profile.sql.append({"statement": statement, "durationMs": round((time.perf_counter() - started) * 1000, 3)})
+
+
+def _directory() -> Path:
+  directory = resolve_path(settings.profiling_dir)
+  directory.mkdir(parents=True, exist_ok=True)
+  return directory
+
+
+def _save(record: dict):
+  directory = _directory()
+  (directory / f"{record['id']}.json").write_text(json.dumps(record))
+  stored = sorted(directory.glob("*.json"), key=lambda path: path.stat().st_mtime, reverse=True)
+  for path in stored[settings.profiling_keep:]:
+    path.unlink(missing_ok=True)
+
+
+def list_profiles() -> list[dict]:
+  """Stored profiles, newest first, without their stacks and SQL"""
+  summaries = []
+  for path in sorted(_directory().glob("*.json"), key=lambda path: path.stat().st_mtime, reverse=True):
+    try:
+      record = json.loads(path.read_text())
+    except (OSError, ValueError):
+      continue
+    summaries.append({key: value for key, value in record.items() if key not in ("folded", "sql")})
+  return summaries
+
+
+def load_profile(profile_id: str) -> dict | None:
+  # Ids are uuid hex; anything else could point outside the directory
+  if len(profile_id) != 32 or not all(c in "0123456789abcdef" for c in profile_id):
+    return None
+  path = _directory() / f"{profile_id}.json"
+  return json.loads(path.read_text()) if path.exists() else None
+
+
+def _role(user_id: str) -> str | None:
+  from ..models.user import User
+  from .database import SessionLocal  # database imports this module
+
+  db = SessionLocal()
+  try:
+    user = db.get(User, user_id)
+    return user.role.value if user is not None else None
+  finally:
+    db.close()
+
+
+async def _is_admin(scope) -> bool:
+  from .security import decode_access_token
+
+  headers = dict(scope["headers"])
+  scheme, _, token = headers.get(b"authorization", b"").decode("latin-1").partition(" ")
+  if scheme.lower() != "bearer" or not token:
+    return False
+  try:
+    user_id = decode_access_token(token).get("sub")
+  except JWTError:
+    return False
+  # Role from the database rather than the token (or a cache), so a demoted admin's token
+  # stops working at once; only requests asking for a profile pay for the lookup
+  return bool(user_id) and await anyio.to_thread.run_sync(_role, user_id) == "admin"
+
+
+def _requested(scope) -> bool:
+  if (b"x-profile", b"1") in scope["headers"]:
+    return True
+  return b"profile=1" in scope.get("query_string", b"").split(b"&")
+
+
+class ProfilingMiddleware:
+  """Profile admin-requested and randomly sampled HTTP requests"""
+
+  def __init__(self, app):
+    self.app = app
+
+  async def __call__(self, scope, receive, send):
+    if scope["type"] != "http":
+      await self.app(scope, receive, send)
+      return
+    on_demand = _requested(scope) and await _is_admin(scope)
+    if not on_demand and not (settings.profiling_sample_rate and random.random() < settings.profiling_sample_rate):
+      await self.app(scope, receive, send)
+      return
+
+    profile_id = uuid.uuid4().hex
+    status = 500
+
+    async def send_wrapper(message):
+      nonlocal status
+      if message["type"] == "http.response.start":
+        status = message["status"]
+        if on_demand:
+          message["headers"] = list(message.get("headers", [])) + [(b"x-profile-id", profile_id.encode())]
+      await send(message)
+
+    profile = _Profile(settings.profiling_interval_ms / 1000)
+    token = _current.set(profile)
+    started_at = datetime.now(timezone.utc)
+    started = time.perf_counter()
+    profile.start()
+    try:
+      await self.app(scope, receive, send_wrapper)
+    finally:
+      duration = time.perf_counter() - started
+      # Joining the sampler can take up to an interval; not on the event loop
+      await anyio.to_thread.run_sync(profile.stop)
+      _current.reset(token)
+      record = {
+        "id": profile_id,
+        "method": scope["method"],
+        "path": scope["path"],
+        "status": status,
+        "trigger": "admin" if on_demand else "sample",
+        "startedAt": started_at.isoformat(),
+        "durationMs": round(duration * 1000, 3),
+        "intervalMs": settings.profiling_interval_ms,
+        "samples": sum(profile.stacks.values()),
+        "sqlCount": len(profile.sql),
+        "sqlMs": round(sum(query["durationMs"] for query in profile.sql), 3),
+        "sql": profile.sql,
+        "folded": "\n".join(f"{stack} {count}" for stack, count in profile.stacks.most_common()),
+      }
+      try:
+        await anyio.to_thread.run_sync(_save, record)
+      except OSError as e:
+        logger.warning("Could not store profile %s: %s", profile_id, e)
@@ -0,0 +1,180 @@
+"""Prometheus metrics served at ``/metrics``.
+
+Everything is updated as it happens (a histogram observation or a counter/gauge step),
+never computed at scrape time, so the same definitions work in a single process and in
+prometheus_client's multiprocess mode, which ``app.server`` turns on for several workers
+by setting ``PROMETHEUS_MULTIPROC_DIR``.
+
+- HTTP: requests and latency per method and route template (not raw path)
+- Database: statements and their duration per operation, errors, pool connections
+- Chat: pub/sub publish and fanout stage latency, emits, Socket.IO connections and rooms
+  on each worker, rate limiting, slow-consumer backpressure and typing/presence updates
+  (``/api/chat/metrics`` summarises the same metrics for one worker)
+- Threadpool: size, waits for a concurrency class slot and for a worker thread
+"""
+import os
+import time
+
+from prometheus_client import (
+  CONTENT_TYPE_LATEST, CollectorRegistry, Counter, Gauge, Histogram, REGISTRY, generate_latest, multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+FAST_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+http_requests = Counter(
+  "http_requests_total", "HTTP requests handled", ["method", "route", "status"]
+)
+http_request_duration = Histogram(
+  "http_request_duration_seconds", "HTTP request latency", ["method", "route"]
+)
+http_requests_in_progress = Gauge(
+  "http_requests_in_progress", "HTTP requests being handled", multiprocess_mode="livesum"
+)
+
+db_statement_duration = Histogram(
+  "db_statement_duration_seconds", "SQL statement execution time", ["operation"], buckets=FAST_BUCKETS
+)
+db_statement_errors = Counter("db_statement_errors_total", "SQL statements that raised", ["operation"])
+db_pool_connections = Gauge(
+  "db_pool_connections", "Pooled database connections", ["state"], multiprocess_mode="livesum"
+)
+
+chat_publish_duration = Histogram(
+  "chat_publish_duration_seconds", "Chat pub/sub publish latency", ["mode"], buckets=FAST_BUCKETS
+)
+socketio_connections = Gauge(
+  "socketio_connections", "Connected Socket.IO clients", multiprocess_mode="livesum"
+)
+socketio_rooms = Gauge(
+  "socketio_rooms", "Chat rooms with a member connected to the worker, summed over workers",
+  multiprocess_mode="livesum",
+)
+chat_pubsub_received = Counter(
+  "chat_pubsub_received_total", "Chat pub/sub messages received by the fanout listener"
+)
+chat_emits = Counter("chat_emits_total", "Chat fanout room emits", ["kind"])  # "single" or "batch"
+chat_fanout_latency = Histogram(
+  "chat_fanout_latency_seconds", "Chat fanout stage latency", ["stage"], buckets=FAST_BUCKETS
+)  # stage: publish_to_receive, receive_to_emit, publish_to_emit
+chat_ephemeral_updates = Counter(
+  "chat_ephemeral_updates_total", "Typing and presence updates", ["outcome"]  # received, throttled, published
+)
+chat_throttled = Counter(
+  "chat_throttled_total", "Chat messages refused by a rate limit", ["scope"]  # "socket" or "user"
+)
+chat_dropped_emits = Counter(
+  "chat_dropped_emits_total", "Chat fanout emits skipped for sockets with a full outbound queue"
+)
+chat_slow_disconnects = Counter(
+  "chat_slow_disconnects_total", "Sockets disconnected for a full outbound queue"
+)
+
+threadpool_size = Gauge(
+  "threadpool_size", "Worker threads for sync endpoints, summed over workers", multiprocess_mode="livesum"
+)
+threadpool_wait = Histogram(
+  "threadpool_wait_seconds", "Time from dispatch until a request got a worker thread", ["class"],
+  buckets=FAST_BUCKETS,
+)
+threadpool_admission_wait = Histogram(
+  "threadpool_admission_wait_seconds", "Time a request waited for a slot in its concurrency class", ["class"],
+  buckets=FAST_BUCKETS,
+)
+threadpool_class_in_use = Gauge(
+  "threadpool_class_in_use", "Requests holding a concurrency class slot", ["class"], multiprocess_mode="livesum"
+)
+
+OPERATIONS = {"SELECT", "INSERT", "UPDATE", "DELETE", "WITH"}
+
+
+def _operation(statement: str) -> str:
+  keyword = statement.lstrip()[:6].upper()
+  return keyword if keyword in OPERATIONS else "OTHER"
+
+
+def instrument_engine(engine: Engine):
+  """Time every statement and track pool checkouts through SQLAlchemy events"""
+
+  @event.listens_for(engine, "before_cursor_execute")
+  def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+
+  @event.listens_for(engine, "after_cursor_execute")
+  def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    started = conn.info["query_started"].pop()
+    db_statement_duration.labels(_operation(statement)).observe(time.perf_counter() - started)
+
+  @event.listens_for(engine, "handle_error")
+  def handle_error(context):
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+      started.pop()
+    db_statement_errors.labels(_operation(context.statement or "")).inc()
+
+  @event.listens_for(engine, "connect")
+  def connect(dbapi_connection, connection_record):
+    db_pool_connections.labels("open").inc()
+
+  @event.listens_for(engine, "close")
+  def close(dbapi_connection, connection_record):
+    db_pool_connections.labels("open").dec()
+
+  @event.listens_for(engine, "close_detached")
+  def close_detached(dbapi_connection):
+    db_pool_connections.labels("open").dec()
+
+  @event.listens_for(engine, "checkout")
+  def checkout(dbapi_connection, connection_record, connection_proxy):
+    db_pool_connections.labels("checked_out").inc()
+
+  @event.listens_for(engine, "checkin")
+  def checkin(dbapi_connection, connection_record):
+    db_pool_connections.labels("checked_out").dec()
+
+
+class PrometheusMiddleware:
+  """Pure ASGI middleware recording request count and latency per route template"""
+
+  def __init__(self, app):
+    self.app = app
+
+  async def __call__(self, scope, receive, send):
+    if scope["type"] != "http":
+      await self.app(scope, receive, send)
+      return
+
+    status = 500
+
+    async def send_wrapper(message):
+      nonlocal status
+      if message["type"] == "http.response.start":
+        status = message["status"]
+      await send(message)
+
+    started = time.perf_counter()
+    http_requests_in_progress.inc()
+    try:
+      await self.app(scope, receive, send_wrapper)
+    finally:
+      http_requests_in_progress.dec()
+      # APIRoute puts itself in the scope when it matches; anything else (404s, static
+      # files) shares one label so raw paths never become label values
+      route = getattr(scope.get("route"), "path", "other")
+      http_request_duration.labels(scope["method"], route).observe(time.perf_counter() - started)
+      http_requests.labels(scope["method"], route, str(status)).inc()
+
+
+def sample(name: str, **labels) -> float:
+  """This process's current value of a sample, e.g. ``sample("chat_emits_total", kind="batch")``"""
+  return REGISTRY.get_sample_value(name, labels) or 0.0
+
+
+def render() -> tuple[bytes, str]:
+  """Exposition of this process's metrics, or every worker's in multiprocess mode"""
+  if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    return generate_latest(registry), CONTENT_TYPE_LATEST
+  return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
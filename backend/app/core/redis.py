@@ -0,0 +1,59 @@
+import redis as sync_redis
+import redis.asyncio as aioredis
+
+from .config import get_settings
+
+settings = get_settings()
+
+# REDIS_URL=memory:// runs chat in a single process without a Redis server
+REDIS_ENABLED = not settings.redis_url.startswith("memory://")
+
+# Shared connections; redis-py clients are pooled and safe to reuse across requests
+redis_client: aioredis.Redis | None = None
+sync_redis_client: sync_redis.Redis | None = None
+pubsub_redis_client: aioredis.Redis | None = None
+
+
+async def get_redis() -> aioredis.Redis:
+  """Get or create the async Redis connection used on the event loop"""
+  global redis_client
+  if redis_client is None:
+    redis_client = await aioredis.from_url(
+      settings.redis_url,
+      encoding="utf-8",
+      decode_responses=True
+    )
+  return redis_client
+
+
+async def get_pubsub_redis() -> aioredis.Redis:
+  """Get or create the connection used for subscribing; returns raw bytes so binary payloads survive"""
+  global pubsub_redis_client
+  if pubsub_redis_client is None:
+    pubsub_redis_client = await aioredis.from_url(settings.redis_url, decode_responses=False)
+  return pubsub_redis_client
+
+
+def get_sync_redis() -> sync_redis.Redis:
+  """Get or create the Redis connection used from sync (threadpool) endpoints"""
+  global sync_redis_client
+  if sync_redis_client is None:
+    sync_redis_client = sync_redis.from_url(
+      settings.redis_url,
+      encoding="utf-8",
+      decode_responses=True
+    )
+  return sync_redis_client
+
+
+async def close_redis():
+  global redis_client, sync_redis_client, pubsub_redis_client
+  if redis_client is not None:
+    await redis_client.close()
+    redis_client = None
+  if pubsub_redis_client is not None:
+    await pubsub_redis_client.close()
+    pubsub_redis_client = None
+  if sync_redis_client is not None:
+    sync_redis_client.close()
+    sync_redis_client = None
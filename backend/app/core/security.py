@@ -53,6 +53,16 @@ def create_access_token(data: dict, expires_delta: timedelta | None = None) -> s
   return encoded_jwt
 
 
+def decode_access_token(token: str) -> dict:
+  """Verified claims of a token from ``create_access_token``; raises JWTError if invalid or expired"""
+  return jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
+
+
+def token_claims(user: User) -> dict:
+  """Claims for a user's access token; name and role let sockets authenticate without a query"""
+  return {"sub": user.id, "name": f"{user.first_name} {user.last_name}", "role": user.role.value}
+
+
 def get_current_user(
   token: Annotated[str, Depends(oauth2_scheme)],
   db: Annotated[Session, Depends(get_db)]
@@ -63,7 +73,7 @@ def get_current_user(
     headers={"WWW-Authenticate": "Bearer"},
   )
   try:
-    payload = jwt.decode(token, settings.jwt_secret_key, algorithms=[settings.jwt_algorithm])
+    payload = decode_access_token(token)
     user_id: str | None = payload.get("sub")
     if user_id is None:
       raise credentials_exception
@@ -0,0 +1,161 @@
+"""Slow query log.
+
+Statements slower than ``SLOW_QUERY_MS`` are kept in a per-process ring buffer of
+``SLOW_QUERY_LOG_SIZE`` entries with their parameters, the request that issued them and
+the database's plan for them, and listed for admins at ``/api/admin/slow-queries``.
+
+The plan is captured off the request path: a single background thread runs ``EXPLAIN``
+(``EXPLAIN QUERY PLAN`` on SQLite) on its own connection, at most once per distinct
+statement per ``EXPLAIN_COOLDOWN_SECONDS``; the last ``PLAN_CACHE_SIZE`` statements'
+plans are remembered. ``SLOW_QUERY_EXPLAIN_ANALYZE`` adds ``ANALYZE, BUFFERS`` on
+PostgreSQL; that executes the statement again, so it is only done for reads.
+
+Parameters can hold personal data or credentials, so they are only kept with
+``SLOW_QUERY_LOG_PARAMETERS=true``. Except on SQLite, whose ``EXPLAIN QUERY PLAN`` shows
+no values, the plans embed the bound values as literals and follow the same setting.
+"""
+import contextvars
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from .config import get_settings
+
+settings = get_settings()
+
+EXPLAIN_COOLDOWN_SECONDS = 60
+PLAN_CACHE_SIZE = 256
+PARAMETER_REPR_LIMIT = 200
+READ_OPERATIONS = ("SELECT", "WITH")
+
+# "GET /api/alumni/search" for the request being handled, set by SlowQueryMiddleware
+current_request: contextvars.ContextVar[str | None] = contextvars.ContextVar("current_request", default=None)
+
+_entries: deque[dict] = deque(maxlen=settings.slow_query_log_size)
+_lock = threading.Lock()
+# statement -> (monotonic time explained, plan), least recently logged first
+_plans: OrderedDict[str, tuple[float, str | None]] = OrderedDict()
+_explainer: ThreadPoolExecutor | None = None
+
+
+def _parameters(parameters):
+  if not settings.slow_query_log_parameters:
+    return None
+  if isinstance(parameters, dict):
+    return {key: repr(value)[:PARAMETER_REPR_LIMIT] for key, value in parameters.items()}
+  if isinstance(parameters, (list, tuple)):
+    return [repr(value)[:PARAMETER_REPR_LIMIT] for value in parameters]
+  return repr(parameters)[:PARAMETER_REPR_LIMIT]
+
+
+def _remember_plan(statement: str, plan: str | None):
+  """Store a plan, evicting the least recently logged statement; call with _lock held"""
+  _plans[statement] = (time.monotonic(), plan)
+  _plans.move_to_end(statement)
+  while len(_plans) > PLAN_CACHE_SIZE:
+    _plans.popitem(last=False)
+
+
+def _explain(engine: Engine, entry: dict, statement: str, parameters):
+  dialect = engine.dialect.name
+  if dialect == "postgresql":
+    analyze = settings.slow_query_explain_analyze and statement.lstrip().upper().startswith(READ_OPERATIONS)
+    prefix = "EXPLAIN (ANALYZE, BUFFERS) " if analyze else "EXPLAIN "
+  elif dialect == "sqlite":
+    prefix = "EXPLAIN QUERY PLAN "
+  else:
+    prefix = "EXPLAIN "
+  try:
+    with engine.connect() as conn:
+      rows = conn.exec_driver_sql(prefix + statement, parameters).fetchall()
+      conn.rollback()
+    if dialect == "sqlite":
+      plan = "\n".join(str(row[-1]) for row in rows)
+    else:
+      plan = "\n".join(str(row[0]) for row in rows)
+  except Exception as e:
+    plan = None
+    entry["planError"] = str(e)
+  with _lock:
+    _remember_plan(statement, plan)
+  entry["plan"] = plan
+
+
+def _record(engine: Engine, statement: str, parameters, executemany: bool, seconds: float):
+  global _explainer
+  entry = {
+    "at": datetime.now(timezone.utc).isoformat(),
+    "durationMs": round(seconds * 1000, 3),
+    "statement": statement,
+    "parameters": _parameters(parameters),
+    "executemany": executemany,
+    "request": current_request.get(),
+    "plan": None,
+  }
+  with _lock:
+    _entries.append(entry)
+    cached = _plans.get(statement)
+    if cached is not None:
+      _plans.move_to_end(statement)
+  if not settings.slow_query_explain or executemany:
+    return
+  if not settings.slow_query_log_parameters and engine.dialect.name != "sqlite":
+    return
+  if cached is not None and time.monotonic() - cached[0] < EXPLAIN_COOLDOWN_SECONDS:
+    entry["plan"] = cached[1]
+    entry["planCached"] = True
+    return
+  with _lock:
+    _remember_plan(statement, None)
+    if _explainer is None:
+      _explainer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="slow-query-explain")
+  _explainer.submit(_explain, engine, entry, statement, parameters)
+
+
+def instrument_engine(engine: Engine):
+  """Time statements and log the ones over the threshold"""
+  threshold = settings.slow_query_ms / 1000
+
+  @event.listens_for(engine, "before_cursor_execute")
+  def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    context._slow_query_started = time.perf_counter()
+
+  @event.listens_for(engine, "after_cursor_execute")
+  def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - context._slow_query_started
+    if elapsed >= threshold and not statement.startswith("EXPLAIN"):
+      _record(engine, statement, parameters, executemany, elapsed)
+
+
+def entries() -> list[dict]:
+  """Logged statements, newest first"""
+  with _lock:
+    return [dict(entry) for entry in reversed(_entries)]
+
+
+def clear():
+  with _lock:
+    _entries.clear()
+    _plans.clear()
+
+
+class SlowQueryMiddleware:
+  """Remember which request is running so slow statements can name it"""
+
+  def __init__(self, app):
+    self.app = app
+
+  async def __call__(self, scope, receive, send):
+    if scope["type"] != "http":
+      await self.app(scope, receive, send)
+      return
+    token = current_request.set(f"{scope['method']} {scope['path']}")
+    try:
+      await self.app(scope, receive, send)
+    finally:
+      current_request.reset(token)
@@ -0,0 +1,112 @@
+"""Threadpool capacity for sync endpoints.
+
+FastAPI runs sync (``def``) endpoints and dependencies, ``get_db`` included, in AnyIO's
+worker threads, 40 at a time by default whatever the database pool allows. Past the pool
+size, extra threads only block in the pool checkout for up to its timeout. ``configure()``
+(lifespan startup) sets the limit to ``THREADPOOL_SIZE``, by default the number of
+connections the engine's pool hands out (its size plus overflow; ``DB_POOL_SIZE`` +
+``DB_MAX_OVERFLOW`` on PostgreSQL), so requests beyond it wait on the event loop instead.
+Background jobs and socket handlers offload through ``anyio.to_thread.run_sync`` and
+share the same limit.
+
+Expensive routes first take a slot in a concurrency class (``Depends(limit("auth"))``):
+bcrypt logins and report queries wait for their class on the event loop, without holding
+a thread, so at most ``THREADPOOL_AUTH_LIMIT`` + ``THREADPOOL_REPORTS_LIMIT`` threads
+are busy with them and a burst of either leaves the rest of the pool to cheap reads.
+
+Both waits are measured per class ("default" for routes without one):
+``threadpool_admission_wait_seconds`` for the class slot and ``threadpool_wait_seconds``
+from dispatch (or admission) until the request's first worker thread, where ``get_db``
+runs.
+"""
+import time
+from contextvars import ContextVar
+
+import anyio
+import anyio.to_thread
+from sqlalchemy.pool import QueuePool
+
+from .config import get_settings
+from . import prometheus
+
+settings = get_settings()
+
+CLASSES = ("auth", "reports")
+UNBOUNDED_POOL_SIZE = 40  # AnyIO's default, for pools without a connection limit
+
+_limiters: dict[str, anyio.CapacityLimiter] = {}
+# (concurrency class, when the request became ready for a worker thread)
+_dispatched: ContextVar[tuple[str, float] | None] = ContextVar("threadpool_dispatched", default=None)
+
+
+def size() -> int:
+  """THREADPOOL_SIZE, else how many connections the engine's pool can have checked out"""
+  if settings.threadpool_size:
+    return settings.threadpool_size
+  from .database import engine  # database imports this module
+
+  pool = engine.pool
+  # QueuePool keeps max_overflow private; -1 means no limit
+  if isinstance(pool, QueuePool) and pool._max_overflow >= 0:
+    return pool.size() + pool._max_overflow
+  return UNBOUNDED_POOL_SIZE
+
+
+def configure():
+  """Apply THREADPOOL_SIZE to this event loop's default thread limiter"""
+  total = size()
+  anyio.to_thread.current_default_thread_limiter().total_tokens = total
+  prometheus.threadpool_size.set(total)
+
+
+def _limiter(name: str) -> anyio.CapacityLimiter:
+  # Created on first use, inside the worker's event loop
+  limiter = _limiters.get(name)
+  if limiter is None:
+    limiter = _limiters[name] = anyio.CapacityLimiter(getattr(settings, f"threadpool_{name}_limit"))
+  return limiter
+
+
+def limit(name: str):
+  """Dependency admitting at most the class's limit of requests into the threadpool at once"""
+  if name not in CLASSES:
+    raise ValueError(f"Unknown concurrency class: {name}")
+
+  async def admit():
+    started = time.perf_counter()
+    async with _limiter(name):
+      admitted = time.perf_counter()
+      prometheus.threadpool_admission_wait.labels(name).observe(admitted - started)
+      prometheus.threadpool_class_in_use.labels(name).inc()
+      _dispatched.set((name, admitted))
+      try:
+        yield
+      finally:
+        prometheus.threadpool_class_in_use.labels(name).dec()
+
+  return admit
+
+
+def observe_wait():
+  """Record how long the request waited for a worker thread; call from its first one"""
+  dispatched = _dispatched.get()
+  if dispatched is not None:
+    name, since = dispatched
+    prometheus.threadpool_wait.labels(name).observe(time.perf_counter() - since)
+
+
+class ThreadpoolWaitMiddleware:
+  """Pure ASGI middleware marking when a request is dispatched to its route"""
+
+  def __init__(self, app):
+    self.app = app
+
+  async def __call__(self, scope, receive, send):
+    if scope["type"] != "http":
+      await self.app(scope, receive, send)
+      return
+    token = _dispatched.set(("default", time.perf_counter()))
+    try:
+      await self.app(scope, receive, send)
+    finally:
+      _dispatched.reset(token)
@@ -1,61 +1,82 @@
 import asyncio
-from fastapi import FastAPI
+import hmac
+from fastapi import FastAPI, Header, HTTPException, Response
+from fastapi.responses import ORJSONResponse
 from fastapi.concurrency import asynccontextmanager
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.staticfiles import StaticFiles
-from pathlib import Path
 import socketio.asgi
 
 from .core.config import get_settings
-from .core.database import SessionLocal, init_db
-from .core.security import get_password_hash
-from .models.alumni import AlumniProfile
-from .models.user import User, UserRole
+from .core.database import init_db
+from .core import logs, prometheus, threadpool
+from .core.redis import close_redis
 from .routers import auth, alumni, events, notices, chat, invite, reports, admin_users
+from .services import chat_ephemeral, presence
+from .utils.file_upload import UPLOAD_ROOT
 
 settings = get_settings()
-
-
-def ensure_default_admin():
-  db = SessionLocal()
-  try:
-    existing = db.query(User).filter(User.role == UserRole.ADMIN).first()
-    if existing:
-      return
-    admin = User(
-      email=settings.default_admin_email.lower(),
-      first_name="System",
-      last_name="Admin",
-      hashed_password=get_password_hash(settings.default_admin_password),
-      role=UserRole.ADMIN,
-      active=True,
-    )
-    profile = AlumniProfile(user=admin, cohort="N/A", phone=None, profession="Administrator", skills=[])
-    db.add(admin)
-    db.add(profile)
-    db.commit()
-  finally:
-    db.close()
+logs.setup_logging()
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # Startup
-    init_db()
-    ensure_default_admin()
+    threadpool.configure()
+
+    # Startup. With both flags off (production) the schema comes from `alembic upgrade head`
+    # and the first admin from `python -m app.cli create-admin`, so a worker boots without
+    # reflecting every table or hashing a password.
+    if settings.db_create_all_on_startup:
+        init_db()
+    if settings.bootstrap_admin_on_startup:
+        from .services.admin_bootstrap import ensure_default_admin
+        ensure_default_admin()
     
-    # Start Redis listener in background
-    asyncio.create_task(chat.redis_listener())
+    # Start Redis listener in background (not needed with the Socket.IO Redis client manager)
+    tasks = chat.start_background_tasks()
+    tasks.append(asyncio.create_task(presence.heartbeat_loop()))
+
+    if settings.upload_gc_interval_minutes > 0:
+        from .services.upload_gc import run_upload_gc_periodically
+        tasks.append(asyncio.create_task(run_upload_gc_periodically(
+            settings.upload_gc_interval_minutes * 60,
+            settings.upload_gc_grace_hours * 3600,
+        )))
+
+    if settings.chat_dedupe_prune_interval_minutes > 0:
+        from .services.chat_dedupe import run_key_pruning_periodically
+        tasks.append(asyncio.create_task(run_key_pruning_periodically(settings.chat_dedupe_prune_interval_minutes * 60)))
+
+    if settings.chat_partition_interval_minutes > 0:
+        # Separate from retention (off by default): without upcoming partitions new rows
+        # land in the default partition
+        from .services.chat_retention import run_partition_maintenance_periodically
+        tasks.append(asyncio.create_task(
+            run_partition_maintenance_periodically(settings.chat_partition_interval_minutes * 60)
+        ))
+
+    if settings.chat_retention_interval_minutes > 0:
+        from .services.chat_retention import run_chat_retention_periodically
+        tasks.append(asyncio.create_task(run_chat_retention_periodically(settings.chat_retention_interval_minutes * 60)))
     
     yield
-    # Shutdown (optional)
-    # Close Redis connection
-    redis = await chat.get_redis()
-    if redis:
-        await redis.close()
+    # Shutdown
+    await presence.shutdown()
+
+    # The background loops run until cancelled; stop them before the connections they use close
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+    # Publish the offline announcements presence.shutdown() queued for the stopped flusher
+    await chat_ephemeral.flush()
+
+    # Close Redis connections
+    await close_redis()
 
 
-app = FastAPI(title=settings.project_name, lifespan=lifespan)
+# orjson for every JSON response; large listings return ORJSONResponse directly, which also
+# skips jsonable_encoder (their serializers already produce JSON types)
+app = FastAPI(title=settings.project_name, lifespan=lifespan, default_response_class=ORJSONResponse)
 
 app.add_middleware(
   CORSMiddleware,
@@ -74,15 +95,54 @@ app.include_router(invite.router)
 app.include_router(reports.router)
 app.include_router(admin_users.router)
 
+# Optional subsystems (routes and middleware) are only imported when they are turned on
+if settings.profiling_enabled:
+  from .routers import profiles
+  app.include_router(profiles.router)
+if settings.slow_query_ms > 0:
+  from .routers import slow_query_log
+  app.include_router(slow_query_log.router)
+
 # Mount static files for uploaded posters
-uploads_dir = Path("uploads")
-uploads_dir.mkdir(exist_ok=True)
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+app.mount("/uploads", StaticFiles(directory=UPLOAD_ROOT), name="uploads")
 
 @app.get("/health")
 def health_check():
   return {"status": "ok"}
 
+# Closest to the routes: marks when a request is dispatched, for the threadpool wait metric
+if settings.metrics_enabled:
+  app.add_middleware(threadpool.ThreadpoolWaitMiddleware)
+
+# Innermost of the timing instrumentation, so profiles and latency metrics include compression time
+if settings.compression_enabled:
+  from .core.compression import CompressionMiddleware
+  app.add_middleware(CompressionMiddleware)
+
+if settings.profiling_enabled:
+  from .core.profiling import ProfilingMiddleware
+  app.add_middleware(ProfilingMiddleware)
+
+if settings.slow_query_ms > 0:
+  from .core.slow_queries import SlowQueryMiddleware
+  app.add_middleware(SlowQueryMiddleware)
+
+if settings.metrics_enabled:
+  app.add_middleware(prometheus.PrometheusMiddleware)
+
+  @app.get("/metrics", include_in_schema=False)
+  def metrics(authorization: str | None = Header(default=None)):
+    """Prometheus exposition; with METRICS_TOKEN set the scraper must send it as a bearer token"""
+    if settings.metrics_token and not hmac.compare_digest(
+      (authorization or "").encode(), f"Bearer {settings.metrics_token}".encode()
+    ):
+      raise HTTPException(status_code=401, detail="Invalid metrics token", headers={"WWW-Authenticate": "Bearer"})
+    body, content_type = prometheus.render()
+    return Response(body, media_type=content_type)
+
+# Outermost, so records from every other middleware carry the request id
+app.add_middleware(logs.RequestIdMiddleware)
+
 # Wrap FastAPI app with Socket.IO - this becomes the main ASGI app
 app = socketio.asgi.ASGIApp(chat.sio, app)
 
@@ -15,7 +15,7 @@ class AlumniProfile(Base):
 
   id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
   user_id = Column(String(36), ForeignKey("users.id"), unique=True, nullable=False)
-  cohort = Column(String(100), nullable=True)
+  cohort = Column(String(100), nullable=True, index=True)
   phone = Column(String(50), nullable=True)
   profession = Column(String(150), nullable=True)
   skills = Column(JSON, default=list)
@@ -1,7 +1,7 @@
 import uuid
 from datetime import datetime, timezone
 
-from sqlalchemy import Column, DateTime, ForeignKey, String, Text
+from sqlalchemy import DDL, JSON, BigInteger, Column, DateTime, ForeignKey, Index, Integer, String, Text, UniqueConstraint, event
 
 from .base import Base
 
@@ -10,12 +10,122 @@ def _utcnow():
   return datetime.now(timezone.utc)
 
 
+class ChatRoom(Base):
+  __tablename__ = "chat_rooms"
+
+  id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+  name = Column(String(150), nullable=False)
+  kind = Column(String(20), nullable=False, default="group")  # "cohort" or "group"
+  cohort = Column(String(100), unique=True, nullable=True)  # set for cohort rooms only
+  created_by_id = Column(String(36), ForeignKey("users.id"), nullable=True)
+  created_at = Column(DateTime(timezone=True), default=_utcnow, nullable=False)
+
+
+class ChatRoomMember(Base):
+  __tablename__ = "chat_room_members"
+  __table_args__ = (UniqueConstraint("room_id", "user_id"),)
+
+  id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+  room_id = Column(String(36), ForeignKey("chat_rooms.id"), nullable=False, index=True)
+  user_id = Column(String(36), ForeignKey("users.id"), nullable=False, index=True)
+  created_at = Column(DateTime(timezone=True), default=_utcnow, nullable=False)
+
+
 class ChatMessage(Base):
   __tablename__ = "chat_messages"
+  __table_args__ = (
+    Index("ix_chat_messages_room_id_created_at", "room_id", "created_at"),
+    Index("ix_chat_messages_sender_id_created_at", "sender_id", "created_at"),
+  )
 
   id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+  room_id = Column(String(36), ForeignKey("chat_rooms.id"), nullable=True)  # NULL is the general room
   sender_id = Column(String(36), ForeignKey("users.id"), nullable=False)
   sender_name = Column(String(150), nullable=False)
   text = Column(Text, nullable=False)
-  created_at = Column(DateTime(timezone=True), default=_utcnow, nullable=False)
+  created_at = Column(DateTime(timezone=True), default=_utcnow, nullable=False, index=True)
+
+
+# Full-text search on ChatMessage.text (see services.chat_search), maintained by the
+# database on insert/edit/delete: a generated tsvector column with a GIN index on
+# PostgreSQL, an external-content FTS5 table kept current by triggers on SQLite.
+# Existing databases get the same objects from the add_chat_message_search migration.
+SEARCH_DDL = {
+  "postgresql": [
+    "ALTER TABLE chat_messages ADD COLUMN text_search tsvector "
+    "GENERATED ALWAYS AS (to_tsvector('english', text)) STORED",
+    "CREATE INDEX ix_chat_messages_text_search ON chat_messages USING gin (text_search)",
+  ],
+  "sqlite": [
+    "CREATE VIRTUAL TABLE chat_messages_fts USING fts5("
+    "text, content='chat_messages', tokenize='porter unicode61')",
+    "CREATE TRIGGER chat_messages_fts_insert AFTER INSERT ON chat_messages BEGIN "
+    "INSERT INTO chat_messages_fts (rowid, text) VALUES (new.rowid, new.text); END",
+    "CREATE TRIGGER chat_messages_fts_delete AFTER DELETE ON chat_messages BEGIN "
+    "INSERT INTO chat_messages_fts (chat_messages_fts, rowid, text) VALUES ('delete', old.rowid, old.text); END",
+    "CREATE TRIGGER chat_messages_fts_update AFTER UPDATE OF text ON chat_messages BEGIN "
+    "INSERT INTO chat_messages_fts (chat_messages_fts, rowid, text) VALUES ('delete', old.rowid, old.text); "
+    "INSERT INTO chat_messages_fts (rowid, text) VALUES (new.rowid, new.text); END",
+  ],
+}
+for _dialect, _statements in SEARCH_DDL.items():
+  for _statement in _statements:
+    event.listen(ChatMessage.__table__, "after_create", DDL(_statement).execute_if(dialect=_dialect))
+event.listen(
+  ChatMessage.__table__, "before_drop", DDL("DROP TABLE IF EXISTS chat_messages_fts").execute_if(dialect="sqlite")
+)
 
+
+def rebuild_sqlite_search(connection) -> bool:
+  """Recreate missing FTS5 triggers and rebuild ``chat_messages_fts`` (SQLite only).
+
+  The FTS5 index is keyed on the implicit rowid of ``chat_messages``, whose primary key is
+  a string. ``VACUUM`` may renumber such rowids, and the table copy of an Alembic batch
+  migration renumbers them and drops the triggers, leaving search pointing at the wrong
+  rows. Alembic's ``env.py`` runs this after every upgrade; after a ``VACUUM`` run
+  ``python -m app.cli rebuild-search``. Returns False where there is no index to rebuild.
+  """
+  if connection.dialect.name != "sqlite":
+    return False
+  existing = set(connection.exec_driver_sql(
+    "SELECT name FROM sqlite_master WHERE type IN ('table', 'trigger')"
+  ).scalars())
+  if "chat_messages_fts" not in existing:
+    return False
+  for statement in SEARCH_DDL["sqlite"]:
+    if statement.startswith("CREATE TRIGGER") and statement.split()[2] not in existing:
+      connection.exec_driver_sql(statement)
+  connection.exec_driver_sql("INSERT INTO chat_messages_fts (chat_messages_fts) VALUES ('rebuild')")
+  return True
+
+
+class ChatMessageKey(Base):
+  """Client-supplied idempotency key of a sent message.
+
+  Kept apart from ``chat_messages`` because a unique constraint on the partitioned
+  table would have to include ``created_at``, which differs between retries.
+  """
+  __tablename__ = "chat_message_keys"
+  __table_args__ = (UniqueConstraint("sender_id", "client_id"),)
+
+  id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+  sender_id = Column(String(36), ForeignKey("users.id"), nullable=False)
+  client_id = Column(String(64), nullable=False)
+  message_id = Column(String(36), nullable=False)
+  created_at = Column(DateTime(timezone=True), default=_utcnow, nullable=False, index=True)
+
+
+class ChatOutbox(Base):
+  """Chat events written in the same transaction as the change they describe.
+
+  The id doubles as the event sequence number; the relay in ``services.chat_outbox``
+  publishes rows in id order and deletes them once Redis has accepted them.
+  """
+  __tablename__ = "chat_outbox"
+  __table_args__ = {"sqlite_autoincrement": True}  # never reuse sequence numbers
+
+  id = Column(BigInteger().with_variant(Integer, "sqlite"), primary_key=True, autoincrement=True)
+  event = Column(String(50), nullable=False)
+  room_id = Column(String(36), nullable=True)
+  payload = Column(JSON, nullable=False)
+  created_at = Column(DateTime(timezone=True), default=_utcnow, nullable=False)
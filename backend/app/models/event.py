@@ -16,8 +16,8 @@ class Event(Base):
   id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
   title = Column(String(255), nullable=False)
   description = Column(Text, nullable=False)
-  date = Column(DateTime(timezone=True), nullable=False)
+  date = Column(DateTime(timezone=True), nullable=False, index=True)
   venue = Column(String(255), nullable=False)
-  poster_path = Column(String(500), nullable=True)
+  poster_path = Column(String(500), nullable=True, index=True)  # looked up by the upload collector
   created_at = Column(DateTime(timezone=True), default=_utcnow, nullable=False)
 
@@ -16,5 +16,5 @@ class Notice(Base):
   id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
   title = Column(String(255), nullable=False)
   content = Column(Text, nullable=False)
-  created_at = Column(DateTime(timezone=True), default=_utcnow, nullable=False)
+  created_at = Column(DateTime(timezone=True), default=_utcnow, nullable=False, index=True)
 
@@ -2,7 +2,7 @@ import enum
 import uuid
 from datetime import datetime, timezone
 
-from sqlalchemy import Boolean, Column, DateTime, Enum, ForeignKey, String, Text
+from sqlalchemy import Boolean, Column, DateTime, Enum, ForeignKey, Index, String, Text
 from sqlalchemy.orm import relationship
 
 from .base import Base
@@ -19,6 +19,8 @@ class UserRole(str, enum.Enum):
 
 class User(Base):
   __tablename__ = "users"
+  # Alumni listings filter on role and sort by first name; role counts use its prefix
+  __table_args__ = (Index("ix_users_role_first_name", "role", "first_name"),)
 
   id = Column(String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
   email = Column(String(255), unique=True, index=True, nullable=False)
@@ -26,9 +28,9 @@ class User(Base):
   first_name = Column(String(100), nullable=False)
   last_name = Column(String(100), nullable=False)
   role = Column(Enum(UserRole, name="user_role"), nullable=False, default=UserRole.ALUMNI)
-  active = Column(Boolean, nullable=False, default=True)
+  active = Column(Boolean, nullable=False, default=True, index=True)
   bio = Column(Text, nullable=True)
-  created_at = Column(DateTime(timezone=True), default=_utcnow, nullable=False)
+  created_at = Column(DateTime(timezone=True), default=_utcnow, nullable=False, index=True)
   updated_at = Column(DateTime(timezone=True), default=_utcnow, onupdate=_utcnow, nullable=False)
 
   profile = relationship("AlumniProfile", back_populates="user", uselist=False)
@@ -1,10 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
 from pydantic import BaseModel
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 
 from ..core.database import get_db
 from ..core.security import require_admin
 from ..models.user import User, UserRole
+from ..services import chat_cache, chat_identity
 from ..utils.serializers import serialize_user
 
 router = APIRouter(prefix="/api/admin/users", tags=["admin-users"])
@@ -15,8 +17,8 @@ def list_users(
   _: str = Depends(require_admin),
   db: Session = Depends(get_db),
 ):
-  users = db.query(User).order_by(User.created_at.desc()).all()
-  return [serialize_user(u) for u in users]
+  users = db.query(User).options(selectinload(User.profile)).order_by(User.created_at.desc()).all()
+  return ORJSONResponse([serialize_user(u) for u in users])
 
 
 class StatusUpdate(BaseModel):
@@ -38,6 +40,8 @@ def update_user_status(
   db.add(user)
   db.commit()
   db.refresh(user)
+  # Any change to an account (status, and role when it becomes editable) drops its cached chat identity
+  chat_identity.invalidate(user_id)
   return serialize_user(user)
 
 
@@ -63,11 +67,14 @@ def delete_user(
       raise HTTPException(status_code=400, detail="Cannot delete the last admin user")
   
   # Delete related data
-  from ..models.chat import ChatMessage
+  from ..models.chat import ChatMessage, ChatMessageKey, ChatRoom, ChatRoomMember
   from ..models.alumni import AlumniProfile
   
-  # Delete chat messages
+  # Delete chat messages and room memberships
   db.query(ChatMessage).filter(ChatMessage.sender_id == user_id).delete()
+  db.query(ChatMessageKey).filter(ChatMessageKey.sender_id == user_id).delete()
+  db.query(ChatRoomMember).filter(ChatRoomMember.user_id == user_id).delete()
+  db.query(ChatRoom).filter(ChatRoom.created_by_id == user_id).update({ChatRoom.created_by_id: None})
   
   # Delete alumni profile if exists
   if user.profile:
@@ -76,5 +83,8 @@ def delete_user(
   # Delete the user
   db.delete(user)
   db.commit()
+  chat_identity.invalidate(user_id)
+  # The bulk delete bypasses the outbox, so cached room histories still hold the user's messages
+  chat_cache.invalidate()
   
   return {"success": True, "message": "User deleted successfully"}
@@ -1,12 +1,14 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
+from fastapi.responses import ORJSONResponse
 from sqlalchemy import func, or_
-from sqlalchemy.orm import Session
+from sqlalchemy.orm import Session, selectinload
 
 from ..core.database import get_db
 from ..core.security import get_current_user, require_admin, get_password_hash
 from ..models.alumni import AlumniProfile
 from ..models.user import User, UserRole
 from ..schemas.alumni import ProfileUpdate
+from ..services import chat_identity
 from ..utils.serializers import serialize_user
 
 router = APIRouter(prefix="/api/alumni", tags=["alumni"])
@@ -55,6 +57,7 @@ def update_my_profile(
     db.add(profile)
     db.commit()
     db.refresh(current_user)
+    chat_identity.invalidate(current_user.id)
   return serialize_user(current_user)
 
 
@@ -63,8 +66,14 @@ def list_alumni(
   _: User = Depends(require_admin),
   db: Session = Depends(get_db),
 ):
-  users = db.query(User).filter(User.role == UserRole.ALUMNI).order_by(User.first_name).all()
-  return [serialize_user(u) for u in users]
+  users = (
+    db.query(User)
+    .options(selectinload(User.profile))
+    .filter(User.role == UserRole.ALUMNI)
+    .order_by(User.first_name)
+    .all()
+  )
+  return ORJSONResponse([serialize_user(u) for u in users])
 
 
 @router.get("/search")
@@ -86,10 +95,11 @@ def search_alumni(
         func.lower(func.coalesce(AlumniProfile.cohort, "")).like(query),
       )
     )
+    .options(selectinload(User.profile))
     .limit(20)
     .all()
   )
-  return [serialize_user(u) for u in users]
+  return ORJSONResponse([serialize_user(u) for u in users])
 
 
 @router.get("/{alumni_id}")
@@ -134,6 +144,7 @@ def update_alumni(
   db.add(profile)
   db.commit()
   db.refresh(user)
+  chat_identity.invalidate(user.id)
 
   return serialize_user(user)
 
@@ -3,14 +3,16 @@ from datetime import datetime, timezone
 from fastapi import APIRouter, Depends, HTTPException, status
 from sqlalchemy.orm import Session
 
+from ..core import threadpool
 from ..core.database import get_db
-from ..core.security import create_access_token, get_password_hash, verify_password
+from ..core.security import create_access_token, get_password_hash, token_claims, verify_password
 from ..models.alumni import AlumniProfile
 from ..models.user import InviteToken, User, UserRole
 from ..schemas.user import UserCreate, UserLogin
 from ..utils.serializers import serialize_user
 
-router = APIRouter(prefix="/api/auth", tags=["auth"])
+# Both routes run bcrypt; the class keeps a login burst from taking every worker thread
+router = APIRouter(prefix="/api/auth", tags=["auth"], dependencies=[Depends(threadpool.limit("auth"))])
 
 
 @router.post("/register")
@@ -60,6 +62,6 @@ def login(payload: UserLogin, db: Session = Depends(get_db)):
   if not user or not verify_password(payload.password, user.hashed_password):
     raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid email or password")
 
-  token = create_access_token({"sub": user.id})
+  token = create_access_token(token_claims(user))
   return {"token": token, "user": serialize_user(user)}
 
@@ -1,125 +1,313 @@
-import json
+import asyncio
+import logging
+import os
 import socketio
-from typing import Dict
-import redis.asyncio as aioredis
-import redis as sync_redis
+import time
+import uuid
+from typing import Dict, List, Optional
 
 from datetime import datetime, timezone, timedelta
+import anyio.to_thread
 from pydantic import BaseModel
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, HTTPException, Query
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import ORJSONResponse
+from jose import JWTError
 from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
 
+from ..core import logs, prometheus
 from ..core.config import get_settings
 from ..core.database import SessionLocal, get_db
-from ..core.security import get_current_user
-from ..models.chat import ChatMessage
+from ..core.prometheus import (
+  chat_dropped_emits, chat_emits, chat_fanout_latency, chat_pubsub_received, socketio_connections, socketio_rooms,
+)
+from ..core.security import decode_access_token, get_current_user, require_admin
+from ..models.chat import ChatMessage, ChatMessageKey, ChatRoom, ChatRoomMember
 from ..models.user import User, UserRole
+from ..services import (
+  chat_broadcast, chat_bus, chat_cache, chat_dedupe, chat_ephemeral, chat_identity, chat_limits, chat_outbox, chat_retention,
+  chat_rooms, chat_search, presence,
+)
+from ..services.chat_broadcast import room_channels, sio_room
+from ..utils import wire
+from ..utils.serializers import serialize_chat_message, serialize_chat_room
 
 
 class MessageEdit(BaseModel):
     text: str
 
+
+class RoomCreate(BaseModel):
+    name: str
+    member_ids: List[str] = []
+
+
+class RoomMembers(BaseModel):
+    member_ids: List[str]
+
 settings = get_settings()
+logger = logging.getLogger(__name__)
+# Per-connection and per-message records, sampled at LOG_SAMPLE_RATE
+events_logger = logging.getLogger(logs.EVENTS_LOGGER)
 
-# Create Socket.IO server with Redis adapter for pub/sub
+# Create Socket.IO server; with CHAT_SOCKETIO_MANAGER=redis it uses the Redis client manager
+# so emits reach sockets on every worker
 sio = socketio.AsyncServer(
     async_mode='asgi',
+    client_manager=chat_broadcast.create_client_manager(),
     cors_allowed_origins=settings.cors_origins,
-    logger=True,
-    engineio_logger=True
+    # Polling sessions live in one worker's memory; websocket-only needs no session affinity
+    transports=['websocket'] if settings.chat_socketio_websocket_only else ['polling', 'websocket'],
+    logger=settings.socketio_logger,
+    engineio_logger=settings.engineio_logger,
 )
 
-# Redis connection for pub/sub
-redis_client: aioredis.Redis | None = None
-
 router = APIRouter(prefix="/api/chat", tags=["chat"])
 
-# Store user sessions
-user_sessions: Dict[str, str] = {}  # user_id -> session_id
+# Rooms with members connected to this process; only their channels are subscribed
+local_room_members: Dict[str, set] = {}  # room_id -> {sid}
+pubsub = None
+pubsub_lock = asyncio.Lock()
+# Set while the worker shuts down; new connects are refused so clients land on another worker
+draining = False
 
 
-def publish_to_redis_sync(channel: str, data: dict):
-    """Publish event to Redis channel for broadcasting (sync version for use in sync endpoints)"""
-    sync_redis_client = sync_redis.from_url(
-        settings.redis_url,
-        encoding="utf-8",
-        decode_responses=True
-    )
-    sync_redis_client.publish(channel, json.dumps(data))
-    sync_redis_client.close()
-
-
-async def get_redis():
-    """Get or create Redis connection"""
-    global redis_client
-    if redis_client is None:
-        redis_client = await aioredis.from_url(
-            settings.redis_url,
-            encoding="utf-8",
-            decode_responses=True
-        )
-    return redis_client
+def _after_fork():
+    # The Redis client manager tags its publishes with a host id to skip its own messages;
+    # workers forked from a preloaded parent (app.server) need their own
+    if hasattr(sio.manager, 'host_id'):
+        sio.manager.host_id = uuid.uuid4().hex
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_after_fork)
+
+
+async def join_chat_room(sid, room_id: str):
+    """Put a socket in a room and subscribe this process to the room's channels on first local member"""
+    await sio.enter_room(sid, sio_room(room_id))
+    async with pubsub_lock:
+        members = local_room_members.setdefault(room_id, set())
+        first = not members
+        members.add(sid)
+        socketio_rooms.set(len(local_room_members))
+        if first and pubsub is not None:
+            await pubsub.subscribe(*room_channels(room_id))
+
+
+async def leave_chat_room(sid, room_id: str):
+    await sio.leave_room(sid, sio_room(room_id))
+    async with pubsub_lock:
+        members = local_room_members.get(room_id)
+        if not members:
+            return
+        members.discard(sid)
+        if not members:
+            del local_room_members[room_id]
+            socketio_rooms.set(len(local_room_members))
+            if pubsub is not None:
+                await pubsub.unsubscribe(*room_channels(room_id))
+
+
+async def remove_user_from_room(user_id: str, room_id: str):
+    """Take a user's sockets on this worker out of a room they no longer belong to"""
+    for sid, _ in list(sio.manager.get_participants('/', f"user_{user_id}")):
+        session = await sio.get_session(sid)
+        if room_id not in session.get('rooms', []):
+            continue
+        session['rooms'] = [r for r in session['rooms'] if r != room_id]
+        await sio.save_session(sid, session)
+        await leave_chat_room(sid, room_id)
+        await sio.emit('room_left', {'room_id': room_id}, room=sid)
 
 
 @sio.event
 async def connect(sid, environ, auth):
-    """Handle Socket.IO connection"""
+    """Handle Socket.IO connection
+
+    The client authenticates with the same JWT it uses for the REST API
+    (`auth: {token}`). The token is verified locally; whether the user still exists and
+    which rooms they belong to comes from the shared identity cache, so a reconnect storm
+    does not turn into one database query per socket.
+    """
+    sid_token = logs.sid.set(sid)
     try:
-        user_id = auth.get('user_id') if auth else None
+        if draining:
+            events_logger.info("Connection rejected: worker is shutting down")
+            return False
+        token = auth.get('token') if isinstance(auth, dict) else None
+        if not token:
+            events_logger.info("Connection rejected: no token in auth")
+            return False
+        try:
+            claims = decode_access_token(token)
+        except JWTError:
+            events_logger.info("Connection rejected: invalid token")
+            return False
+        user_id = claims.get('sub')
         if not user_id:
-            print(f"Connection rejected: No user_id in auth")
+            events_logger.info("Connection rejected: token has no subject")
+            return False
+
+        identity = await chat_identity.get_identity(user_id)
+        if identity is None:
+            events_logger.info("Connection rejected: user not found", extra={'user_id': user_id})
             return False
+        # The identity is at most chat_identity_cache_seconds old; the token's name may
+        # be from a day ago
+        user_name = identity['name'] or claims.get('name')
+        room_ids = identity['rooms']
+
+        # Store session
+        await sio.save_session(sid, {
+            'user_id': user_id,
+            'user_name': user_name,
+            'rooms': room_ids,
+        })
         
-        # Verify user exists
-        db: Session = SessionLocal()
-        try:
-            user = db.get(User, user_id)
-            if not user:
-                print(f"Connection rejected: User {user_id} not found")
-                return False
-            
-            # Store session
-            user_sessions[user_id] = sid
-            await sio.save_session(sid, {'user_id': user_id, 'user_name': f"{user.first_name} {user.last_name}"})
-            
-            # Join user to their personal room and broadcast room
-            await sio.enter_room(sid, f"user_{user_id}")
-            await sio.enter_room(sid, "chat_room")
-            
-            print(f"Socket.IO connected: user {user_id} ({user.first_name} {user.last_name})")
-            
-            # Send welcome message
-            await sio.emit('connected', {
-                'type': 'connected',
-                'message': 'Connected to chat',
-                'sender': 'System'
-            }, room=sid)
-            
-            return True
-        finally:
-            db.close()
-    except Exception as e:
-        print(f"Error in connect handler: {e}")
+        # Join user to their personal room, the general room and their cohort/group rooms
+        await sio.enter_room(sid, f"user_{user_id}")
+        await sio.enter_room(sid, "chat_room")
+        for room_id in room_ids:
+            await join_chat_room(sid, room_id)
+        await presence.add_session(user_id, sid)
+        socketio_connections.inc()
+        
+        events_logger.info("Socket.IO connected", extra={'user_id': user_id})
+        
+        # Send welcome message
+        await sio.emit('connected', {
+            'type': 'connected',
+            'message': 'Connected to chat',
+            'sender': 'System'
+        }, room=sid)
+        
+        return True
+    except Exception:
+        logger.exception("Error in connect handler")
         return False
+    finally:
+        logs.sid.reset(sid_token)
 
 
 @sio.event
 async def disconnect(sid):
     """Handle Socket.IO disconnection"""
+    sid_token = logs.sid.set(sid)
+    socketio_connections.dec()
     try:
         session = await sio.get_session(sid)
         user_id = session.get('user_id')
+        chat_limits.forget(sid)
+        if user_id:
+            chat_ephemeral.stop_typing(user_id, session.get('user_name', ''))
+        for room_id in session.get('rooms', []):
+            await leave_chat_room(sid, room_id)
         if user_id:
-            user_sessions.pop(user_id, None)
-            print(f"Socket.IO disconnected: user {user_id}")
-    except Exception as e:
-        print(f"Error in disconnect handler: {e}")
+            await presence.remove_session(user_id, sid)
+            events_logger.info("Socket.IO disconnected", extra={'user_id': user_id})
+    except Exception:
+        logger.exception("Error in disconnect handler")
+    finally:
+        logs.sid.reset(sid_token)
+
+
+@sio.event
+async def join_room(sid, data):
+    """Join a room the user was added to after connecting"""
+    session = await sio.get_session(sid)
+    room_id = (data or {}).get('room_id')
+    if not session.get('user_id') or not room_id or room_id in session.get('rooms', []):
+        return
+    # Adding members invalidates their cached identity, so a new room is already listed
+    identity = await chat_identity.get_identity(session['user_id'])
+    if identity is None or room_id not in identity['rooms']:
+        await sio.emit('error', {'message': 'Not a member of this room'}, room=sid)
+        return
+    session['rooms'] = session.get('rooms', []) + [room_id]
+    await sio.save_session(sid, session)
+    await join_chat_room(sid, room_id)
+
+
+@sio.event
+async def leave_room(sid, data):
+    session = await sio.get_session(sid)
+    room_id = (data or {}).get('room_id')
+    if room_id not in session.get('rooms', []):
+        return
+    session['rooms'] = [r for r in session['rooms'] if r != room_id]
+    await sio.save_session(sid, session)
+    await leave_chat_room(sid, room_id)
+
+
+@sio.event
+async def typing(sid, data):
+    """Typing indicator; ephemeral, throttled and merged per room before fanout"""
+    session = await sio.get_session(sid)
+    user_id = session.get('user_id')
+    room_id = (data or {}).get('room_id')
+    if not user_id or (room_id is not None and room_id not in session.get('rooms', [])):
+        return
+    chat_ephemeral.typing(room_id, user_id, session.get('user_name', ''), bool((data or {}).get('typing', True)))
+
+
+def _store_message(user_id: str, room_id: str | None, text: str, client_id: str | None):
+    """Insert a message and its client id (runs in a worker thread).
+
+    Returns (message, broadcast payload, None), or (None, None, existing message id) when
+    the client id was already used, or (None, None, None) if the user no longer exists.
+    """
+    db: Session = SessionLocal()
+    try:
+        user = db.get(User, user_id)
+        if not user:
+            return None, None, None
+
+        chat = ChatMessage(
+            room_id=room_id,
+            sender_id=user.id,
+            sender_name=f"{user.first_name} {user.last_name}",
+            text=text,
+        )
+        db.add(chat)
+        if client_id:
+            db.flush()
+            db.add(ChatMessageKey(sender_id=user.id, client_id=client_id, message_id=chat.id))
+        try:
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+            existing_id = client_id and chat_dedupe.stored_message_id(db, user_id, client_id)
+            if not existing_id:
+                raise
+            return None, None, existing_id
+        db.refresh(chat)
+
+        message_data = {
+            'id': str(chat.id),
+            'room_id': room_id,
+            'sender': user.first_name,
+            'sender_id': str(user.id),
+            'text': text,
+            'timestamp': chat.created_at.isoformat(),
+        }
+        return chat, message_data, None
+    finally:
+        db.close()
 
 
 @sio.event
 async def message(sid, data):
-    """Handle incoming chat messages"""
+    """Handle incoming chat messages.
+
+    A client may send a `client_id` (up to 64 chars) and retry with it after a reconnect;
+    the ack is `{id, client_id, duplicate}` and a retry returns the original id without
+    storing or broadcasting the message again. A rate-limited send is acked with
+    `rate_limited: true` and `id: null` (and a `rate_limited` event), so it is not retried.
+    """
+    sid_token = logs.sid.set(sid)
     try:
         session = await sio.get_session(sid)
         user_id = session.get('user_id')
@@ -132,103 +320,397 @@ async def message(sid, data):
         text = data.get('text') or data.get('message', '')
         if not text or not text.strip():
             return
-        
-        # Save message to database
-        db: Session = SessionLocal()
-        try:
-            user = db.get(User, user_id)
-            if not user:
+
+        room_id = data.get('room_id')
+        if room_id is not None:
+            # The session's rooms date from connect/join_room; the cached identity is
+            # invalidated when the user leaves a room, so a missed room_left still holds
+            identity = await chat_identity.get_identity(user_id)
+            if room_id not in session.get('rooms', []) or identity is None or room_id not in identity['rooms']:
+                await sio.emit('error', {'message': 'Not a member of this room'}, room=sid)
                 return
-            
-            chat = ChatMessage(
-                sender_id=user.id,
-                sender_name=f"{user.first_name} {user.last_name}",
-                text=text.strip()
-            )
-            db.add(chat)
-            db.commit()
-            db.refresh(chat)
-            
-            # Broadcast message to all connected clients
-            message_data = {
-                'id': str(chat.id),
-                'sender': user.first_name,
-                'sender_id': str(user.id),
-                'text': text.strip(),
-                'timestamp': chat.created_at.isoformat(),
-            }
-            
-            # Publish to Redis channel for cross-instance messaging
-            # Redis listener will broadcast to all clients (prevents duplication)
-            redis = await get_redis()
-            await redis.publish('chat_messages', json.dumps(message_data))
-            
-            print(f"Message from {user_id}: {text[:50]}")
-        finally:
-            db.close()
-    except Exception as e:
-        print(f"Error handling message: {e}")
+
+        client_id = data.get('client_id')
+        if client_id is not None and (not isinstance(client_id, str) or not 0 < len(client_id) <= 64):
+            await sio.emit('error', {'message': 'Invalid client_id'}, room=sid)
+            return
+        if client_id:
+            # Retries are answered before rate limiting so they cost no tokens
+            existing_id = await chat_dedupe.lookup(user_id, client_id)
+            if existing_id:
+                return {'id': existing_id, 'client_id': client_id, 'duplicate': True}
+
+        if not await chat_limits.allow_message(sid, user_id):
+            await sio.emit('rate_limited', {'message': 'You are sending messages too quickly'}, room=sid)
+            # Acked, so the client stops retrying it on reconnect
+            return {'id': None, 'client_id': client_id, 'duplicate': False, 'rate_limited': True}
+        
+        # Save message to database, in a worker thread so the event loop keeps serving sockets
+        chat, message_data, existing_id = await anyio.to_thread.run_sync(_store_message, user_id, room_id, text.strip(), client_id)
+        if existing_id:
+            # An earlier attempt with the same client_id is already stored
+            return {'id': existing_id, 'client_id': client_id, 'duplicate': True}
+        if chat is None:
+            return
+
+        await chat_cache.push_message(chat)
+
+        # Broadcast across instances (Redis channel + listener, or the Socket.IO client manager)
+        await chat_broadcast.publish('message', message_data, room_id)
+        chat_ephemeral.typing(room_id, user_id, user_name, False)
+        if client_id:
+            await chat_dedupe.remember(user_id, client_id, message_data['id'])
+        
+        events_logger.info("Message sent", extra={'user_id': user_id, 'room_id': room_id, 'message_id': message_data['id']})
+        return {'id': message_data['id'], 'client_id': client_id, 'duplicate': False}
+    except Exception:
+        logger.exception("Error handling message")
         await sio.emit('error', {'message': 'Failed to send message'}, room=sid)
+    finally:
+        logs.sid.reset(sid_token)
+
+
+CHAT_EVENTS = ('message_updated', 'message_deleted', 'messages_cleared', 'presence_changed', 'typing')
+
+
+def _unpack(message) -> list[tuple[str, str, dict, float | None]]:
+    """Map a pub/sub message to the Socket.IO room, event and payload items to emit"""
+    channel = message['channel'].decode() if isinstance(message['channel'], bytes) else message['channel']
+    base, _, room_id = channel.partition(':')
+    data, published_at = wire.decode(message['data'])
+    if published_at is not None:
+        chat_fanout_latency.labels('publish_to_receive').observe(time.time() - published_at)
+    room = sio_room(room_id or None)
+
+    # Handle chat messages
+    if base == 'chat_messages':
+        return [(room, 'message', data, published_at)]
+
+    if base != 'chat_events':
+        return []
+    # Ephemeral updates (typing, presence) arrive pre-merged per room
+    if data.get('event') == 'message_batch':
+        return [
+            (room, item['event'], item.get('data', {}), published_at)
+            for item in data.get('data', []) if item.get('event') in CHAT_EVENTS
+        ]
+    # Handle chat events (edit, delete, clear)
+    if data.get('event') in CHAT_EVENTS:
+        return [(room, data['event'], data.get('data', {}), published_at)]
+    return []
+
+
+async def _fanout(batch: list[tuple[str, str, dict, float | None, float]]):
+    """Emit a batch per room: single items as their own event, larger ones as one message_batch.
+
+    Sockets with a backed-up outbound queue are skipped (or disconnected) rather than
+    buffered without bound.
+    """
+    by_room: Dict[str, list] = {}
+    for room, event, data, _, _ in batch:
+        by_room.setdefault(room, []).append({'event': event, 'data': data})
+
+    for room, items in by_room.items():
+        skip = await chat_limits.slow_consumers(sio, room)
+        if skip:
+            chat_dropped_emits.inc(len(skip))
+        if len(items) == 1:
+            await sio.emit(items[0]['event'], items[0]['data'], room=room, skip_sid=skip or None)
+        else:
+            await sio.emit('message_batch', items, room=room, skip_sid=skip or None)
+        chat_emits.labels('single' if len(items) == 1 else 'batch').inc()
+
+    emitted_at = time.time()
+    for _, _, _, published_at, received_at in batch:
+        chat_fanout_latency.labels('receive_to_emit').observe(emitted_at - received_at)
+        if published_at is not None:
+            chat_fanout_latency.labels('publish_to_emit').observe(emitted_at - published_at)
 
 
 async def redis_listener():
-    """Listen for messages and events from Redis pub/sub"""
-    redis = await get_redis()
-    pubsub = redis.pubsub()
-    await pubsub.subscribe('chat_messages', 'chat_events')
-    
-    async for message in pubsub.listen():
-        if message['type'] == 'message':
-            try:
-                channel = message['channel'].decode() if isinstance(message['channel'], bytes) else message['channel']
-                data = json.loads(message['data'])
-                
-                # Handle chat messages
-                if channel == 'chat_messages':
-                    await sio.emit('message', data, room='chat_room')
-                
-                # Handle chat events (edit, delete, clear)
-                elif channel == 'chat_events':
-                    event_type = data.get('event')
-                    event_data = data.get('data', {})
-                    if event_type == 'message_updated':
-                        await sio.emit('message_updated', event_data, room='chat_room')
-                    elif event_type == 'message_deleted':
-                        await sio.emit('message_deleted', event_data, room='chat_room')
-                    elif event_type == 'messages_cleared':
-                        await sio.emit('messages_cleared', event_data, room='chat_room')
-            except Exception as e:
-                print(f"Error processing Redis message: {e}")
+    """Listen for messages and events on the chat pub/sub bus (Redis or in-process).
+
+    With chat_fanout_window_ms set, items arriving within the window are coalesced
+    into a single emit instead of one awaited emit per message.
+    """
+    global pubsub
+    async with pubsub_lock:
+        pubsub = await chat_bus.bus.pubsub()
+        channels = ['chat_messages', 'chat_events']
+        for room_id in local_room_members:
+            channels.extend(room_channels(room_id))
+        await pubsub.subscribe(*channels)
+
+    loop = asyncio.get_running_loop()
+    window = settings.chat_fanout_window_ms / 1000
+    batch: list[tuple[str, str, dict, float | None, float]] = []
+    deadline: float | None = None
+
+    while True:
+        try:
+            timeout = max(deadline - loop.time(), 0) if deadline is not None else 1.0
+            message = await pubsub.get_message(ignore_subscribe_messages=True, timeout=timeout)
+            if message and message['type'] == 'message':
+                items = _unpack(message)
+                if items:
+                    chat_pubsub_received.inc()
+                    received_at = time.time()
+                    batch.extend((*item, received_at) for item in items)
+                    if deadline is None:
+                        deadline = loop.time() + window
+
+            if batch and (loop.time() >= deadline or len(batch) >= settings.chat_fanout_max_batch):
+                pending, batch, deadline = batch, [], None
+                await _fanout(pending)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Error processing Redis message")
+            batch, deadline = [], None
+
+
+async def drain(seconds: float):
+    """Disconnect this worker's sockets before shutdown, spread over `seconds`
+
+    Clients reconnect (see createChatSocket) and are balanced onto the remaining workers
+    instead of all retrying at the same instant when the process exits.
+    """
+    global draining
+    draining = True
+    sids = [sid for sid, _ in sio.manager.get_participants('/', 'chat_room')]
+    if not sids:
+        return
+    logger.info("Draining %d Socket.IO connections over %ss", len(sids), seconds)
+    rounds = max(1, int(seconds * 10))
+    per_round = -(-len(sids) // rounds)
+    for start in range(0, len(sids), per_round):
+        await asyncio.gather(*(sio.disconnect(sid) for sid in sids[start:start + per_round]))
+        await asyncio.sleep(seconds / rounds)
+
+
+async def control_listener():
+    """Apply membership changes made through the REST API to this worker's sockets"""
+    control = await chat_bus.bus.pubsub()
+    await control.subscribe(chat_broadcast.CONTROL_CHANNEL)
+    while True:
+        try:
+            message = await control.get_message(ignore_subscribe_messages=True, timeout=1.0)
+            if not message or message['type'] != 'message':
+                continue
+            data, _ = wire.decode(message['data'])
+            if data.get('action') == 'room_left':
+                await remove_user_from_room(data['data']['user_id'], data['data']['room_id'])
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            logger.exception("Error processing chat control message")
+
+
+def start_background_tasks() -> list[asyncio.Task]:
+    """Start the outbox relay, the ephemeral event flusher, the control listener, and the
+    pub/sub listener unless the Socket.IO client manager handles cross-worker delivery.
+
+    Returns the tasks, for the lifespan to cancel on shutdown."""
+    tasks = [
+        asyncio.create_task(chat_outbox.run_relay()),
+        asyncio.create_task(chat_ephemeral.run()),
+        asyncio.create_task(control_listener()),
+    ]
+    if not chat_broadcast.USE_CLIENT_MANAGER:
+        tasks.append(asyncio.create_task(redis_listener()))
+    return tasks
+
+
+FANOUT_STAGES = {"publishToReceive": "publish_to_receive", "receiveToEmit": "receive_to_emit", "publishToEmit": "publish_to_emit"}
+
+
+def _stage_latency(stage: str) -> dict:
+  count = prometheus.sample("chat_fanout_latency_seconds_count", stage=stage)
+  total = prometheus.sample("chat_fanout_latency_seconds_sum", stage=stage)
+  return {"count": int(count), "meanMs": round(total / count * 1000, 3) if count else None}
+
+
+@router.get("/metrics")
+def get_chat_metrics(_: User = Depends(require_admin)):
+  """This instance's chat counters and per-stage fanout latency (publish -> receive -> emit).
+
+  Read from the Prometheus metrics; percentiles come from chat_fanout_latency_seconds
+  in /metrics.
+  """
+  sample = prometheus.sample
+  single, batch = sample("chat_emits_total", kind="single"), sample("chat_emits_total", kind="batch")
+  counters = {
+    "received": sample("chat_pubsub_received_total"),
+    "emits": single + batch,
+    "batchedEmits": batch,
+    "throttled": sample("chat_throttled_total", scope="socket") + sample("chat_throttled_total", scope="user"),
+    "droppedEmits": sample("chat_dropped_emits_total"),
+    "slowDisconnects": sample("chat_slow_disconnects_total"),
+    "ephemeralReceived": sample("chat_ephemeral_updates_total", outcome="received"),
+    "ephemeralThrottled": sample("chat_ephemeral_updates_total", outcome="throttled"),
+    "ephemeralPublished": sample("chat_ephemeral_updates_total", outcome="published"),
+  }
+  return {
+    "socketioManager": settings.chat_socketio_manager,
+    "wireFormat": settings.chat_wire_format,
+    "fanoutWindowMs": settings.chat_fanout_window_ms,
+    "counters": {name: int(value) for name, value in counters.items()},
+    "latency": {name: _stage_latency(stage) for name, stage in FANOUT_STAGES.items()},
+  }
+
+
+@router.get("/online")
+async def get_online_users(
+  current_user: User = Depends(get_current_user),
+  db: Session = Depends(get_db),
+):
+  """Users connected to chat on any instance, with their number of open sessions"""
+  online = await presence.get_online_users()
+  if not online:
+    return []
+  # The lookup blocks, so it runs in the threadpool rather than on the event loop
+  users = await run_in_threadpool(
+    lambda: db.execute(select(User.id, User.first_name, User.last_name).where(User.id.in_(list(online)))).all()
+  )
+  return [
+    {"id": uid, "name": f"{first} {last}", "sessions": online[uid]}
+    for uid, first, last in sorted(users, key=lambda u: (u.first_name, u.last_name))
+  ]
 
 
 @router.get("/messages")
 def get_chat_messages(
   limit: int = 50,
+  before: Optional[datetime] = None,
   current_user: User = Depends(get_current_user),
   db: Session = Depends(get_db),
 ):
-  """Get recent chat messages"""
-  messages = (
-    db.execute(
-      select(ChatMessage)
-      .order_by(ChatMessage.created_at.desc())
-      .limit(limit)
+  """Get recent general-room messages in chronological order, or the page older than `before`"""
+  return ORJSONResponse(chat_cache.get_recent_messages(db, limit, before))
+
+
+@router.get("/search")
+def search_messages(
+  q: str = Query(..., min_length=2),
+  room_id: Optional[str] = Query(None, description='A room id, or "general"; omit to search every room'),
+  sender_id: Optional[str] = None,
+  since: Optional[datetime] = None,
+  until: Optional[datetime] = None,
+  limit: int = Query(20, ge=1, le=100),
+  cursor: Optional[str] = None,
+  current_user: User = Depends(get_current_user),
+  db: Session = Depends(get_db),
+):
+  """Full-text search over messages in the rooms the user can read, best matches first.
+
+  Pass the returned `nextCursor` as `cursor` to get the next page.
+  """
+  if room_id == "general":
+    room_ids = [None]
+  elif room_id:
+    if not chat_rooms.is_room_member(db, current_user, room_id):
+      raise HTTPException(status_code=404, detail="Room not found")
+    room_ids = [room_id]
+  else:
+    room_ids = [None] + [room.id for room in chat_rooms.get_user_rooms(db, current_user)]
+
+  try:
+    results, next_cursor = chat_search.search_messages(
+      db, q.strip(), room_ids, sender_id=sender_id, since=since, until=until, limit=limit, cursor=cursor
     )
-    .scalars()
-    .all()
-  )
-  return [
-    {
-      "id": msg.id,
-      "sender": msg.sender_name,
-      "sender_id": msg.sender_id,
-      "text": msg.text,
-      "timestamp": msg.created_at.isoformat(),
-    }
-    for msg in reversed(messages)  # Return in chronological order
+  except ValueError:
+    raise HTTPException(status_code=400, detail="Invalid cursor")
+  return {"results": results, "nextCursor": next_cursor}
+
+
+@router.get("/rooms")
+def list_rooms(
+  current_user: User = Depends(get_current_user),
+  db: Session = Depends(get_db),
+):
+  """Rooms the current user can read and post in, starting with the general room"""
+  return [serialize_chat_room(None)] + [
+    serialize_chat_room(room) for room in chat_rooms.get_user_rooms(db, current_user)
   ]
 
 
+@router.post("/rooms", status_code=201)
+def create_room(
+  payload: RoomCreate,
+  current_user: User = Depends(get_current_user),
+  db: Session = Depends(get_db),
+):
+  """Create an ad-hoc group room; the creator is always a member"""
+  name = payload.name.strip()
+  if not name:
+    raise HTTPException(status_code=400, detail="Room name is required")
+  room = ChatRoom(name=name, kind="group", created_by_id=current_user.id)
+  db.add(room)
+  db.flush()
+  added = chat_rooms.add_members(db, room, [current_user.id] + payload.member_ids)
+  db.commit()
+  chat_identity.invalidate(*added)
+  db.refresh(room)
+  return serialize_chat_room(room)
+
+
+@router.post("/rooms/{room_id}/members")
+def add_room_members(
+  room_id: str,
+  payload: RoomMembers,
+  current_user: User = Depends(get_current_user),
+  db: Session = Depends(get_db),
+):
+  """Add users to a group room (members or admins); they join live with the join_room socket event"""
+  room = db.get(ChatRoom, room_id)
+  if not room or (not chat_rooms.is_room_member(db, current_user, room_id) and current_user.role != UserRole.ADMIN):
+    raise HTTPException(status_code=404, detail="Room not found")
+  if room.kind != "group":
+    raise HTTPException(status_code=400, detail="Cohort room membership follows the alumni profile")
+  added = chat_rooms.add_members(db, room, payload.member_ids)
+  db.commit()
+  chat_identity.invalidate(*added)
+  return {"added": added}
+
+
+@router.delete("/rooms/{room_id}/members/me")
+def leave_room_membership(
+  room_id: str,
+  current_user: User = Depends(get_current_user),
+  db: Session = Depends(get_db),
+):
+  """Leave a group room; the user's connected sockets leave it too, on every worker"""
+  deleted = (
+    db.query(ChatRoomMember)
+    .filter(ChatRoomMember.room_id == room_id, ChatRoomMember.user_id == current_user.id)
+    .delete()
+  )
+  db.commit()
+  if not deleted:
+    raise HTTPException(status_code=404, detail="Not a member of this room")
+  chat_identity.invalidate(current_user.id)
+  try:
+    chat_broadcast.publish_control_sync("room_left", {"user_id": current_user.id, "room_id": room_id})
+  except Exception as e:
+    # Sends are still refused: the message handler checks the refreshed identity
+    logger.warning("Could not notify workers of a room leave: %s", e)
+  return {"success": True}
+
+
+@router.get("/rooms/{room_id}/messages")
+def get_room_messages(
+  room_id: str,
+  limit: int = 50,
+  before: Optional[datetime] = None,
+  current_user: User = Depends(get_current_user),
+  db: Session = Depends(get_db),
+):
+  """Get a room's messages in chronological order, or the page older than `before`"""
+  if not chat_rooms.is_room_member(db, current_user, room_id):
+    raise HTTPException(status_code=404, detail="Room not found")
+  return ORJSONResponse(chat_cache.get_recent_messages(db, limit, before, room_id=room_id))
+
+
 @router.put("/messages/{message_id}")
 def edit_message(
   message_id: str,
@@ -251,34 +733,14 @@ def edit_message(
   if time_diff > timedelta(minutes=1):
     raise HTTPException(status_code=400, detail="Message can only be edited within 1 minute of sending")
   
-  # Update message
+  # Update message; the broadcast goes out through the outbox relay
   message.text = payload.text.strip()
+  message_data = {**serialize_chat_message(message), 'edited': True}
+  chat_outbox.enqueue(db, 'message_updated', message_data, message.room_id)
   db.commit()
-  db.refresh(message)
+  chat_outbox.notify()
   
-  # Broadcast update to all clients via Redis
-  message_data = {
-    'event': 'message_updated',
-    'data': {
-      'id': str(message.id),
-      'sender': message.sender_name,
-      'sender_id': str(message.sender_id),
-      'text': message.text,
-      'timestamp': message.created_at.isoformat(),
-      'edited': True
-    }
-  }
-  
-  # Publish to Redis - listener will broadcast to all clients
-  publish_to_redis_sync('chat_events', message_data)
-  
-  return {
-    "id": message.id,
-    "sender": message.sender_name,
-    "sender_id": message.sender_id,
-    "text": message.text,
-    "timestamp": message.created_at.isoformat(),
-  }
+  return message_data
 
 
 @router.delete("/messages/{message_id}")
@@ -296,36 +758,33 @@ def delete_message(
   if message.sender_id != current_user.id and current_user.role != UserRole.ADMIN:
     raise HTTPException(status_code=403, detail="You can only delete your own messages")
   
+  room_id = message.room_id
   db.delete(message)
+  # Broadcast deletion to all clients in the room, via the outbox relay
+  chat_outbox.enqueue(db, 'message_deleted', {'id': message_id, 'room_id': room_id}, room_id)
   db.commit()
-  
-  # Broadcast deletion to all clients via Redis
-  delete_data = {
-    'event': 'message_deleted',
-    'data': {'id': message_id}
-  }
-  publish_to_redis_sync('chat_events', delete_data)
+  chat_outbox.notify()
   
   return {"success": True}
 
 
 @router.delete("/messages")
 def clear_all_messages(
+  background_tasks: BackgroundTasks,
   current_user: User = Depends(get_current_user),
   db: Session = Depends(get_db),
 ):
-  """Clear all messages (admin only)"""
+  """Clear all messages (admin only)
+
+  Rows are deleted in chunks by a background task after the response is sent.
+  """
   if current_user.role != UserRole.ADMIN:
     raise HTTPException(status_code=403, detail="Only admins can clear all messages")
   
-  db.query(ChatMessage).delete()
+  # Broadcast clear to all clients, via the outbox relay
+  chat_outbox.enqueue(db, 'messages_cleared', {})
   db.commit()
-  
-  # Broadcast clear to all clients via Redis
-  clear_data = {
-    'event': 'messages_cleared',
-    'data': {}
-  }
-  publish_to_redis_sync('chat_events', clear_data)
+  chat_outbox.notify()
+  background_tasks.add_task(chat_retention.delete_messages_before, datetime.now(timezone.utc))
   
   return {"success": True}
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status, UploadFile, File, Form
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from sqlalchemy import select
 from datetime import datetime
@@ -9,6 +10,7 @@ from ..core.security import require_admin
 from ..models.event import Event
 from ..schemas.event import EventCreate
 from ..utils.file_upload import save_uploaded_file, delete_file
+from ..utils.serializers import serialize_event
 
 router = APIRouter(prefix="/api/events", tags=["events"])
 
@@ -16,18 +18,7 @@ router = APIRouter(prefix="/api/events", tags=["events"])
 @router.get("")
 def list_events(db: Session = Depends(get_db)):
   events = db.execute(select(Event).order_by(Event.date.desc())).scalars().all()
-  return [
-    {
-      "id": ev.id,
-      "title": ev.title,
-      "description": ev.description,
-      "date": ev.date.isoformat(),
-      "venue": ev.venue,
-      "posterPath": ev.poster_path,
-      "createdAt": ev.created_at.isoformat(),
-    }
-    for ev in events
-  ]
+  return ORJSONResponse([serialize_event(ev) for ev in events])
 
 
 @router.post("", status_code=status.HTTP_201_CREATED)
@@ -70,15 +61,7 @@ async def create_event(
     db.commit()
     db.refresh(event)
   
-  return {
-    "id": event.id,
-    "title": event.title,
-    "description": event.description,
-    "date": event.date.isoformat(),
-    "venue": event.venue,
-    "posterPath": event.poster_path,
-    "createdAt": event.created_at.isoformat(),
-  }
+  return serialize_event(event)
 
 
 @router.put("/{event_id}")
@@ -122,15 +105,7 @@ async def update_event(
   
   db.commit()
   db.refresh(event)
-  return {
-    "id": event.id,
-    "title": event.title,
-    "description": event.description,
-    "date": event.date.isoformat(),
-    "venue": event.venue,
-    "posterPath": event.poster_path,
-    "createdAt": event.created_at.isoformat(),
-  }
+  return serialize_event(event)
 
 
 @router.delete("/{event_id}")
@@ -2,11 +2,13 @@ from datetime import datetime, timedelta, timezone
 import uuid
 
 from fastapi import APIRouter, Depends
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 
 from ..core.database import get_db
 from ..core.security import require_admin
 from ..models.user import InviteToken
+from ..utils.serializers import serialize_invite
 
 router = APIRouter(prefix="/api/invite", tags=["invite"])
 
@@ -24,11 +26,7 @@ def generate_invite(
   db.add(invite)
   db.commit()
   db.refresh(invite)
-  return {
-    "id": invite.id,
-    "token": invite.token,
-    "expiresAt": invite.expires_at.isoformat() if invite.expires_at else None,
-  }
+  return serialize_invite(invite)
 
 
 @router.get("/list")
@@ -37,14 +35,5 @@ def list_invites(
   db: Session = Depends(get_db),
 ):
   invites = db.query(InviteToken).order_by(InviteToken.created_at.desc()).limit(50).all()
-  return [
-    {
-      "id": invite.id,
-      "token": invite.token,
-      "createdAt": invite.created_at.isoformat(),
-      "expiresAt": invite.expires_at.isoformat() if invite.expires_at else None,
-      "used": invite.used,
-    }
-    for invite in invites
-  ]
+  return ORJSONResponse([serialize_invite(invite) for invite in invites])
 
@@ -1,4 +1,5 @@
 from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi.responses import ORJSONResponse
 from sqlalchemy import select
 from sqlalchemy.orm import Session
 
@@ -6,6 +7,7 @@ from ..core.database import get_db
 from ..core.security import require_admin
 from ..models.notice import Notice
 from ..schemas.notice import NoticeCreate
+from ..utils.serializers import serialize_notice
 
 router = APIRouter(prefix="/api/notices", tags=["notices"])
 
@@ -13,15 +15,7 @@ router = APIRouter(prefix="/api/notices", tags=["notices"])
 @router.get("")
 def list_notices(db: Session = Depends(get_db)):
   notices = db.execute(select(Notice).order_by(Notice.created_at.desc())).scalars().all()
-  return [
-    {
-      "id": notice.id,
-      "title": notice.title,
-      "content": notice.content,
-      "createdAt": notice.created_at.isoformat(),
-    }
-    for notice in notices
-  ]
+  return ORJSONResponse([serialize_notice(notice) for notice in notices])
 
 
 @router.post("", status_code=status.HTTP_201_CREATED)
@@ -34,12 +28,7 @@ def create_notice(
   db.add(notice)
   db.commit()
   db.refresh(notice)
-  return {
-    "id": notice.id,
-    "title": notice.title,
-    "content": notice.content,
-    "createdAt": notice.created_at.isoformat(),
-  }
+  return serialize_notice(notice)
 
 
 @router.put("/{notice_id}")
@@ -57,12 +46,7 @@ def update_notice(
   notice.content = payload.content
   db.commit()
   db.refresh(notice)
-  return {
-    "id": notice.id,
-    "title": notice.title,
-    "content": notice.content,
-    "createdAt": notice.created_at.isoformat(),
-  }
+  return serialize_notice(notice)
 
 
 @router.delete("/{notice_id}")
@@ -0,0 +1,31 @@
+from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import PlainTextResponse
+
+from ..core import profiling
+from ..core.security import require_admin
+
+router = APIRouter(prefix="/api/admin/profiles", tags=["admin-profiles"])
+
+
+@router.get("")
+def list_profiles(_: str = Depends(require_admin)):
+  """Stored request profiles, newest first (see core.profiling)"""
+  return profiling.list_profiles()
+
+
+@router.get("/{profile_id}")
+def get_profile(profile_id: str, _: str = Depends(require_admin)):
+  """A profile with its SQL statements and folded stacks"""
+  record = profiling.load_profile(profile_id)
+  if record is None:
+    raise HTTPException(status_code=404, detail="Profile not found")
+  return record
+
+
+@router.get("/{profile_id}/folded", response_class=PlainTextResponse)
+def get_profile_folded(profile_id: str, _: str = Depends(require_admin)):
+  """Folded stacks only, for speedscope or flamegraph.pl"""
+  record = profiling.load_profile(profile_id)
+  if record is None:
+    raise HTTPException(status_code=404, detail="Profile not found")
+  return record["folded"]
@@ -1,6 +1,7 @@
 from fastapi import APIRouter, Depends
 from sqlalchemy.orm import Session
 
+from ..core import threadpool
 from ..core.database import get_db
 from ..core.security import require_admin
 from ..services.administration_service import (
@@ -9,7 +10,7 @@ from ..services.administration_service import (
   get_registration_trends,
 )
 
-router = APIRouter(prefix="/api/reports", tags=["reports"])
+router = APIRouter(prefix="/api/reports", tags=["reports"], dependencies=[Depends(threadpool.limit("reports"))])
 
 
 @router.get("/stats")
@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Depends
+
+from ..core import slow_queries
+from ..core.config import get_settings
+from ..core.security import require_admin
+
+router = APIRouter(prefix="/api/admin/slow-queries", tags=["admin-slow-queries"])
+
+settings = get_settings()
+
+
+@router.get("")
+def list_slow_queries(_: str = Depends(require_admin)):
+  """Statements over SLOW_QUERY_MS on this instance, newest first, with their plans"""
+  return {
+    "thresholdMs": settings.slow_query_ms,
+    "entries": slow_queries.entries(),
+  }
+
+
+@router.delete("")
+def clear_slow_queries(_: str = Depends(require_admin)):
+  slow_queries.clear()
+  return {"success": True}
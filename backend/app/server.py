@@ -0,0 +1,229 @@
+"""Production entrypoint.
+
+Run from the backend directory, e.g. ``python -m app.server --workers 4``.
+
+The app is imported once in a supervisor process and the workers are forked from it, so
+they share the imported code and a broken import fails before any worker starts. Each
+worker is a uvicorn server (uvloop and httptools when installed) on a shared listening
+socket, or on its own port with ``--sticky`` for a proxy that pins Socket.IO polling
+sessions. Socket.IO long-polling needs every request of a session to reach the same
+worker, so several workers on a shared socket require ``--sticky`` or
+``CHAT_SOCKETIO_WEBSOCKET_ONLY=true``. Crashed workers are restarted. On SIGTERM/SIGINT every worker stops accepting,
+disconnects its Socket.IO clients over ``WEB_DRAIN_SECONDS`` so they reconnect elsewhere,
+finishes in-flight requests within ``WEB_GRACEFUL_TIMEOUT_SECONDS`` and runs its lifespan
+shutdown. Periodic jobs claim each run through Redis (``services.cluster``), so they run
+once per cluster however many workers and hosts there are.
+
+With a shared socket, workers keep Prometheus metrics in a shared directory so
+``/metrics`` on any of them covers all of them. uvicorn's own loggers (including the
+access log) go through the app's queued structured logging (``core.logs``).
+"""
+import argparse
+import logging
+import os
+import signal
+import socket
+import sys
+import tempfile
+import time
+
+import uvicorn
+
+from .core import logs
+from .core.config import get_settings
+
+logger = logging.getLogger(__name__)
+
+STARTUP_FAILURE = 3
+
+
+class Worker(uvicorn.Server):
+  """uvicorn server that drains Socket.IO before closing connections and exits with its supervisor"""
+
+  def __init__(self, config: uvicorn.Config, drain_seconds: float, supervisor_pid: int | None = None):
+    super().__init__(config)
+    self.drain_seconds = drain_seconds
+    self.supervisor_pid = supervisor_pid
+
+  async def on_tick(self, counter: int) -> bool:
+    if self.supervisor_pid is not None and counter % 10 == 0 and os.getppid() != self.supervisor_pid:
+      self.should_exit = True
+    return await super().on_tick(counter)
+
+  async def shutdown(self, sockets: list[socket.socket] | None = None) -> None:
+    from .routers import chat
+
+    # Stop accepting first so drained clients reconnect to the other workers
+    for server in self.servers:
+      server.close()
+    await chat.drain(self.drain_seconds)
+    await super().shutdown(sockets)
+
+
+def _config(app, args: argparse.Namespace) -> uvicorn.Config:
+  return uvicorn.Config(
+    app,
+    loop="auto",
+    http="auto",
+    lifespan="on",
+    log_config=None,
+    proxy_headers=True,
+    forwarded_allow_ips=args.forwarded_allow_ips,
+    timeout_graceful_shutdown=args.graceful_timeout,
+  )
+
+
+def _bind(host: str, port: int) -> socket.socket:
+  sock = socket.socket(socket.AF_INET6 if ":" in host else socket.AF_INET, socket.SOCK_STREAM)
+  sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+  sock.bind((host, port))
+  sock.listen(2048)
+  sock.set_inheritable(True)
+  return sock
+
+
+class Supervisor:
+  def __init__(self, app, args: argparse.Namespace, sockets: list[socket.socket]):
+    self.app = app
+    self.args = args
+    self.sockets = sockets
+    self.pid = os.getpid()
+    self.workers: dict[int, int] = {}  # pid -> worker index
+    self.stopping = False
+    self.exit_code = 0
+
+  def spawn(self, index: int):
+    pid = os.fork()
+    if pid:
+      self.workers[pid] = index
+      return
+    code = 1
+    try:
+      # Ctrl-C then only reaches the supervisor, which stops the workers in order
+      os.setpgid(0, 0)
+      # uvicorn handles SIGINT/SIGTERM while serving and re-raises them afterwards; ignoring
+      # them outside of that lets the worker reach the log flush below instead of dying
+      signal.signal(signal.SIGINT, signal.SIG_IGN)
+      signal.signal(signal.SIGTERM, signal.SIG_IGN)
+      signal.signal(signal.SIGALRM, signal.SIG_DFL)
+      server = Worker(_config(self.app, self.args), self.args.drain_seconds, self.pid)
+      server.run(sockets=[self.sockets[index % len(self.sockets)]])
+      code = 0 if server.started else STARTUP_FAILURE
+    except BaseException:
+      logger.exception("Worker %d crashed", os.getpid())
+    finally:
+      # os._exit skips atexit, so write out queued log records first
+      logs.shutdown()
+      os._exit(code)
+
+  def _signal_workers(self, sig: int):
+    for pid in list(self.workers):
+      try:
+        os.kill(pid, sig)
+      except ProcessLookupError:
+        pass
+
+  def stop(self, signum=None, frame=None):
+    if self.stopping:
+      logger.warning("Forcing worker shutdown")
+      self._signal_workers(signal.SIGKILL)
+      return
+    self.stopping = True
+    logger.info("Stopping %d workers", len(self.workers))
+    self._signal_workers(signal.SIGTERM)
+    signal.signal(signal.SIGALRM, lambda *_: self._signal_workers(signal.SIGKILL))
+    signal.alarm(int(self.args.drain_seconds + self.args.graceful_timeout) + 5)
+
+  def run(self) -> int:
+    signal.signal(signal.SIGTERM, self.stop)
+    signal.signal(signal.SIGINT, self.stop)
+    for index in range(self.args.workers):
+      self.spawn(index)
+    while self.workers:
+      try:
+        pid, status = os.wait()
+      except ChildProcessError:
+        break
+      index = self.workers.pop(pid, None)
+      if index is None:
+        continue
+      if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(pid)
+      if self.stopping:
+        continue
+      code = os.waitstatus_to_exitcode(status)
+      if code == STARTUP_FAILURE:
+        logger.error("Worker %d failed to start; shutting down", pid)
+        self.exit_code = STARTUP_FAILURE
+        self.stop()
+        continue
+      logger.warning("Worker %d exited with status %d; restarting", pid, code)
+      time.sleep(1)
+      self.spawn(index)
+    return self.exit_code
+
+
+def build_parser() -> argparse.ArgumentParser:
+  settings = get_settings()
+  parser = argparse.ArgumentParser(prog="python -m app.server", description=settings.project_name)
+  parser.add_argument("--host", default=settings.web_host, help="(default: %(default)s)")
+  parser.add_argument("--port", type=int, default=settings.web_port, help="(default: %(default)s)")
+  parser.add_argument("--workers", type=int, default=settings.web_workers, help="(default: %(default)s)")
+  parser.add_argument("--sticky", action="store_true",
+                      help="Give worker N its own port (port + N) for a proxy with session affinity")
+  parser.add_argument("--drain-seconds", type=float, default=settings.web_drain_seconds,
+                      help="Spread Socket.IO disconnects over this long on shutdown (default: %(default)s)")
+  parser.add_argument("--graceful-timeout", type=int, default=settings.web_graceful_timeout_seconds,
+                      help="Seconds in-flight requests get to finish on shutdown (default: %(default)s)")
+  parser.add_argument("--forwarded-allow-ips", default="127.0.0.1",
+                      help="Proxies trusted for X-Forwarded-* headers (default: %(default)s)")
+  return parser
+
+
+def main(argv: list[str] | None = None) -> int:
+  args = build_parser().parse_args(argv)
+  logs.setup_logging()
+  from .core.redis import REDIS_ENABLED
+
+  if args.workers > 1 and not REDIS_ENABLED:
+    logger.error("REDIS_URL=memory:// only supports a single worker")
+    return 2
+
+  if args.workers > 1 and not args.sticky and not get_settings().chat_socketio_websocket_only:
+    # The kernel spreads a polling session's requests over the workers, which do not know its sid
+    logger.error(
+      "--workers %d on one port breaks Socket.IO long-polling; use --sticky behind a proxy "
+      "with session affinity, or set CHAT_SOCKETIO_WEBSOCKET_ONLY=true", args.workers
+    )
+    return 2
+
+  if args.workers > 1 and not args.sticky:
+    # Workers share a port, so a scrape of /metrics reaches any one of them; with a metrics
+    # directory each reports every worker's (prometheus_client multiprocess mode)
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="prometheus-"))
+
+  # Preload: import once here, fork the workers from this process
+  from .main import app
+
+  if args.workers == 1 and not args.sticky:
+    server = Worker(_config(app, args), args.drain_seconds)
+    server.run(sockets=[_bind(args.host, args.port)])
+    return 0 if server.started else STARTUP_FAILURE
+
+  if not hasattr(os, "fork"):
+    logger.warning("Forking workers is not supported on this platform; starting uvicorn workers without preload")
+    uvicorn.run("app.main:app", host=args.host, port=args.port, workers=args.workers, loop="auto", http="auto",
+                timeout_graceful_shutdown=args.graceful_timeout)
+    return 0
+
+  if args.sticky:
+    sockets = [_bind(args.host, args.port + index) for index in range(args.workers)]
+  else:
+    sockets = [_bind(args.host, args.port)]
+  logger.info("Starting %d workers on %s:%d%s", args.workers, args.host, args.port, " (one port each)" if args.sticky else "")
+  return Supervisor(app, args, sockets).run()
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,37 @@
+"""First admin account.
+
+Run once per deployment with ``python -m app.cli create-admin`` (after ``alembic upgrade
+head``). Workers only call this on boot while ``BOOTSTRAP_ADMIN_ON_STARTUP`` is on, the
+development default.
+"""
+from ..core.config import get_settings
+from ..core.database import SessionLocal
+from ..core.security import get_password_hash
+from ..models.alumni import AlumniProfile
+from ..models.user import User, UserRole
+
+settings = get_settings()
+
+
+def ensure_default_admin(email: str | None = None, password: str | None = None) -> bool:
+  """Create the admin account unless an admin already exists; returns True if one was created"""
+  db = SessionLocal()
+  try:
+    existing = db.query(User).filter(User.role == UserRole.ADMIN).first()
+    if existing:
+      return False
+    admin = User(
+      email=(email or settings.default_admin_email).lower(),
+      first_name="System",
+      last_name="Admin",
+      hashed_password=get_password_hash(password or settings.default_admin_password),
+      role=UserRole.ADMIN,
+      active=True,
+    )
+    profile = AlumniProfile(user=admin, cohort="N/A", phone=None, profession="Administrator", skills=[])
+    db.add(admin)
+    db.add(profile)
+    db.commit()
+    return True
+  finally:
+    db.close()
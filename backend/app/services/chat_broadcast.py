@@ -0,0 +1,110 @@
+"""Delivery of chat events to Socket.IO rooms across instances.
+
+``CHAT_SOCKETIO_MANAGER=local`` (default): events are published on the chat channels of
+the pub/sub bus (Redis, or in-process with ``REDIS_URL=memory://``, see ``chat_bus``) and
+each process's ``redis_listener`` emits them to its own sockets.
+
+``CHAT_SOCKETIO_MANAGER=redis``: the Socket.IO server runs with python-socketio's
+Redis client manager, so an emit from any worker reaches any sid or room on any worker.
+Events are emitted through a write-only manager and ``redis_listener`` is not started.
+
+In both modes, changes a worker must apply to its own sockets (a user leaving a room)
+go out on ``CONTROL_CHANNEL`` of the bus, which every worker's ``control_listener``
+subscribes to.
+"""
+import socketio
+
+from ..core.config import get_settings
+from ..core.prometheus import chat_publish_duration
+from ..core.redis import REDIS_ENABLED
+from ..utils import wire
+from .chat_bus import bus
+
+settings = get_settings()
+
+if settings.chat_socketio_manager not in ("local", "redis"):
+  raise RuntimeError(f"Unknown CHAT_SOCKETIO_MANAGER {settings.chat_socketio_manager!r}")
+
+USE_CLIENT_MANAGER = settings.chat_socketio_manager == "redis"
+
+if USE_CLIENT_MANAGER and not REDIS_ENABLED:
+  raise RuntimeError("CHAT_SOCKETIO_MANAGER=redis needs a redis:// REDIS_URL")
+
+CONTROL_CHANNEL = "chat_control"
+
+_async_emitter: socketio.AsyncRedisManager | None = None
+_sync_emitter: socketio.RedisManager | None = None
+
+
+def room_channels(room_id: str | None) -> tuple[str, str]:
+  """Redis channels (messages, events) for a room; the general room keeps the original names"""
+  if room_id is None:
+    return "chat_messages", "chat_events"
+  return f"chat_messages:{room_id}", f"chat_events:{room_id}"
+
+
+def sio_room(room_id: str | None) -> str:
+  return "chat_room" if room_id is None else f"room_{room_id}"
+
+
+def create_client_manager() -> socketio.AsyncRedisManager | None:
+  """Client manager for the Socket.IO server, or None for single-process delivery"""
+  if not USE_CLIENT_MANAGER:
+    return None
+  return socketio.AsyncRedisManager(settings.redis_url, channel=settings.chat_socketio_channel)
+
+
+def _payload(event: str, data: dict) -> tuple[int, dict]:
+  """Channel index and payload in the format redis_listener expects"""
+  if event == "message":
+    return 0, data
+  return 1, {"event": event, "data": data}
+
+
+async def publish(event: str, data: dict, room_id: str | None = None):
+  """Deliver an event to every socket in a chat room, whichever worker it is connected to"""
+  with chat_publish_duration.labels("async").time():
+    if USE_CLIENT_MANAGER:
+      global _async_emitter
+      if _async_emitter is None:
+        _async_emitter = socketio.AsyncRedisManager(
+          settings.redis_url, channel=settings.chat_socketio_channel, write_only=True
+        )
+      await _async_emitter.emit(event, data, room=sio_room(room_id))
+      return
+    index, payload = _payload(event, data)
+    await bus.publish(room_channels(room_id)[index], wire.encode(payload))
+
+
+def publish_sync(event: str, data: dict, room_id: str | None = None):
+  """Same as ``publish`` for sync (threadpool) endpoints"""
+  with chat_publish_duration.labels("sync").time():
+    if USE_CLIENT_MANAGER:
+      global _sync_emitter
+      if _sync_emitter is None:
+        _sync_emitter = socketio.RedisManager(
+          settings.redis_url, channel=settings.chat_socketio_channel, write_only=True
+        )
+      _sync_emitter.emit(event, data, room=sio_room(room_id))
+      return
+    index, payload = _payload(event, data)
+    bus.publish_sync(room_channels(room_id)[index], wire.encode(payload))
+
+
+def publish_many_sync(events: list[tuple[str, dict, str | None]]):
+  """Publish (event, data, room_id) items in order, in one Redis round trip where possible"""
+  if USE_CLIENT_MANAGER:
+    for event, data, room_id in events:
+      publish_sync(event, data, room_id)
+    return
+  items = []
+  for event, data, room_id in events:
+    index, payload = _payload(event, data)
+    items.append((room_channels(room_id)[index], wire.encode(payload)))
+  with chat_publish_duration.labels("batch").time():
+    bus.publish_many_sync(items)
+
+
+def publish_control_sync(action: str, data: dict):
+  """Ask every worker to apply ``action`` to its own sockets (from sync endpoints)"""
+  bus.publish_sync(CONTROL_CHANNEL, wire.encode({"action": action, "data": data}))
@@ -0,0 +1,117 @@
+"""Pub/sub transport behind chat broadcasting.
+
+``REDIS_URL=redis://...`` uses Redis channels, so every worker and host sees every
+event. ``REDIS_URL=memory://`` uses an in-process asyncio bus instead: events never
+leave the process, which is all a single-worker deployment needs, and chat runs with
+no Redis server at all.
+
+Both backends expose ``publish`` (on the event loop), ``publish_sync`` /
+``publish_many_sync`` (from threadpool endpoints and the outbox relay) and ``pubsub()``,
+whose result has the subset of redis-py's async PubSub API ``redis_listener`` uses.
+"""
+import asyncio
+import threading
+from typing import Dict
+
+from ..core.config import get_settings
+from ..core.redis import REDIS_ENABLED, get_pubsub_redis, get_redis, get_sync_redis
+
+settings = get_settings()
+
+
+class BusNotReady(RuntimeError):
+  """Raised by the in-process bus before any listener exists, so callers can retry
+  instead of losing the items (the outbox relay keeps its rows)"""
+
+
+class RedisBus:
+  async def publish(self, channel: str, data: str | bytes):
+    redis = await get_redis()
+    await redis.publish(channel, data)
+
+  def publish_sync(self, channel: str, data: str | bytes):
+    get_sync_redis().publish(channel, data)
+
+  def publish_many_sync(self, items: list[tuple[str, str | bytes]]):
+    pipe = get_sync_redis().pipeline(transaction=False)
+    for channel, data in items:
+      pipe.publish(channel, data)
+    pipe.execute()
+
+  async def pubsub(self):
+    redis = await get_pubsub_redis()
+    return redis.pubsub()
+
+
+class MemoryPubSub:
+  def __init__(self, bus: "MemoryBus"):
+    self._bus = bus
+    self._queue: asyncio.Queue = asyncio.Queue()
+    self.channels: set[str] = set()
+
+  async def subscribe(self, *channels: str):
+    self._bus._attach(self, channels)
+
+  async def unsubscribe(self, *channels: str):
+    self._bus._detach(self, channels)
+
+  async def get_message(self, ignore_subscribe_messages: bool = True, timeout: float | None = 0.0):
+    try:
+      return await asyncio.wait_for(self._queue.get(), timeout)
+    except asyncio.TimeoutError:
+      return None
+
+  async def close(self):
+    self._bus._detach(self, list(self.channels))
+
+  def _deliver(self, channel: str, data: str | bytes):
+    self._queue.put_nowait({"type": "message", "channel": channel, "data": data})
+
+
+class MemoryBus:
+  def __init__(self):
+    self._subscribers: Dict[str, set[MemoryPubSub]] = {}
+    self._lock = threading.Lock()
+    self._loop: asyncio.AbstractEventLoop | None = None
+
+  def _attach(self, pubsub: MemoryPubSub, channels):
+    with self._lock:
+      for channel in channels:
+        self._subscribers.setdefault(channel, set()).add(pubsub)
+        pubsub.channels.add(channel)
+
+  def _detach(self, pubsub: MemoryPubSub, channels):
+    with self._lock:
+      for channel in channels:
+        subscribers = self._subscribers.get(channel)
+        if subscribers:
+          subscribers.discard(pubsub)
+          if not subscribers:
+            del self._subscribers[channel]
+        pubsub.channels.discard(channel)
+
+  def _deliver(self, items: list[tuple[str, str | bytes]]):
+    with self._lock:
+      targets = [(list(self._subscribers.get(channel, ())), channel, data) for channel, data in items]
+    for subscribers, channel, data in targets:
+      for pubsub in subscribers:
+        pubsub._deliver(channel, data)
+
+  async def publish(self, channel: str, data: str | bytes):
+    self._deliver([(channel, data)])
+
+  def publish_sync(self, channel: str, data: str | bytes):
+    self.publish_many_sync([(channel, data)])
+
+  def publish_many_sync(self, items: list[tuple[str, str | bytes]]):
+    # asyncio queues are not thread-safe; hand delivery to the loop the listener runs on
+    if self._loop is None:
+      raise BusNotReady("No listener has started on the in-process chat bus yet")
+    self._loop.call_soon_threadsafe(self._deliver, items)
+
+  async def pubsub(self) -> MemoryPubSub:
+    self._loop = asyncio.get_running_loop()
+    return MemoryPubSub(self)
+
+
+bus: RedisBus | MemoryBus = RedisBus() if REDIS_ENABLED else MemoryBus()
@@ -0,0 +1,199 @@
+"""Hot cache of the most recent chat messages.
+
+The newest messages are kept in a capped Redis list (newest first) so opening the chat
+does not run an ORDER BY/LIMIT on ``chat_messages`` every time. The list is filled from
+the database on a cold read and afterwards kept current by the socket ``message``
+handler and the edit/delete endpoints; clearing and retention invalidate it. A companion ``complete`` flag records that
+the list holds the entire history, so short histories are served from Redis as well.
+Each room has its own list; ``room_id=None`` is the general room. Any Redis error falls
+back to the database, and without Redis (``REDIS_URL=memory://``) the cache is off.
+
+Every change to a room's list (even a push skipped on a cold cache) bumps the room's
+``version`` key, and clearing or invalidating bumps a global generation. A cold read
+watches both while it queries the database, so a fill that raced with a new message,
+an edit or a clear is dropped instead of caching a stale list for the whole TTL. The
+counters expire like the lists: a fill only needs them to outlive its own query.
+"""
+import json
+import logging
+
+from redis.exceptions import RedisError, WatchError
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..core.config import get_settings
+from ..core.redis import REDIS_ENABLED, get_redis, get_sync_redis
+from ..models.chat import ChatMessage
+from ..utils.serializers import serialize_chat_message
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+ENABLED = REDIS_ENABLED and settings.chat_cache_size > 0
+
+RECENT_KEY = "chat:recent"
+ROOM_KEY_PREFIX = "chat:recent:room:"
+GENERATION_KEY = "chat:recent:generation"
+
+
+def _keys(room_id: str | None) -> tuple[str, str, str]:
+  """(list, complete flag, version) keys of a room's cache"""
+  key = RECENT_KEY if room_id is None else f"{ROOM_KEY_PREFIX}{room_id}"
+  return key, f"{key}:complete", f"{key}:version"
+
+
+# Push only onto a warm cache; a cold one is rebuilt from the database on the next read.
+# The version changes either way, so a rebuild that read the database earlier is dropped.
+_PUSH_SCRIPT = """
+redis.call('INCR', KEYS[3])
+redis.call('EXPIRE', KEYS[3], tonumber(ARGV[3]))
+if redis.call('EXISTS', KEYS[1]) == 0 and redis.call('EXISTS', KEYS[2]) == 0 then
+  return 0
+end
+redis.call('LPUSH', KEYS[1], ARGV[1])
+if redis.call('LLEN', KEYS[1]) > tonumber(ARGV[2]) then
+  redis.call('LTRIM', KEYS[1], 0, tonumber(ARGV[2]) - 1)
+  redis.call('DEL', KEYS[2])
+end
+return 1
+"""
+
+# Replace (ARGV[2] non-empty) or remove (ARGV[2] empty) the entry whose id is ARGV[1].
+_REPLACE_SCRIPT = """
+redis.call('INCR', KEYS[2])
+redis.call('EXPIRE', KEYS[2], tonumber(ARGV[3]))
+local items = redis.call('LRANGE', KEYS[1], 0, -1)
+for i, raw in ipairs(items) do
+  if cjson.decode(raw)['id'] == ARGV[1] then
+    if ARGV[2] == '' then
+      redis.call('LREM', KEYS[1], 1, raw)
+    else
+      redis.call('LSET', KEYS[1], i - 1, ARGV[2])
+    end
+    return 1
+  end
+end
+return 0
+"""
+
+
+def _load_from_db(db: Session, room_id: str | None, limit: int, before=None) -> list[dict]:
+  """Newest-first messages straight from the database"""
+  query = (
+    select(ChatMessage)
+    .where(ChatMessage.room_id.is_(None) if room_id is None else ChatMessage.room_id == room_id)
+    .order_by(ChatMessage.created_at.desc())
+    .limit(limit)
+  )
+  if before is not None:
+    query = query.where(ChatMessage.created_at < before)
+  return [serialize_chat_message(msg) for msg in db.execute(query).scalars().all()]
+
+
+def _fill(pipe, room_id: str | None, rows: list[dict]):
+  """Queue the commands replacing a room's list with ``rows`` on a MULTI pipeline"""
+  recent_key, complete_key, _ = _keys(room_id)
+  pipe.delete(recent_key, complete_key)
+  if rows:
+    pipe.rpush(recent_key, *[json.dumps(row) for row in rows])
+    pipe.expire(recent_key, settings.chat_cache_ttl_seconds)
+  if len(rows) < settings.chat_cache_size:
+    pipe.set(complete_key, 1, ex=settings.chat_cache_ttl_seconds)
+
+
+def _load_and_fill(db: Session, room_id: str | None) -> list[dict]:
+  """Read a cold room from the database and cache it unless it changed meanwhile"""
+  with get_sync_redis().pipeline(transaction=True) as pipe:
+    pipe.watch(_keys(room_id)[2], GENERATION_KEY)
+    rows = _load_from_db(db, room_id, settings.chat_cache_size)
+    pipe.multi()
+    _fill(pipe, room_id, rows)
+    try:
+      pipe.execute()
+    except WatchError:
+      # A message, edit or clear landed after the read; the next read fills the cache
+      pass
+  return rows
+
+
+def get_recent_messages(db: Session, limit: int, before=None, room_id: str | None = None) -> list[dict]:
+  """Return up to ``limit`` messages of a room in chronological order.
+
+  Pages older than ``before`` and requests larger than the cache go to the database.
+  """
+  size = settings.chat_cache_size
+  if not ENABLED or before is not None or limit > size:
+    return list(reversed(_load_from_db(db, room_id, limit, before)))
+
+  recent_key, complete_key, _ = _keys(room_id)
+  try:
+    redis = get_sync_redis()
+    pipe = redis.pipeline(transaction=False)
+    pipe.lrange(recent_key, 0, limit - 1)
+    pipe.exists(complete_key)
+    items, complete = pipe.execute()
+    if len(items) == limit or complete:
+      return [json.loads(raw) for raw in reversed(items)]
+
+    rows = _load_and_fill(db, room_id)
+  except RedisError as e:
+    logger.warning("Chat cache unavailable, reading from database: %s", e)
+    rows = _load_from_db(db, room_id, limit)
+  return list(reversed(rows[:limit]))
+
+
+async def push_message(message: ChatMessage):
+  """Add a newly stored message to the head of the cache (called from the socket handler)"""
+  if not ENABLED:
+    return
+  try:
+    redis = await get_redis()
+    await redis.eval(
+      _PUSH_SCRIPT, 3, *_keys(message.room_id),
+      json.dumps(serialize_chat_message(message)), settings.chat_cache_size, settings.chat_cache_ttl_seconds,
+    )
+  except RedisError as e:
+    logger.warning("Error updating chat cache: %s", e)
+
+
+def replace_message(data: dict):
+  """Swap in an edited message, given in ``serialize_chat_message`` form"""
+  if not ENABLED:
+    return
+  try:
+    recent_key, _, version_key = _keys(data["room_id"])
+    get_sync_redis().eval(
+      _REPLACE_SCRIPT, 2, recent_key, version_key, data["id"], json.dumps(data), settings.chat_cache_ttl_seconds,
+    )
+  except RedisError as e:
+    logger.warning("Error updating chat cache: %s", e)
+
+
+def remove_message(message_id: str, room_id: str | None = None):
+  if not ENABLED:
+    return
+  try:
+    recent_key, _, version_key = _keys(room_id)
+    get_sync_redis().eval(
+      _REPLACE_SCRIPT, 2, recent_key, version_key, message_id, "", settings.chat_cache_ttl_seconds,
+    )
+  except RedisError as e:
+    logger.warning("Error updating chat cache: %s", e)
+
+
+def invalidate():
+  """Drop every cached history so the next read reloads it from the database"""
+  if not ENABLED:
+    return
+  try:
+    redis = get_sync_redis()
+    with redis.pipeline(transaction=True) as pipe:
+      pipe.incr(GENERATION_KEY)
+      pipe.expire(GENERATION_KEY, settings.chat_cache_ttl_seconds)
+      pipe.execute()
+    stale = list(_keys(None))
+    stale += list(redis.scan_iter(match=f"{ROOM_KEY_PREFIX}*", count=500))
+    redis.delete(*stale)
+  except RedisError as e:
+    logger.warning("Error invalidating chat cache: %s", e)
@@ -0,0 +1,106 @@
+"""Idempotent chat sends.
+
+A client may attach a ``client_id`` to a message and retry it after a reconnect. The
+message id it produced is cached under (sender, client_id) for
+``chat_dedupe_ttl_seconds`` (Redis, or a bounded in-process LRU without Redis), so a
+retry is answered without touching the database. The ``chat_message_keys`` unique
+constraint, written in the message's transaction, is the backstop when the cache
+misses or two attempts race. Its rows are only needed for the same window, so
+``run_key_pruning_periodically`` deletes expired ones every
+``chat_dedupe_prune_interval_minutes`` on one worker of the cluster.
+"""
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta, timezone
+
+import anyio.to_thread
+from redis.exceptions import RedisError
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from ..core.config import get_settings
+from ..core.database import SessionLocal
+from ..core.redis import REDIS_ENABLED, get_redis
+from ..models.chat import ChatMessageKey
+from . import cluster
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+KEY_PREFIX = "chat:dedupe:"
+LOCAL_CACHE_SIZE = 10000
+
+# (user_id, client_id) -> (message_id, expires at)
+_local: "OrderedDict[tuple[str, str], tuple[str, float]]" = OrderedDict()
+
+
+def _key(user_id: str, client_id: str) -> str:
+  return f"{KEY_PREFIX}{user_id}:{client_id}"
+
+
+async def lookup(user_id: str, client_id: str) -> str | None:
+  """Message id already stored for this client id, if the cache knows it"""
+  if not REDIS_ENABLED:
+    entry = _local.get((user_id, client_id))
+    if entry is None or entry[1] < time.monotonic():
+      return None
+    return entry[0]
+  try:
+    redis = await get_redis()
+    return await redis.get(_key(user_id, client_id))
+  except RedisError as e:
+    logger.warning("Dedupe cache unavailable: %s", e)
+    return None
+
+
+async def remember(user_id: str, client_id: str, message_id: str):
+  ttl = settings.chat_dedupe_ttl_seconds
+  if not REDIS_ENABLED:
+    _local[(user_id, client_id)] = (message_id, time.monotonic() + ttl)
+    _local.move_to_end((user_id, client_id))
+    while len(_local) > LOCAL_CACHE_SIZE:
+      _local.popitem(last=False)
+    return
+  try:
+    redis = await get_redis()
+    await redis.set(_key(user_id, client_id), message_id, ex=ttl)
+  except RedisError as e:
+    logger.warning("Error updating dedupe cache: %s", e)
+
+
+def stored_message_id(db: Session, user_id: str, client_id: str) -> str | None:
+  """Message id recorded in the database for this client id"""
+  return db.execute(
+    select(ChatMessageKey.message_id).where(ChatMessageKey.sender_id == user_id, ChatMessageKey.client_id == client_id)
+  ).scalar_one_or_none()
+
+
+def prune_keys(db: Session, older_than_seconds: int | None = None) -> int:
+  """Delete idempotency keys past the dedupe window"""
+  older_than_seconds = older_than_seconds or settings.chat_dedupe_ttl_seconds
+  cutoff = datetime.now(timezone.utc) - timedelta(seconds=older_than_seconds)
+  result = db.execute(delete(ChatMessageKey).where(ChatMessageKey.created_at < cutoff))
+  db.commit()
+  return result.rowcount
+
+
+async def run_key_pruning_periodically(interval_seconds: int):
+  def run_once() -> int:
+    db = SessionLocal()
+    try:
+      return prune_keys(db)
+    finally:
+      db.close()
+
+  while True:
+    try:
+      if await cluster.claim("chat-dedupe-prune", interval_seconds):
+        pruned = await anyio.to_thread.run_sync(run_once)
+        if pruned:
+          logger.info("Pruned %d expired chat message keys", pruned)
+    except Exception:
+      logger.exception("Error pruning chat message keys")
+    await asyncio.sleep(interval_seconds)
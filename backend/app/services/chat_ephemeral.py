@@ -0,0 +1,97 @@
+"""Ephemeral chat events: typing indicators and presence changes.
+
+These are never persisted and never go through the outbox. Typing updates are throttled
+per user and room on the way in (a repeat of the same state is dropped until
+``chat_typing_throttle_ms`` has passed), then every pending change in a room is merged
+over ``chat_ephemeral_window_ms`` and published once: a single change as its own event,
+several as one ``message_batch``. A user who types, pauses and stops within a window
+costs one publish, and a busy room costs one publish per window however many people
+are typing.
+"""
+import asyncio
+import logging
+import time
+from typing import Dict
+
+from ..core.config import get_settings
+from ..core.prometheus import chat_ephemeral_updates
+from . import chat_broadcast
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+# room_id -> {(event, user_id): data}; insertion order is publish order
+_pending: Dict[str | None, Dict[tuple[str, str], dict]] = {}
+# (user_id, room_id) -> (typing, monotonic time the state was last accepted)
+_last_typing: Dict[tuple[str, str | None], tuple[bool, float]] = {}
+_wakeup: asyncio.Event | None = None
+
+
+def _queue(room_id: str | None, event: str, user_id: str, data: dict):
+  room = _pending.setdefault(room_id, {})
+  # A newer state replaces an unsent older one instead of queueing behind it
+  room.pop((event, user_id), None)
+  room[(event, user_id)] = data
+  if _wakeup is not None:
+    _wakeup.set()
+
+
+def typing(room_id: str | None, user_id: str, user_name: str, is_typing: bool) -> bool:
+  """Record a typing update; returns False when it was throttled"""
+  chat_ephemeral_updates.labels("received").inc()
+  now = time.monotonic()
+  last = _last_typing.get((user_id, room_id))
+  if last is not None and last[0] == is_typing and now - last[1] < settings.chat_typing_throttle_ms / 1000:
+    chat_ephemeral_updates.labels("throttled").inc()
+    return False
+  if last is None and not is_typing:
+    # Nobody was told this user was typing here
+    return False
+  if is_typing:
+    _last_typing[(user_id, room_id)] = (True, now)
+  else:
+    _last_typing.pop((user_id, room_id), None)
+  _queue(room_id, "typing", user_id, {
+    "room_id": room_id, "user_id": user_id, "name": user_name, "typing": is_typing,
+  })
+  return True
+
+
+def stop_typing(user_id: str, user_name: str):
+  """Clear every typing indicator a user has showing, e.g. when a socket disconnects"""
+  for key in [key for key in _last_typing if key[0] == user_id]:
+    typing(key[1], user_id, user_name, False)
+
+
+def presence_changed(user_id: str, status: str):
+  chat_ephemeral_updates.labels("received").inc()
+  _queue(None, "presence_changed", user_id, {"user_id": user_id, "status": status})
+
+
+async def flush():
+  global _pending
+  pending, _pending = _pending, {}
+  for room_id, updates in pending.items():
+    items = [{"event": event, "data": data} for (event, _), data in updates.items()]
+    if len(items) == 1:
+      await chat_broadcast.publish(items[0]["event"], items[0]["data"], room_id)
+    else:
+      await chat_broadcast.publish("message_batch", items, room_id)
+    chat_ephemeral_updates.labels("published").inc()
+
+
+async def run():
+  """Publish pending updates once per window, sleeping while there are none"""
+  global _wakeup
+  _wakeup = asyncio.Event()
+  while True:
+    await _wakeup.wait()
+    await asyncio.sleep(settings.chat_ephemeral_window_ms / 1000)
+    _wakeup.clear()
+    try:
+      await flush()
+    except asyncio.CancelledError:
+      raise
+    except Exception:
+      logger.exception("Error publishing ephemeral chat events")
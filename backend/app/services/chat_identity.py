@@ -0,0 +1,128 @@
+"""Cached per-user chat identity for socket connects.
+
+The handshake JWT already says who the user is; what a connect still needs from the
+database is that the user exists and which cohort/group rooms to join. That lookup is
+cached for ``chat_identity_cache_seconds`` (in Redis so every worker shares it, or in
+process without Redis), concurrent misses for the same user share one query, and the
+query runs in a worker thread instead of blocking the event loop. Room membership
+endpoints and the admin user endpoints call ``invalidate`` so changes apply on the next
+connect.
+
+The token's ``name`` and ``role`` claims are not used for this: they are as old as the
+token (a day by default), and the lookup is needed anyway for the rooms and to refuse
+deleted users. ``name`` is only a fallback for a user without one.
+"""
+import asyncio
+import json
+import logging
+import time
+from collections import OrderedDict
+from typing import Dict
+
+import anyio.to_thread
+from redis.exceptions import RedisError
+
+from ..core.config import get_settings
+from ..core.database import SessionLocal
+from ..core.redis import REDIS_ENABLED, get_redis, get_sync_redis
+from ..models.user import User
+from . import chat_rooms
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+KEY_PREFIX = "chat:identity:"
+LOCAL_CACHE_SIZE = 10000
+
+# user_id -> (expires at, identity), least recently stored first; used when there is no Redis
+_local: "OrderedDict[str, tuple[float, dict]]" = OrderedDict()
+_inflight: Dict[str, asyncio.Future] = {}
+
+
+def _load(user_id: str) -> dict | None:
+  db = SessionLocal()
+  try:
+    user = db.get(User, user_id)
+    if user is None:
+      return None
+    return {
+      "name": f"{user.first_name} {user.last_name}",
+      "role": user.role.value,
+      "rooms": [room.id for room in chat_rooms.get_user_rooms(db, user)],
+    }
+  finally:
+    db.close()
+
+
+async def _cached(user_id: str) -> dict | None:
+  if not REDIS_ENABLED:
+    entry = _local.get(user_id)
+    return entry[1] if entry and entry[0] > time.monotonic() else None
+  try:
+    redis = await get_redis()
+    raw = await redis.get(f"{KEY_PREFIX}{user_id}")
+  except RedisError as e:
+    logger.warning("Identity cache unavailable: %s", e)
+    return None
+  return json.loads(raw) if raw else None
+
+
+async def _store(user_id: str, identity: dict):
+  ttl = settings.chat_identity_cache_seconds
+  if not REDIS_ENABLED:
+    _local[user_id] = (time.monotonic() + ttl, identity)
+    _local.move_to_end(user_id)
+    while len(_local) > LOCAL_CACHE_SIZE:
+      _local.popitem(last=False)
+    return
+  try:
+    redis = await get_redis()
+    await redis.set(f"{KEY_PREFIX}{user_id}", json.dumps(identity), ex=ttl)
+  except RedisError as e:
+    logger.warning("Error updating identity cache: %s", e)
+
+
+async def get_identity(user_id: str) -> dict | None:
+  """{name, role, rooms} for an existing user, or None if the user does not exist"""
+  identity = await _cached(user_id)
+  if identity is not None:
+    return identity
+
+  pending = _inflight.get(user_id)
+  if pending is not None:
+    return await asyncio.shield(pending)
+
+  future = asyncio.get_running_loop().create_future()
+  _inflight[user_id] = future
+  try:
+    identity = await anyio.to_thread.run_sync(_load, user_id)
+    if identity is not None:
+      await _store(user_id, identity)
+  except asyncio.CancelledError:
+    future.cancel()
+    raise
+  except Exception as e:
+    future.set_exception(e)
+    # Mark retrieved so a failure nobody else awaited is not logged as unhandled
+    future.exception()
+    raise
+  else:
+    future.set_result(identity)
+    return identity
+  finally:
+    del _inflight[user_id]
+
+
+def invalidate(*user_ids: str):
+  """Forget cached identities (called from sync endpoints after membership or account changes)"""
+  if not user_ids:
+    return
+  if not REDIS_ENABLED:
+    for user_id in user_ids:
+      _local.pop(user_id, None)
+    return
+  try:
+    get_sync_redis().delete(*(f"{KEY_PREFIX}{user_id}" for user_id in user_ids))
+  except RedisError as e:
+    logger.warning("Error invalidating identity cache: %s", e)
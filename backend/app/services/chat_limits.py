@@ -0,0 +1,149 @@
+"""Per-connection rate limiting and slow-consumer backpressure for chat.
+
+Incoming messages pass a local token bucket per sid, then a Redis-shared bucket per
+user so several tabs or workers cannot multiply a user's allowance. Redis errors fail
+open. Outbound, engine.io queues are unbounded, so fanout checks the pending packet
+count of each recipient of an emit and skips (``drop``) or disconnects (``disconnect``)
+sockets above ``chat_outbound_queue_limit``.
+"""
+import logging
+import time
+from typing import Dict
+
+from redis.exceptions import RedisError
+
+from ..core.config import get_settings
+from ..core import prometheus
+from ..core.redis import REDIS_ENABLED, get_redis
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+if settings.chat_slow_consumer_policy not in ("drop", "disconnect"):
+  raise RuntimeError(f"Unknown CHAT_SLOW_CONSUMER_POLICY {settings.chat_slow_consumer_policy!r}")
+
+USER_BUCKET_PREFIX = "chat:ratelimit:"
+
+_TOKEN_BUCKET_SCRIPT = """
+local rate = tonumber(ARGV[1])
+local burst = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or burst
+local ts = tonumber(state[2]) or now
+tokens = math.min(burst, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+end
+redis.call('HSET', KEYS[1], 'tokens', tokens, 'ts', now)
+redis.call('EXPIRE', KEYS[1], math.ceil(burst / rate) + 1)
+return allowed
+"""
+
+
+class TokenBucket:
+  def __init__(self, rate: float, burst: int):
+    self.rate = rate
+    self.burst = burst
+    self.tokens = float(burst)
+    self.updated = time.monotonic()
+
+  def take(self) -> bool:
+    now = time.monotonic()
+    self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+    self.updated = now
+    if self.tokens >= 1:
+      self.tokens -= 1
+      return True
+    return False
+
+
+# sid -> bucket for sockets connected to this process
+_sid_buckets: Dict[str, TokenBucket] = {}
+# user_id -> bucket when there is no Redis to share buckets through (single process)
+_user_buckets: Dict[str, TokenBucket] = {}
+_user_buckets_swept = time.monotonic()
+
+
+def _sweep_user_buckets(now: float):
+  """Drop buckets idle long enough to have refilled; a new bucket starts full anyway.
+
+  Runs at most once per refill period, like the EXPIRE on the Redis buckets.
+  """
+  global _user_buckets_swept
+  idle = settings.chat_user_rate_limit_burst / settings.chat_user_rate_limit_per_second
+  if now - _user_buckets_swept < idle:
+    return
+  _user_buckets_swept = now
+  for user_id, bucket in list(_user_buckets.items()):
+    if now - bucket.updated >= idle:
+      del _user_buckets[user_id]
+
+
+def _throttled(scope: str):
+  prometheus.chat_throttled.labels(scope).inc()
+
+
+async def allow_message(sid: str, user_id: str) -> bool:
+  """Whether a socket may send another message right now"""
+  if settings.chat_rate_limit_per_second > 0:
+    bucket = _sid_buckets.get(sid)
+    if bucket is None:
+      bucket = _sid_buckets[sid] = TokenBucket(settings.chat_rate_limit_per_second, settings.chat_rate_limit_burst)
+    if not bucket.take():
+      _throttled("socket")
+      return False
+
+  if settings.chat_user_rate_limit_per_second > 0 and not REDIS_ENABLED:
+    _sweep_user_buckets(time.monotonic())
+    bucket = _user_buckets.get(user_id)
+    if bucket is None:
+      bucket = _user_buckets[user_id] = TokenBucket(
+        settings.chat_user_rate_limit_per_second, settings.chat_user_rate_limit_burst
+      )
+    if not bucket.take():
+      _throttled("user")
+      return False
+  elif settings.chat_user_rate_limit_per_second > 0:
+    try:
+      redis = await get_redis()
+      allowed = await redis.eval(
+        _TOKEN_BUCKET_SCRIPT, 1, f"{USER_BUCKET_PREFIX}{user_id}",
+        settings.chat_user_rate_limit_per_second, settings.chat_user_rate_limit_burst, time.time(),
+      )
+    except RedisError as e:
+      logger.warning("Rate limit check unavailable, allowing message: %s", e)
+      return True
+    if not int(allowed):
+      _throttled("user")
+      return False
+  return True
+
+
+def forget(sid: str):
+  _sid_buckets.pop(sid, None)
+
+
+async def slow_consumers(sio, room: str) -> list[str]:
+  """Sids in ``room`` on this worker whose outbound queue is over the limit.
+
+  Only the recipients of the emit are looked at, not every connected socket. Under the
+  disconnect policy the slow ones are disconnected here.
+  """
+  limit = settings.chat_outbound_queue_limit
+  if limit <= 0:
+    return []
+  slow = []
+  for sid, eio_sid in sio.manager.get_participants("/", room):
+    queue = getattr(sio.eio.sockets.get(eio_sid), "queue", None)
+    if queue is not None and queue.qsize() > limit:
+      slow.append(sid)
+
+  if slow and settings.chat_slow_consumer_policy == "disconnect":
+    for sid in slow:
+      prometheus.chat_slow_disconnects.inc()
+      await sio.disconnect(sid)
+  return slow
@@ -0,0 +1,95 @@
+"""Transactional outbox for chat events.
+
+Endpoints ``enqueue`` an event on their own session before committing, so a change and
+its event are stored atomically and the request never waits on Redis. The relay
+publishes pending rows in id order, one pipelined round trip per batch, applies the
+matching cache update and deletes the rows only after Redis accepted them. Delivery is
+at-least-once; every payload carries ``seq`` (the row id) so clients can drop repeats.
+"""
+import asyncio
+import logging
+
+import anyio.to_thread
+from sqlalchemy import delete, select
+from sqlalchemy.orm import Session
+
+from ..core.config import get_settings
+from ..core.database import SessionLocal
+from ..models.chat import ChatOutbox
+from . import chat_broadcast, chat_bus, chat_cache
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+_loop: asyncio.AbstractEventLoop | None = None
+_wakeup: asyncio.Event | None = None
+
+
+def enqueue(db: Session, event: str, data: dict, room_id: str | None = None):
+  """Stage an event in the caller's transaction; it is relayed once the caller commits"""
+  db.add(ChatOutbox(event=event, room_id=room_id, payload=data))
+
+
+def notify():
+  """Wake the relay right after a commit instead of at its next poll (safe from any thread)"""
+  if _loop is not None and _wakeup is not None:
+    _loop.call_soon_threadsafe(_wakeup.set)
+
+
+def _apply_to_cache(event: str, data: dict, room_id: str | None):
+  if event == "message_updated":
+    chat_cache.replace_message({key: value for key, value in data.items() if key != "edited"})
+  elif event == "message_deleted":
+    chat_cache.remove_message(data["id"], room_id)
+  elif event == "messages_cleared":
+    # Not filled as empty: the rows are deleted later by a background task, and a message
+    # sent meanwhile must stay visible. The delete invalidates again when it finishes.
+    chat_cache.invalidate()
+
+
+def relay_once(batch_size: int) -> int:
+  """Publish one batch of pending events; returns how many were relayed"""
+  db = SessionLocal()
+  try:
+    # Row locks keep relays on other workers from publishing the same batch out of order
+    rows = db.execute(
+      select(ChatOutbox).order_by(ChatOutbox.id).limit(batch_size).with_for_update()
+    ).scalars().all()
+    if not rows:
+      return 0
+    for row in rows:
+      _apply_to_cache(row.event, row.payload, row.room_id)
+    chat_broadcast.publish_many_sync([
+      (row.event, {**row.payload, "seq": row.id}, row.room_id) for row in rows
+    ])
+    db.execute(delete(ChatOutbox).where(ChatOutbox.id.in_([row.id for row in rows])))
+    db.commit()
+    return len(rows)
+  finally:
+    db.close()
+
+
+async def run_relay():
+  """Relay the outbox until cancelled, polling every chat_outbox_poll_ms or when nudged"""
+  global _loop, _wakeup
+  _loop = asyncio.get_running_loop()
+  _wakeup = asyncio.Event()
+  poll = settings.chat_outbox_poll_ms / 1000
+
+  while True:
+    _wakeup.clear()
+    try:
+      relayed = await anyio.to_thread.run_sync(relay_once, settings.chat_outbox_batch_size)
+    except chat_bus.BusNotReady:
+      # Startup: the rows stay in the outbox until the listener is running
+      relayed = 0
+    except Exception:
+      logger.exception("Error relaying chat outbox")
+      relayed = 0
+    if relayed >= settings.chat_outbox_batch_size:
+      continue
+    try:
+      await asyncio.wait_for(_wakeup.wait(), poll)
+    except asyncio.TimeoutError:
+      pass
@@ -0,0 +1,277 @@
+"""Chat message retention and archival.
+
+On PostgreSQL ``chat_messages`` is range-partitioned by month (``chat_messages_pYYYYMM``
+plus a default partition, see the ``partition_chat_messages`` migration). Expired
+partitions are exported to gzip-compressed NDJSON and then detached and dropped, which
+needs no row-by-row DELETE. Rows that are not in a droppable partition (the default
+partition, or any row on SQLite) are archived and deleted in bounded batches, so no
+single statement locks the whole table.
+"""
+import asyncio
+import gzip
+import json
+import logging
+import os
+import re
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+import anyio.to_thread
+from sqlalchemy import delete, select, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from ..core.config import get_settings, resolve_path
+from ..core.database import SessionLocal
+from ..models.chat import ChatMessage
+from . import chat_cache, chat_dedupe, cluster
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+PARTITION_NAME = re.compile(r"^chat_messages_p(\d{4})(\d{2})$")
+ARCHIVE_COLUMNS = ("id", "room_id", "sender_id", "sender_name", "text", "created_at")
+
+
+def _is_postgres(db: Session) -> bool:
+  return db.get_bind().dialect.name == "postgresql"
+
+
+def _month_start(value: datetime) -> datetime:
+  return value.replace(day=1, hour=0, minute=0, second=0, microsecond=0)
+
+
+def _next_month(value: datetime) -> datetime:
+  return _month_start(_month_start(value) + timedelta(days=32))
+
+
+def _archive_row(row) -> str:
+  record = {column: getattr(row, column) for column in ARCHIVE_COLUMNS}
+  record["created_at"] = record["created_at"].isoformat()
+  return json.dumps(record, ensure_ascii=False)
+
+
+def _archive_path(name: str) -> Path:
+  directory = resolve_path(settings.chat_archive_dir)
+  directory.mkdir(parents=True, exist_ok=True)
+  return directory / f"{name}.ndjson.gz"
+
+
+def _partition_exists(db: Session, name: str) -> bool:
+  return db.execute(text("SELECT to_regclass(:name) IS NOT NULL"), {"name": name}).scalar()
+
+
+def _create_partition(db: Session, name: str, start: datetime, end: datetime) -> int:
+  """Create the partition for [start, end), moving rows the default partition holds for it.
+
+  PostgreSQL refuses to create a partition while the default one has rows in its range, so
+  the default partition is detached, the rows are re-inserted through the parent (which now
+  routes them to the new partition) and deleted from it, and it is attached again. All in
+  one transaction; writes to ``chat_messages`` wait for it. Returns the moved row count.
+  """
+  bounds = {"start": start, "end": end}
+  in_range = "created_at >= :start AND created_at < :end"
+  stray = db.execute(text(f"SELECT EXISTS (SELECT 1 FROM chat_messages_default WHERE {in_range})"), bounds).scalar()
+  create = (
+    f"CREATE TABLE {name} PARTITION OF chat_messages "
+    f"FOR VALUES FROM ('{start.isoformat()}') TO ('{end.isoformat()}')"
+  )
+  if not stray:
+    db.execute(text(create))
+    db.commit()
+    return 0
+
+  columns = ", ".join(ARCHIVE_COLUMNS)
+  db.execute(text("ALTER TABLE chat_messages DETACH PARTITION chat_messages_default"))
+  db.execute(text(create))
+  moved = db.execute(text(
+    f"INSERT INTO chat_messages ({columns}) SELECT {columns} FROM chat_messages_default WHERE {in_range}"
+  ), bounds).rowcount
+  db.execute(text(f"DELETE FROM chat_messages_default WHERE {in_range}"), bounds)
+  db.execute(text("ALTER TABLE chat_messages ATTACH PARTITION chat_messages_default DEFAULT"))
+  db.commit()
+  return moved
+
+
+def ensure_partitions(db: Session, months_ahead: int | None = None) -> list[str]:
+  """Create monthly partitions from this month up to ``months_ahead`` (PostgreSQL only)"""
+  if not _is_postgres(db):
+    return []
+  months_ahead = settings.chat_partition_months_ahead if months_ahead is None else months_ahead
+  created = []
+  start = _month_start(datetime.now(timezone.utc))
+  for _ in range(months_ahead + 1):
+    end = _next_month(start)
+    name = f"chat_messages_p{start:%Y%m}"
+    if not _partition_exists(db, name):
+      try:
+        moved = _create_partition(db, name, start, end)
+        created.append(name)
+        if moved:
+          logger.info("Moved %d rows from chat_messages_default into %s", moved, name)
+      except DBAPIError as e:
+        db.rollback()
+        logger.warning("Could not create partition %s: %s", name, e)
+    start = end
+  return created
+
+
+def _expired_partitions(db: Session, cutoff: datetime) -> list[str]:
+  names = db.execute(text(
+    "SELECT c.relname FROM pg_inherits i "
+    "JOIN pg_class c ON c.oid = i.inhrelid "
+    "JOIN pg_class p ON p.oid = i.inhparent "
+    "WHERE p.relname = 'chat_messages'"
+  )).scalars()
+  expired = []
+  for name in names:
+    match = PARTITION_NAME.match(name)
+    if not match:
+      continue
+    start = datetime(int(match.group(1)), int(match.group(2)), 1, tzinfo=timezone.utc)
+    if _next_month(start) <= cutoff:
+      expired.append(name)
+  return sorted(expired)
+
+
+def _drop_partition(db: Session, name: str) -> int:
+  """Export a partition to NDJSON, then detach and drop it; returns the archived row count"""
+  path = _archive_path(name)
+  tmp = path.with_suffix(".tmp")
+  count = 0
+  result = db.connection().execution_options(stream_results=True, yield_per=1000).execute(
+    text(f"SELECT {', '.join(ARCHIVE_COLUMNS)} FROM {name} ORDER BY created_at")
+  )
+  with gzip.open(tmp, "wt", encoding="utf-8") as out:
+    for row in result:
+      out.write(_archive_row(row) + "\n")
+      count += 1
+  os.replace(tmp, path)
+  db.execute(text(f"ALTER TABLE chat_messages DETACH PARTITION {name}"))
+  db.execute(text(f"DROP TABLE {name}"))
+  db.commit()
+  return count
+
+
+def _archive_in_batches(db: Session, cutoff: datetime, batch_size: int) -> int:
+  count = 0
+  out = None
+  try:
+    while True:
+      rows = db.execute(
+        select(ChatMessage)
+        .where(ChatMessage.created_at < cutoff)
+        .order_by(ChatMessage.created_at)
+        .limit(batch_size)
+      ).scalars().all()
+      if not rows:
+        break
+      if out is None:
+        out = gzip.open(_archive_path(f"chat_messages_before_{cutoff:%Y%m%dT%H%M%S}"), "at", encoding="utf-8")
+      for row in rows:
+        out.write(_archive_row(row) + "\n")
+      out.flush()
+      db.execute(delete(ChatMessage).where(ChatMessage.id.in_([row.id for row in rows])))
+      db.commit()
+      db.expunge_all()
+      count += len(rows)
+  finally:
+    if out is not None:
+      out.close()
+  return count
+
+
+def apply_retention(db: Session, retention_days: int | None = None, batch_size: int | None = None) -> dict:
+  """Archive and remove messages older than the retention period, and expired idempotency keys"""
+  retention_days = settings.chat_retention_days if retention_days is None else retention_days
+  batch_size = batch_size or settings.chat_delete_batch_size
+  report = {"partitionsCreated": [], "partitionsDropped": [], "archivedRows": 0, "batchedRows": 0}
+  if _is_postgres(db):
+    report["partitionsCreated"] = ensure_partitions(db)
+  report["messageKeysPruned"] = chat_dedupe.prune_keys(db)
+  if retention_days <= 0:
+    return report
+
+  cutoff = datetime.now(timezone.utc) - timedelta(days=retention_days)
+  if _is_postgres(db):
+    for name in _expired_partitions(db, cutoff):
+      report["archivedRows"] += _drop_partition(db, name)
+      report["partitionsDropped"].append(name)
+  report["batchedRows"] = _archive_in_batches(db, cutoff, batch_size)
+  report["archivedRows"] += report["batchedRows"]
+
+  if report["archivedRows"]:
+    chat_cache.invalidate()
+  return report
+
+
+def delete_messages_before(cutoff: datetime, batch_size: int | None = None) -> int:
+  """Delete (without archiving) every message created before ``cutoff`` in chunks.
+
+  Used by the admin clear endpoint as a background task, so the request returns
+  immediately and no single DELETE holds a lock on the whole table.
+  """
+  batch_size = batch_size or settings.chat_delete_batch_size
+  db = SessionLocal()
+  deleted = 0
+  try:
+    while True:
+      ids = db.execute(
+        select(ChatMessage.id).where(ChatMessage.created_at < cutoff).limit(batch_size)
+      ).scalars().all()
+      if not ids:
+        break
+      db.execute(delete(ChatMessage).where(ChatMessage.id.in_(ids)))
+      db.commit()
+      deleted += len(ids)
+  except Exception:
+    logger.exception("Error clearing chat messages")
+  finally:
+    db.close()
+    # Room histories read while the delete ran (or before it started) may have cached rows
+    # that are now gone
+    chat_cache.invalidate()
+  return deleted
+
+
+async def run_chat_retention_periodically(interval_seconds: int):
+  def run_once() -> dict:
+    db = SessionLocal()
+    try:
+      return apply_retention(db)
+    finally:
+      db.close()
+
+  while True:
+    try:
+      if await cluster.claim("chat-retention", interval_seconds):
+        report = await anyio.to_thread.run_sync(run_once)
+        logger.info("Chat retention: %s", report)
+    except Exception:
+      logger.exception("Error running chat retention")
+    await asyncio.sleep(interval_seconds)
+
+
+async def run_partition_maintenance_periodically(interval_seconds: int):
+  """Keep next months' partitions ahead of the writes, independently of retention.
+
+  Runs once straight away (at startup) and then every ``interval_seconds``; a no-op on
+  databases without partitions.
+  """
+  def run_once() -> list[str]:
+    db = SessionLocal()
+    try:
+      return ensure_partitions(db)
+    finally:
+      db.close()
+
+  while True:
+    try:
+      if await cluster.claim("chat-partitions", interval_seconds):
+        created = await anyio.to_thread.run_sync(run_once)
+        if created:
+          logger.info("Created chat partitions: %s", created)
+    except Exception:
+      logger.exception("Error creating chat partitions")
+    await asyncio.sleep(interval_seconds)
@@ -0,0 +1,73 @@
+"""Chat room membership.
+
+Every user is in the general room (``room_id`` None). Alumni with a cohort are in that
+cohort's room, which is created on first use, and users can be in any number of
+ad-hoc group rooms through ``ChatRoomMember`` rows.
+"""
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from ..models.chat import ChatRoom, ChatRoomMember
+from ..models.user import User
+
+
+def get_or_create_cohort_room(db: Session, cohort: str) -> ChatRoom:
+  room = db.execute(select(ChatRoom).where(ChatRoom.cohort == cohort)).scalar_one_or_none()
+  if room:
+    return room
+  room = ChatRoom(name=f"Cohort {cohort}", kind="cohort", cohort=cohort)
+  db.add(room)
+  try:
+    db.commit()
+  except IntegrityError:
+    # Another worker created it first
+    db.rollback()
+    return db.execute(select(ChatRoom).where(ChatRoom.cohort == cohort)).scalar_one()
+  db.refresh(room)
+  return room
+
+
+def get_user_rooms(db: Session, user: User) -> list[ChatRoom]:
+  """Cohort and group rooms the user belongs to (the general room is implicit)"""
+  rooms = list(
+    db.execute(
+      select(ChatRoom)
+      .join(ChatRoomMember, ChatRoomMember.room_id == ChatRoom.id)
+      .where(ChatRoomMember.user_id == user.id)
+      .order_by(ChatRoom.name)
+    ).scalars()
+  )
+  cohort = user.profile.cohort if user.profile else None
+  if cohort and cohort != "N/A":
+    rooms.insert(0, get_or_create_cohort_room(db, cohort))
+  return rooms
+
+
+def is_room_member(db: Session, user: User, room_id: str | None) -> bool:
+  if room_id is None:
+    return True
+  room = db.get(ChatRoom, room_id)
+  if room is None:
+    return False
+  if room.kind == "cohort":
+    return bool(user.profile and user.profile.cohort == room.cohort)
+  member = db.execute(
+    select(ChatRoomMember.id).where(ChatRoomMember.room_id == room_id, ChatRoomMember.user_id == user.id)
+  ).first()
+  return member is not None
+
+
+def add_members(db: Session, room: ChatRoom, user_ids: list[str]) -> list[str]:
+  """Add users to a group room, skipping existing members and unknown users; returns the added ids"""
+  existing = set(
+    db.execute(select(ChatRoomMember.user_id).where(ChatRoomMember.room_id == room.id)).scalars()
+  )
+  wanted = [uid for uid in dict.fromkeys(user_ids) if uid not in existing]
+  if not wanted:
+    return []
+  valid = list(db.execute(select(User.id).where(User.id.in_(wanted))).scalars())
+  for user_id in valid:
+    db.add(ChatRoomMember(room_id=room.id, user_id=user_id))
+  return valid
+
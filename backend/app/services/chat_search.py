@@ -0,0 +1,109 @@
+"""Full-text search over chat messages.
+
+Matches against the ``text_search`` tsvector column on PostgreSQL or the
+``chat_messages_fts`` FTS5 table on SQLite (both from ``models.chat.SEARCH_DDL``, kept in
+sync by the database). Results are ordered by relevance, then newest first, and paged
+with an opaque keyset cursor over (rank, created_at, id), so a deep page costs the same
+as the first one.
+"""
+import base64
+import json
+from datetime import datetime
+
+from sqlalchemy import Float, and_, cast, column, func, literal, literal_column, or_, select, table, tuple_
+from sqlalchemy.orm import Session, aliased
+
+from ..models.chat import ChatMessage
+from ..utils.serializers import serialize_chat_message
+
+
+def _fts5_query(q: str) -> str:
+  """Quote every term so user input cannot use FTS5 query syntax; terms are ANDed"""
+  return " ".join('"' + term.replace('"', '""') + '"' for term in q.split())
+
+
+def encode_cursor(rank: float, created_at: datetime, message_id: str) -> str:
+  raw = json.dumps([rank, created_at.isoformat(), message_id])
+  return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> tuple[float, datetime, str]:
+  """Raises ValueError for a cursor this module did not produce"""
+  try:
+    rank, created_at, message_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    return float(rank), datetime.fromisoformat(created_at), str(message_id)
+  except (TypeError, ValueError, json.JSONDecodeError) as e:
+    raise ValueError("Invalid cursor") from e
+
+
+def _ranked_matches(db: Session, q: str):
+  """Select of (ChatMessage columns, rank) for messages matching ``q``; higher rank is better"""
+  dialect = db.get_bind().dialect.name
+  if dialect == "postgresql":
+    tsquery = func.websearch_to_tsquery("english", q)
+    vector = literal_column("chat_messages.text_search")
+    # ts_rank is float4; as float8 the rank survives the JSON cursor exactly, so the
+    # keyset comparison against it matches ties
+    rank = cast(func.ts_rank(vector, tsquery), Float(53)).label("rank")
+    return select(ChatMessage, rank).where(vector.op("@@")(tsquery))
+  if dialect == "sqlite":
+    fts = table("chat_messages_fts", column("rowid"))
+    # bm25() is lower-is-better
+    rank = (-func.bm25(literal_column("chat_messages_fts"))).label("rank")
+    return (
+      select(ChatMessage, rank)
+      .join(fts, fts.c.rowid == literal_column("chat_messages.rowid"))
+      .where(literal_column("chat_messages_fts").op("MATCH")(_fts5_query(q)))
+    )
+  # No index on other databases: unranked substring match
+  return select(ChatMessage, literal(0.0).label("rank")).where(ChatMessage.text.ilike(f"%{q}%"))
+
+
+def search_messages(
+  db: Session,
+  q: str,
+  room_ids: list[str | None],
+  sender_id: str | None = None,
+  since: datetime | None = None,
+  until: datetime | None = None,
+  limit: int = 20,
+  cursor: str | None = None,
+) -> tuple[list[dict], str | None]:
+  """One page of matches within ``room_ids`` (None is the general room) and the next cursor"""
+  rooms = [room_id for room_id in room_ids if room_id is not None]
+  scope = []
+  if None in room_ids:
+    scope.append(ChatMessage.room_id.is_(None))
+  if rooms:
+    scope.append(ChatMessage.room_id.in_(rooms))
+  if not scope:
+    return [], None
+
+  query = _ranked_matches(db, q).where(or_(*scope))
+  if sender_id:
+    query = query.where(ChatMessage.sender_id == sender_id)
+  if since:
+    query = query.where(ChatMessage.created_at >= since)
+  if until:
+    query = query.where(ChatMessage.created_at < until)
+
+  # Rank is a computed column, so filter and order on it from the outside
+  matches = query.subquery()
+  message = aliased(ChatMessage, matches)
+  rank = matches.c.rank
+  page = select(message, rank)
+  if cursor:
+    after_rank, after_created_at, after_id = decode_cursor(cursor)
+    page = page.where(or_(
+      rank < after_rank,
+      and_(rank == after_rank, tuple_(message.created_at, message.id) < (after_created_at, after_id)),
+    ))
+  page = page.order_by(rank.desc(), message.created_at.desc(), message.id.desc()).limit(limit + 1)
+
+  rows = db.execute(page).all()
+  next_cursor = None
+  if len(rows) > limit:
+    rows = rows[:limit]
+    last, last_rank = rows[-1]
+    next_cursor = encode_cursor(last_rank, last.created_at, last.id)
+  return [{**serialize_chat_message(msg), "rank": msg_rank} for msg, msg_rank in rows], next_cursor
@@ -0,0 +1,34 @@
+"""Run-once-per-cluster coordination for periodic background jobs.
+
+Every worker runs the same lifespan, so in-process jobs such as the upload collector and
+chat retention tick on every worker of every host. Before each run a worker claims the
+job's current interval in Redis (``SET NX``); only the first claimant runs it. Without
+Redis there is a single process and every claim succeeds.
+"""
+import logging
+import time
+
+from redis.exceptions import RedisError
+
+from ..core.redis import REDIS_ENABLED, get_redis
+from . import presence
+
+logger = logging.getLogger(__name__)
+
+KEY_PREFIX = "cluster:job:"
+
+
+async def claim(job: str, interval_seconds: float) -> bool:
+  """True for exactly one caller per job per ``interval_seconds`` window across the cluster"""
+  if not REDIS_ENABLED:
+    return True
+  window = int(time.time() // interval_seconds)
+  try:
+    redis = await get_redis()
+    claimed = await redis.set(
+      f"{KEY_PREFIX}{job}:{window}", presence.INSTANCE_ID, nx=True, ex=max(1, int(interval_seconds * 2))
+    )
+  except RedisError as e:
+    logger.warning("Could not claim %s, skipping this run: %s", job, e)
+    return False
+  return bool(claimed)
@@ -0,0 +1,201 @@
+"""Cluster-wide chat presence.
+
+Each process keeps its sockets in ``local_sessions`` (a user may have several tabs or
+devices) and mirrors a per-instance hash ``presence:sessions:<instance>`` of
+user id -> local session count in Redis. Hashes are only written when a user's local
+count changes; liveness comes from one batched heartbeat per process per interval that
+refreshes ``presence:instances`` and the hash TTL, never one write per socket.
+Instances that stop heartbeating are swept by whichever process claims them first,
+which then announces their users as offline.
+
+With ``REDIS_URL=memory://`` there is a single process, so ``local_sessions`` is the
+whole picture and nothing is mirrored.
+"""
+import asyncio
+import logging
+import os
+import socket
+import time
+import uuid
+from typing import Dict
+
+from redis.exceptions import RedisError
+
+from ..core.config import get_settings
+from ..core.redis import REDIS_ENABLED, get_redis
+from . import chat_ephemeral
+
+logger = logging.getLogger(__name__)
+
+settings = get_settings()
+
+def _new_instance_id() -> str:
+  return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:6]}"
+
+
+INSTANCE_ID = _new_instance_id()
+INSTANCES_KEY = "presence:instances"
+SESSIONS_KEY_PREFIX = "presence:sessions:"
+
+# user_id -> sids connected to this process
+local_sessions: Dict[str, set] = {}
+
+
+def _after_fork():
+  # Workers forked from a preloaded parent (app.server) must not share one identity
+  global INSTANCE_ID
+  INSTANCE_ID = _new_instance_id()
+
+
+if hasattr(os, "register_at_fork"):  # POSIX only
+  os.register_at_fork(after_in_child=_after_fork)
+
+
+def _sessions_key(instance_id: str) -> str:
+  return f"{SESSIONS_KEY_PREFIX}{instance_id}"
+
+
+def _stale_after() -> float:
+  return settings.presence_heartbeat_seconds * 3
+
+
+async def _live_instances(redis) -> list[str]:
+  return await redis.zrangebyscore(INSTANCES_KEY, time.time() - _stale_after(), "+inf")
+
+
+async def _online_elsewhere(redis, user_id: str) -> bool:
+  others = [iid for iid in await _live_instances(redis) if iid != INSTANCE_ID]
+  if not others:
+    return False
+  pipe = redis.pipeline(transaction=False)
+  for iid in others:
+    pipe.hexists(_sessions_key(iid), user_id)
+  return any(await pipe.execute())
+
+
+async def _announce(user_id: str, status: str):
+  chat_ephemeral.presence_changed(user_id, status)
+
+
+async def _write_local_count(redis, user_id: str):
+  """Mirror one user's local session count, registering this instance if it is not yet visible"""
+  count = len(local_sessions.get(user_id, ()))
+  key = _sessions_key(INSTANCE_ID)
+  pipe = redis.pipeline(transaction=False)
+  if count:
+    pipe.hset(key, user_id, count)
+    pipe.expire(key, int(_stale_after() * 4))
+    pipe.zadd(INSTANCES_KEY, {INSTANCE_ID: time.time()})
+  else:
+    pipe.hdel(key, user_id)
+  await pipe.execute()
+
+
+async def add_session(user_id: str, sid: str):
+  first_local = not local_sessions.get(user_id)
+  local_sessions.setdefault(user_id, set()).add(sid)
+  if not REDIS_ENABLED:
+    if first_local:
+      await _announce(user_id, "online")
+    return
+  try:
+    redis = await get_redis()
+    await _write_local_count(redis, user_id)
+    if first_local and not await _online_elsewhere(redis, user_id):
+      await _announce(user_id, "online")
+  except RedisError as e:
+    logger.warning("Error updating presence: %s", e)
+
+
+async def remove_session(user_id: str, sid: str):
+  sids = local_sessions.get(user_id)
+  if not sids or sid not in sids:
+    return
+  sids.discard(sid)
+  if not sids:
+    del local_sessions[user_id]
+  if not REDIS_ENABLED:
+    if user_id not in local_sessions:
+      await _announce(user_id, "offline")
+    return
+  try:
+    redis = await get_redis()
+    await _write_local_count(redis, user_id)
+    if user_id not in local_sessions and not await _online_elsewhere(redis, user_id):
+      await _announce(user_id, "offline")
+  except RedisError as e:
+    logger.warning("Error updating presence: %s", e)
+
+
+async def get_online_users() -> dict[str, int]:
+  """user_id -> number of connected sessions across all live instances"""
+  if not REDIS_ENABLED:
+    return {user_id: len(sids) for user_id, sids in local_sessions.items()}
+  redis = await get_redis()
+  instances = await _live_instances(redis)
+  pipe = redis.pipeline(transaction=False)
+  for iid in instances:
+    pipe.hgetall(_sessions_key(iid))
+  online: dict[str, int] = {}
+  for counts in await pipe.execute():
+    for user_id, count in counts.items():
+      online[user_id] = online.get(user_id, 0) + int(count)
+  return online
+
+
+async def _sweep(redis):
+  """Remove instances that stopped heartbeating and announce users that went offline with them"""
+  stale = await redis.zrangebyscore(INSTANCES_KEY, "-inf", time.time() - _stale_after())
+  for iid in stale:
+    # ZREM returns 1 for exactly one sweeper, which then owns the cleanup
+    if not await redis.zrem(INSTANCES_KEY, iid):
+      continue
+    key = _sessions_key(iid)
+    user_ids = await redis.hkeys(key)
+    await redis.delete(key)
+    for user_id in user_ids:
+      if user_id not in local_sessions and not await _online_elsewhere(redis, user_id):
+        await _announce(user_id, "offline")
+
+
+async def heartbeat_loop():
+  """One pipelined heartbeat per process per interval, plus the stale-instance sweep"""
+  if not REDIS_ENABLED:
+    return
+  while True:
+    try:
+      redis = await get_redis()
+      key = _sessions_key(INSTANCE_ID)
+      pipe = redis.pipeline(transaction=True)
+      pipe.zadd(INSTANCES_KEY, {INSTANCE_ID: time.time()})
+      if local_sessions:
+        # Rewrite the whole hash so counts self-heal after a Redis restart or a missed update
+        pipe.delete(key)
+        pipe.hset(key, mapping={uid: len(sids) for uid, sids in local_sessions.items()})
+        pipe.expire(key, int(_stale_after() * 4))
+      await pipe.execute()
+      await _sweep(redis)
+    except asyncio.CancelledError:
+      raise
+    except Exception:
+      logger.exception("Error in presence heartbeat")
+    await asyncio.sleep(settings.presence_heartbeat_seconds)
+
+
+async def shutdown():
+  """Deregister this instance and announce users that were only connected here"""
+  if not REDIS_ENABLED:
+    local_sessions.clear()
+    return
+  try:
+    redis = await get_redis()
+    await redis.zrem(INSTANCES_KEY, INSTANCE_ID)
+    await redis.delete(_sessions_key(INSTANCE_ID))
+    for user_id in list(local_sessions):
+      if not await _online_elsewhere(redis, user_id):
+        await _announce(user_id, "offline")
+    local_sessions.clear()
+    # Announcements are normally flushed by chat_ephemeral.run(), which is stopping
+    await chat_ephemeral.flush()
+  except RedisError as e:
+    logger.warning("Error clearing presence: %s", e)
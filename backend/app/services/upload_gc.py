@@ -0,0 +1,116 @@
+import asyncio
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Iterator
+
+import anyio.to_thread
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..core.database import SessionLocal
+from ..models.event import Event
+from ..utils.file_upload import UPLOAD_DIR
+from . import cluster
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = 500
+
+
+def _iter_poster_files(directory: Path) -> Iterator[os.DirEntry]:
+  """Stream regular files in the poster directory without listing it into memory."""
+  if not directory.exists():
+    return
+  with os.scandir(directory) as entries:
+    for entry in entries:
+      if entry.is_file(follow_symlinks=False):
+        yield entry
+
+
+def _referenced_paths(db: Session, paths: list[str]) -> set[str]:
+  rows = db.execute(select(Event.poster_path).where(Event.poster_path.in_(paths))).scalars()
+  return set(rows)
+
+
+def collect_orphaned_uploads(
+  db: Session,
+  grace_seconds: int = 24 * 60 * 60,
+  dry_run: bool = False,
+  directory: Path = UPLOAD_DIR,
+) -> dict:
+  """Delete poster files that no Event.poster_path points at.
+
+  Files are checked against the events table in batches, and only files older than
+  ``grace_seconds`` are removed so uploads that are still being attached to a new
+  event are left alone.
+  """
+  cutoff = time.time() - grace_seconds
+  report = {
+    "scanned": 0,
+    "orphaned": 0,
+    "reclaimableBytes": 0,
+    "deleted": 0,
+    "deletedBytes": 0,
+    "skippedRecent": 0,
+    "dryRun": dry_run,
+  }
+
+  def process(batch: list[tuple[str, os.DirEntry]]):
+    referenced = _referenced_paths(db, [path for path, _ in batch])
+    for path, entry in batch:
+      if path in referenced:
+        continue
+      try:
+        stat = entry.stat(follow_symlinks=False)
+      except FileNotFoundError:
+        continue
+      if stat.st_mtime > cutoff:
+        report["skippedRecent"] += 1
+        continue
+      report["orphaned"] += 1
+      report["reclaimableBytes"] += stat.st_size
+      if dry_run:
+        continue
+      try:
+        os.unlink(entry.path)
+      except OSError:
+        continue
+      report["deleted"] += 1
+      report["deletedBytes"] += stat.st_size
+
+  batch: list[tuple[str, os.DirEntry]] = []
+  for entry in _iter_poster_files(directory):
+    report["scanned"] += 1
+    batch.append((f"{directory.name}/{entry.name}", entry))
+    if len(batch) >= BATCH_SIZE:
+      process(batch)
+      batch = []
+  if batch:
+    process(batch)
+
+  return report
+
+
+async def run_upload_gc_periodically(interval_seconds: int, grace_seconds: int):
+  """Background loop for deployments that schedule the collector in-process instead of via cron.
+
+  Runs on one worker per interval across the cluster (see ``cluster.claim``).
+  """
+  def run_once() -> dict:
+    db = SessionLocal()
+    try:
+      return collect_orphaned_uploads(db, grace_seconds=grace_seconds)
+    finally:
+      db.close()
+
+  while True:
+    await asyncio.sleep(interval_seconds)
+    try:
+      if not await cluster.claim("upload-gc", interval_seconds):
+        continue
+      report = await anyio.to_thread.run_sync(run_once)
+      logger.info("Upload GC: %s", report)
+    except Exception:
+      logger.exception("Error running upload GC")
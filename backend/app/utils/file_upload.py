@@ -3,6 +3,8 @@ import uuid
 from pathlib import Path
 from fastapi import UploadFile, HTTPException, status
 
+from ..core.config import get_settings, resolve_path
+
 ALLOWED_EXTENSIONS = {".png", ".jpg", ".jpeg", ".pdf"}
 ALLOWED_MIME_TYPES = {
     "image/png",
@@ -11,7 +13,8 @@ ALLOWED_MIME_TYPES = {
     "application/pdf"
 }
 
-UPLOAD_DIR = Path("uploads/posters")
+UPLOAD_ROOT = resolve_path(get_settings().upload_dir)
+UPLOAD_DIR = UPLOAD_ROOT / "posters"
 UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
 
 
@@ -1,4 +1,13 @@
-from ..models.user import User
+"""API representations of the models, shared by the routers.
+
+Values are already JSON types (datetimes as ISO strings), so handlers can hand lists of
+them straight to ``ORJSONResponse`` and skip FastAPI's ``jsonable_encoder`` walk, and the
+chat payloads can go through ``json``/``wire`` unchanged.
+"""
+from ..models.chat import ChatMessage, ChatRoom
+from ..models.event import Event
+from ..models.notice import Notice
+from ..models.user import InviteToken, User
 
 
 def serialize_user(user: User) -> dict:
@@ -16,3 +25,50 @@ def serialize_user(user: User) -> dict:
     "skills": profile.skills if profile and profile.skills else [],
   }
 
+
+def serialize_event(event: Event) -> dict:
+  return {
+    "id": event.id,
+    "title": event.title,
+    "description": event.description,
+    "date": event.date.isoformat(),
+    "venue": event.venue,
+    "posterPath": event.poster_path,
+    "createdAt": event.created_at.isoformat(),
+  }
+
+
+def serialize_notice(notice: Notice) -> dict:
+  return {
+    "id": notice.id,
+    "title": notice.title,
+    "content": notice.content,
+    "createdAt": notice.created_at.isoformat(),
+  }
+
+
+def serialize_invite(invite: InviteToken) -> dict:
+  return {
+    "id": invite.id,
+    "token": invite.token,
+    "createdAt": invite.created_at.isoformat(),
+    "expiresAt": invite.expires_at.isoformat() if invite.expires_at else None,
+    "used": invite.used,
+  }
+
+
+def serialize_chat_message(message: ChatMessage) -> dict:
+  return {
+    "id": message.id,
+    "room_id": message.room_id,
+    "sender": message.sender_name,
+    "sender_id": message.sender_id,
+    "text": message.text,
+    "timestamp": message.created_at.isoformat(),
+  }
+
+
+def serialize_chat_room(room: ChatRoom | None) -> dict:
+  if room is None:
+    return {"id": None, "name": "General", "kind": "general", "cohort": None}
+  return {"id": room.id, "name": room.name, "kind": room.kind, "cohort": room.cohort}
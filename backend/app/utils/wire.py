@@ -0,0 +1,40 @@
+"""Encoding of payloads published on the chat Redis channels.
+
+Every payload carries a ``published_at`` epoch timestamp so listeners can measure
+publish-to-receive latency. ``decode`` accepts both encodings regardless of the
+configured one, so instances can be switched over one at a time.
+"""
+import json
+import time
+
+from ..core.config import get_settings
+
+try:
+  import msgpack
+except ImportError:  # optional, only needed for CHAT_WIRE_FORMAT=msgpack
+  msgpack = None
+
+settings = get_settings()
+
+if settings.chat_wire_format not in ("json", "msgpack"):
+  raise RuntimeError(f"Unknown CHAT_WIRE_FORMAT {settings.chat_wire_format!r}")
+if settings.chat_wire_format == "msgpack" and msgpack is None:
+  raise RuntimeError("CHAT_WIRE_FORMAT=msgpack requires the msgpack package")
+
+
+def encode(data: dict) -> bytes | str:
+  payload = dict(data, published_at=time.time())
+  if settings.chat_wire_format == "msgpack":
+    return msgpack.packb(payload, use_bin_type=True)
+  return json.dumps(payload)
+
+
+def decode(raw: bytes | str) -> tuple[dict, float | None]:
+  """Return the payload and its publish timestamp (None for payloads from older publishers)"""
+  if isinstance(raw, (bytes, bytearray)) and raw[:1] != b"{":
+    if msgpack is None:
+      raise ValueError("Received a msgpack payload but msgpack is not installed")
+    data = msgpack.unpackb(raw, raw=False)
+  else:
+    data = json.loads(raw)
+  return data, data.pop("published_at", None)
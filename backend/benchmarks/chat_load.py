@@ -0,0 +1,213 @@
+"""Chat load test and fanout latency benchmark.
+
+Starts the ASGI app from ``app.main`` in 1, 2 and 4 uvicorn worker processes (one port
+each, clients spread round-robin over websocket so no sticky sessions are needed),
+connects N simulated Socket.IO clients and reports connect rate, message throughput
+and publish-to-delivery latency percentiles.
+
+Runs offline: without ``--redis-url`` an in-process fakeredis TCP server is used, and
+without ``--database-url`` a throwaway SQLite file. Extra dependencies: ``aiohttp``
+(python-socketio's asyncio client) and ``fakeredis``.
+
+    cd backend
+    python -m benchmarks.chat_load --clients 200 --senders 20 --messages 20
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import urllib.request
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def _free_port() -> int:
+  with socket.socket() as s:
+    s.bind(("127.0.0.1", 0))
+    return s.getsockname()[1]
+
+
+def _start_fake_redis() -> str:
+  from fakeredis import TcpFakeServer
+
+  port = _free_port()
+  server = TcpFakeServer(("127.0.0.1", port), server_type="redis")
+  threading.Thread(target=server.serve_forever, daemon=True).start()
+  return f"redis://127.0.0.1:{port}/0"
+
+
+def _seed_users(count: int) -> list[str]:
+  """Create the benchmark users (and tables) before workers start; returns their access tokens"""
+  import app.main  # noqa: F401  (registers every model before create_all)
+  from app.core.database import SessionLocal, init_db
+  from app.core.security import create_access_token, token_claims
+  from app.models.alumni import AlumniProfile
+  from app.models.user import User
+  from app.services.admin_bootstrap import ensure_default_admin
+
+  init_db()
+  ensure_default_admin()
+  db = SessionLocal()
+  try:
+    users = [
+      User(email=f"bench{i}@bench.local", first_name="Bench", last_name=str(i), hashed_password="!")
+      for i in range(count)
+    ]
+    db.add_all(users)
+    db.add_all(AlumniProfile(user=user, skills=[]) for user in users)
+    db.commit()
+    return [create_access_token(token_claims(user)) for user in users]
+  finally:
+    db.close()
+
+
+def _start_workers(count: int, env: dict) -> tuple[list[subprocess.Popen], list[int]]:
+  procs, ports = [], []
+  for _ in range(count):
+    port = _free_port()
+    procs.append(subprocess.Popen(
+      [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(port), "--log-level", "warning"],
+      cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    ))
+    ports.append(port)
+
+  deadline = time.time() + 30
+  for port in ports:
+    while True:
+      try:
+        urllib.request.urlopen(f"http://127.0.0.1:{port}/health", timeout=1)
+        break
+      except OSError:
+        if time.time() > deadline:
+          raise RuntimeError(f"Worker on port {port} did not start")
+        time.sleep(0.1)
+  return procs, ports
+
+
+def _percentile(samples: list[float], p: float) -> float | None:
+  if not samples:
+    return None
+  ordered = sorted(samples)
+  return round(ordered[min(len(ordered) - 1, int(p * len(ordered)))] * 1000, 2)
+
+
+async def _run_clients(ports: list[int], tokens: list[str], senders: int, messages: int, rate: float) -> dict:
+  import socketio
+
+  latencies: list[float] = []
+  expected = senders * messages
+  delivered_all = asyncio.Event()
+  deliveries = 0
+
+  def on_message(data):
+    nonlocal deliveries
+    text = data.get("text", "")
+    if text.startswith("bench:"):
+      latencies.append(time.time() - float(text.split(":")[1]))
+      deliveries += 1
+      if deliveries >= expected * len(tokens):
+        delivered_all.set()
+
+  def on_batch(batch):
+    for item in batch:
+      if item.get("event") == "message":
+        on_message(item["data"])
+
+  clients = []
+  for i, token in enumerate(tokens):
+    client = socketio.AsyncClient(reconnection=False)
+    client.on("message", on_message)
+    client.on("message_batch", on_batch)
+    clients.append((client, ports[i % len(ports)], token))
+
+  started = time.perf_counter()
+  await asyncio.gather(*(
+    client.connect(
+      f"http://127.0.0.1:{port}", auth={"token": token}, transports=["websocket"], wait_timeout=30
+    )
+    for client, port, token in clients
+  ))
+  connect_seconds = time.perf_counter() - started
+
+  async def send(client):
+    for _ in range(messages):
+      await client.emit("message", {"text": f"bench:{time.time()}"})
+      if rate:
+        await asyncio.sleep(1 / rate)
+
+  started = time.perf_counter()
+  await asyncio.gather(*(send(client) for client, _, _ in clients[:senders]))
+  try:
+    await asyncio.wait_for(delivered_all.wait(), timeout=60)
+  except asyncio.TimeoutError:
+    pass
+  send_seconds = time.perf_counter() - started
+
+  await asyncio.gather(*(client.disconnect() for client, _, _ in clients))
+
+  return {
+    "clients": len(clients),
+    "connectPerSec": round(len(clients) / connect_seconds, 1),
+    "messagesSent": expected,
+    "deliveries": deliveries,
+    "deliveryRatio": round(deliveries / (expected * len(clients)), 4) if expected else None,
+    "messagesPerSec": round(expected / send_seconds, 1),
+    "deliveriesPerSec": round(deliveries / send_seconds, 1),
+    "latencyP50Ms": _percentile(latencies, 0.50),
+    "latencyP95Ms": _percentile(latencies, 0.95),
+    "latencyP99Ms": _percentile(latencies, 0.99),
+  }
+
+
+def main(argv: list[str] | None = None) -> int:
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--clients", type=int, default=100)
+  parser.add_argument("--senders", type=int, default=10, help="Clients that send messages")
+  parser.add_argument("--messages", type=int, default=20, help="Messages per sender")
+  parser.add_argument("--rate", type=float, default=0, help="Messages per second per sender (0 = as fast as possible)")
+  parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+  parser.add_argument("--redis-url", help="Use a real Redis instead of an in-process fakeredis server")
+  parser.add_argument("--database-url", help="Use this database instead of a temporary SQLite file")
+  args = parser.parse_args(argv)
+
+  tmpdir = tempfile.mkdtemp(prefix="chat-bench-")
+  env = dict(os.environ)
+  env.setdefault("JWT_SECRET_KEY", "bench")
+  # Measure raw capacity; set these explicitly to benchmark with rate limiting on
+  env.setdefault("CHAT_RATE_LIMIT_PER_SECOND", "0")
+  env.setdefault("CHAT_USER_RATE_LIMIT_PER_SECOND", "0")
+  env["DATABASE_URL"] = args.database_url or f"sqlite:///{tmpdir}/bench.db"
+  env["REDIS_URL"] = args.redis_url or _start_fake_redis()
+  os.environ.update(env)
+  sys.path.insert(0, str(BACKEND_DIR))
+
+  tokens = _seed_users(args.clients)
+  results = []
+  for workers in args.workers:
+    procs, ports = _start_workers(workers, env)
+    try:
+      result = asyncio.run(_run_clients(ports, tokens, min(args.senders, args.clients), args.messages, args.rate))
+    finally:
+      for proc in procs:
+        proc.terminate()
+      for proc in procs:
+        try:
+          proc.wait(timeout=10)
+        except subprocess.TimeoutExpired:
+          proc.kill()
+    result = {"workers": workers, **result}
+    results.append(result)
+    print(json.dumps(result))
+
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
@@ -0,0 +1,108 @@
+"""Typing/presence event rate, naive vs. server-side coalescing.
+
+Simulates users typing in rooms (keystrokes arrive as a Poisson process, and each user
+sends a message, which clears their indicator, every few seconds) against the real
+``chat_ephemeral`` throttle and merge window on the in-process bus, and compares the
+publishes (each one a Socket.IO room emit) with forwarding every keystroke.
+
+    cd backend
+    python -m benchmarks.chat_typing --users 200 --rooms 10 --duration 10
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import time
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+async def _simulate(users: int, rooms: int, keystrokes_per_second: float, message_every: float, duration: float) -> dict:
+  from app.core.config import get_settings
+  from app.core import prometheus
+  from app.services import chat_bus, chat_ephemeral
+  from app.services.chat_broadcast import room_channels
+  from app.utils import wire
+
+  room_ids = [None] + [f"bench-room-{i}" for i in range(rooms - 1)]
+  pubsub = await chat_bus.bus.pubsub()
+  await pubsub.subscribe(*(room_channels(room_id)[1] for room_id in room_ids))
+
+  published = 0
+  delivered_items = 0
+
+  async def consume():
+    nonlocal published, delivered_items
+    while True:
+      message = await pubsub.get_message(timeout=1.0)
+      if message is None:
+        continue
+      data, _ = wire.decode(message["data"])
+      published += 1
+      delivered_items += len(data["data"]) if data["event"] == "message_batch" else 1
+
+  naive = 0
+  loop = asyncio.get_running_loop()
+  deadline = loop.time() + duration
+
+  async def user(index: int):
+    nonlocal naive
+    room_id = room_ids[index % len(room_ids)]
+    user_id, name = f"bench-user-{index}", f"User {index}"
+    next_message = loop.time() + random.uniform(0, message_every)
+    await asyncio.sleep(random.uniform(0, 1))
+    while loop.time() < deadline:
+      chat_ephemeral.typing(room_id, user_id, name, True)
+      naive += 1
+      if loop.time() >= next_message:
+        chat_ephemeral.typing(room_id, user_id, name, False)
+        naive += 1
+        next_message = loop.time() + message_every
+      await asyncio.sleep(random.expovariate(keystrokes_per_second))
+
+  consumer = asyncio.create_task(consume())
+  flusher = asyncio.create_task(chat_ephemeral.run())
+  started = time.perf_counter()
+  await asyncio.gather(*(user(i) for i in range(users)))
+  elapsed = time.perf_counter() - started
+  # Let the last window flush
+  await asyncio.sleep(get_settings().chat_ephemeral_window_ms / 1000 * 2 + 0.1)
+  flusher.cancel()
+  consumer.cancel()
+
+  return {
+    "users": users,
+    "rooms": rooms,
+    "seconds": round(elapsed, 2),
+    "naiveEventsPerSec": round(naive / elapsed, 1),
+    "acceptedUpdates": delivered_items,
+    "throttled": int(prometheus.sample("chat_ephemeral_updates_total", outcome="throttled")),
+    "publishesPerSec": round(published / elapsed, 1),
+    "reduction": round(naive / published, 1) if published else None,
+  }
+
+
+def main(argv: list[str] | None = None) -> int:
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--users", type=int, default=200)
+  parser.add_argument("--rooms", type=int, default=10)
+  parser.add_argument("--keystrokes", type=float, default=5, help="Keystrokes per second per typing user")
+  parser.add_argument("--message-every", type=float, default=5, help="Seconds between a user's messages")
+  parser.add_argument("--duration", type=float, default=10)
+  args = parser.parse_args(argv)
+
+  os.environ["REDIS_URL"] = "memory://"
+  os.environ.setdefault("JWT_SECRET_KEY", "bench")
+  os.environ.setdefault("DATABASE_URL", "sqlite://")  # required by Settings, never queried
+  sys.path.insert(0, str(BACKEND_DIR))
+
+  result = asyncio.run(_simulate(args.users, args.rooms, args.keystrokes, args.message_every, args.duration))
+  print(json.dumps(result))
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
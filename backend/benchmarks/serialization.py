@@ -0,0 +1,129 @@
+"""Listing serialization throughput: stdlib JSON vs. orjson, with and without jsonable_encoder.
+
+Builds ``--rows`` model instances of each kind (users with alumni profiles, events,
+notices, invites, chat messages) and times turning them into a response body the three
+ways a handler can:
+
+- ``stdlib``: dicts returned from the handler, FastAPI's ``jsonable_encoder`` then
+  ``JSONResponse`` (the old default)
+- ``orjson``: the same through ``ORJSONResponse``, the app's default response class
+- ``orjsonDirect``: the handler returns ``ORJSONResponse`` itself, as the listing
+  endpoints do, so ``jsonable_encoder`` is skipped
+
+Each figure is rows per second (best of ``--repeat``), serializer call included.
+
+    cd backend
+    python -m benchmarks.serialization --rows 10000
+"""
+import argparse
+import gc
+import json
+import os
+import sys
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+
+def _rows(count: int) -> dict:
+  from app.models.alumni import AlumniProfile
+  from app.models.chat import ChatMessage
+  from app.models.event import Event
+  from app.models.notice import Notice
+  from app.models.user import InviteToken, User, UserRole
+  from app.utils.serializers import (
+    serialize_chat_message, serialize_event, serialize_invite, serialize_notice, serialize_user,
+  )
+
+  now = datetime.now(timezone.utc)
+  users = []
+  for i in range(count):
+    user = User(
+      id=str(uuid.uuid4()), email=f"user{i}@example.org", hashed_password="x", first_name=f"First{i}",
+      last_name=f"Last{i}", role=UserRole.ALUMNI, active=True, created_at=now,
+    )
+    user.profile = AlumniProfile(
+      cohort=f"C{i % 20}", phone="+254700000000", profession="Engineer", skills=["python", "sql"],
+    )
+    users.append(user)
+  events = [
+    Event(
+      id=str(uuid.uuid4()), title=f"Event {i}", description="Annual meetup " * 5, date=now + timedelta(days=i),
+      venue="Nairobi", poster_path=None, created_at=now,
+    )
+    for i in range(count)
+  ]
+  notices = [
+    Notice(id=str(uuid.uuid4()), title=f"Notice {i}", content="Please note " * 10, created_at=now)
+    for i in range(count)
+  ]
+  invites = [
+    InviteToken(id=str(uuid.uuid4()), token=uuid.uuid4().hex, created_at=now, expires_at=now + timedelta(days=14),
+                used=False)
+    for i in range(count)
+  ]
+  messages = [
+    ChatMessage(id=str(uuid.uuid4()), room_id=None, sender_id=str(uuid.uuid4()), sender_name=f"User {i}",
+                text=f"Message number {i}", created_at=now)
+    for i in range(count)
+  ]
+  return {
+    "user": (users, serialize_user),
+    "event": (events, serialize_event),
+    "notice": (notices, serialize_notice),
+    "invite": (invites, serialize_invite),
+    "chatMessage": (messages, serialize_chat_message),
+  }
+
+
+def _best(fn, repeat: int) -> float:
+  best = float("inf")
+  for _ in range(repeat):
+    gc.collect()
+    started = time.perf_counter()
+    fn()
+    best = min(best, time.perf_counter() - started)
+  return best
+
+
+def run(count: int, repeat: int) -> dict:
+  from fastapi.encoders import jsonable_encoder
+  from fastapi.responses import JSONResponse, ORJSONResponse
+
+  paths = {
+    "stdlib": lambda rows, serialize: JSONResponse(jsonable_encoder([serialize(row) for row in rows])),
+    "orjson": lambda rows, serialize: ORJSONResponse(jsonable_encoder([serialize(row) for row in rows])),
+    "orjsonDirect": lambda rows, serialize: ORJSONResponse([serialize(row) for row in rows]),
+  }
+  results = {}
+  for kind, (rows, serialize) in _rows(count).items():
+    bodies = {name: path(rows, serialize).body for name, path in paths.items()}
+    assert json.loads(bodies["stdlib"]) == json.loads(bodies["orjsonDirect"]), kind
+    seconds = {name: _best(lambda: path(rows, serialize), repeat) for name, path in paths.items()}
+    results[kind] = {
+      **{f"{name}RowsPerSec": round(count / elapsed) for name, elapsed in seconds.items()},
+      "speedup": round(seconds["stdlib"] / seconds["orjsonDirect"], 1),
+      "bodyBytes": len(bodies["orjsonDirect"]),
+    }
+  return {"rows": count, "results": results}
+
+
+def main(argv: list[str] | None = None) -> int:
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--rows", type=int, default=10000)
+  parser.add_argument("--repeat", type=int, default=5)
+  args = parser.parse_args(argv)
+
+  os.environ.setdefault("JWT_SECRET_KEY", "bench")
+  os.environ.setdefault("DATABASE_URL", "sqlite://")  # required by Settings, never queried
+  sys.path.insert(0, str(BACKEND_DIR))
+
+  print(json.dumps(run(args.rows, args.repeat)))
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
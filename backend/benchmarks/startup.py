@@ -0,0 +1,103 @@
+"""Worker startup cost: import time and lifespan startup, per startup mode.
+
+Each run is a fresh interpreter that imports ``app.main`` and drives the ASGI lifespan
+startup, as a uvicorn worker does. The database is migrated with Alembic and given an
+admin first, so "legacy" (create_all + admin bootstrap on boot) and "migration-first"
+(both off) start from the same state.
+
+    cd backend
+    python -m benchmarks.startup --runs 5
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+
+MODES = {
+  "legacy": {"DB_CREATE_ALL_ON_STARTUP": "true", "BOOTSTRAP_ADMIN_ON_STARTUP": "true"},
+  "migration-first": {"DB_CREATE_ALL_ON_STARTUP": "false", "BOOTSTRAP_ADMIN_ON_STARTUP": "false"},
+}
+
+# Runs in the child interpreter; prints {"import": s, "startup": s}
+WORKER = """
+import asyncio, json, time
+started = time.perf_counter()
+from app.main import app
+imported = time.perf_counter()
+
+async def lifespan():
+  events = asyncio.Queue()
+  await events.put({"type": "lifespan.startup"})
+  replies = asyncio.Queue()
+  task = asyncio.create_task(app({"type": "lifespan", "asgi": {"version": "3.0"}}, events.get, replies.put))
+  begun = time.perf_counter()
+  reply = await replies.get()
+  assert reply["type"] == "lifespan.startup.complete", reply
+  elapsed = time.perf_counter() - begun
+  await events.put({"type": "lifespan.shutdown"})
+  await replies.get()
+  await task
+  return elapsed
+
+startup = asyncio.run(lifespan())
+print(json.dumps({"import": imported - started, "startup": startup}))
+"""
+
+
+def _prepare_database(env: dict):
+  """Migrate to head and create the admin, as a deployment would before starting workers"""
+  from alembic import command
+  from alembic.config import Config
+
+  cfg = Config(str(BACKEND_DIR / "alembic.ini"))
+  cfg.set_main_option("script_location", str(BACKEND_DIR / "alembic"))
+  cfg.set_main_option("sqlalchemy.url", env["DATABASE_URL"])
+  command.upgrade(cfg, "head")
+  subprocess.run([sys.executable, "-m", "app.cli", "create-admin"], cwd=BACKEND_DIR, env=env, check=True,
+                 stdout=subprocess.DEVNULL)
+
+
+def _run(env: dict) -> dict:
+  out = subprocess.run([sys.executable, "-c", WORKER], cwd=BACKEND_DIR, env=env, check=True,
+                       capture_output=True, text=True).stdout
+  return json.loads(out.strip().splitlines()[-1])
+
+
+def main(argv: list[str] | None = None) -> int:
+  parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+  parser.add_argument("--runs", type=int, default=5, help="Fresh interpreters per mode")
+  parser.add_argument("--database-url", help="Use this database instead of a temporary SQLite file")
+  args = parser.parse_args(argv)
+
+  tmpdir = tempfile.mkdtemp(prefix="startup-bench-")
+  env = dict(os.environ)
+  env.setdefault("JWT_SECRET_KEY", "bench")
+  env["REDIS_URL"] = "memory://"
+  env["DATABASE_URL"] = args.database_url or f"sqlite:///{tmpdir}/bench.db"
+  env["PYTHONPATH"] = str(BACKEND_DIR)
+  os.environ.update(env)
+  sys.path.insert(0, str(BACKEND_DIR))
+  _prepare_database(env)
+
+  results = []
+  for mode, flags in MODES.items():
+    runs = [_run({**env, **flags}) for _ in range(args.runs)]
+    results.append({
+      "mode": mode,
+      "runs": args.runs,
+      "importMs": round(statistics.median(r["import"] for r in runs) * 1000, 1),
+      "startupMs": round(statistics.median(r["startup"] for r in runs) * 1000, 1),
+    })
+  for result in results:
+    print(json.dumps(result))
+  return 0
+
+
+if __name__ == "__main__":
+  sys.exit(main())
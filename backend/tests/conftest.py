@@ -0,0 +1,72 @@
+"""Shared test setup.
+
+Settings are read when the app modules are imported, so the environment is filled in
+here, before any test imports them: a throwaway SQLite database, the in-process chat bus
+and no Prometheus multiprocess directory. Set ``TEST_POSTGRES_URL`` to an empty
+PostgreSQL database to run the database tests against it as well.
+"""
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(BACKEND_DIR))
+
+_tmp = Path(tempfile.mkdtemp(prefix="accesske-tests-"))
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_tmp / 'app.db'}")
+os.environ.setdefault("JWT_SECRET_KEY", "test")
+os.environ.setdefault("REDIS_URL", "memory://")
+os.environ.setdefault("LOG_LEVEL", "WARNING")
+os.environ.pop("PROMETHEUS_MULTIPROC_DIR", None)
+
+import pytest  # noqa: E402
+
+
+def database_urls() -> list[str]:
+  urls = [f"sqlite:///{_tmp / 'db.sqlite'}"]
+  if os.environ.get("TEST_POSTGRES_URL"):
+    urls.append(os.environ["TEST_POSTGRES_URL"])
+  return urls
+
+
+@pytest.fixture(params=database_urls(), ids=lambda url: url.split(":", 1)[0])
+def engine(request):
+  """A fresh schema (create_all, search DDL included) on each configured database"""
+  from sqlalchemy import create_engine
+
+  from app.models import alumni, chat, event, notice, user  # noqa: F401  every table
+  from app.models.base import Base
+
+  engine = create_engine(request.param)
+  Base.metadata.drop_all(engine)
+  Base.metadata.create_all(engine)
+  yield engine
+  Base.metadata.drop_all(engine)
+  engine.dispose()
+
+
+@pytest.fixture
+def db(engine):
+  from sqlalchemy.orm import Session
+
+  with Session(engine) as session:
+    yield session
+
+
+@pytest.fixture
+def fake_redis(monkeypatch):
+  """The chat cache on a fakeredis server; returns a sync client of that server"""
+  fakeredis = pytest.importorskip("fakeredis")
+  pytest.importorskip("lupa")  # the cache's Lua scripts
+  from app.services import chat_cache
+
+  server = fakeredis.FakeServer()
+
+  async def get_redis():
+    return fakeredis.FakeAsyncRedis(server=server)
+
+  monkeypatch.setattr(chat_cache, "ENABLED", True)
+  monkeypatch.setattr(chat_cache, "get_sync_redis", lambda: fakeredis.FakeRedis(server=server))
+  monkeypatch.setattr(chat_cache, "get_redis", get_redis)
+  return fakeredis.FakeRedis(server=server)
@@ -0,0 +1,78 @@
+"""The in-process chat bus (``REDIS_URL=memory://``), before and after its listener starts."""
+import asyncio
+
+import anyio.to_thread
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import get_settings
+from app.models.chat import ChatOutbox
+from app.services import chat_broadcast, chat_bus, chat_outbox
+from app.utils import wire
+
+settings = get_settings()
+
+
+@pytest.fixture
+def bus(monkeypatch):
+  bus = chat_bus.MemoryBus()
+  monkeypatch.setattr(chat_broadcast, "bus", bus)
+  return bus
+
+
+def test_publish_without_a_listener_raises(bus):
+  with pytest.raises(chat_bus.BusNotReady):
+    bus.publish_many_sync([("chat_messages", b"lost")])
+
+
+def test_publish_reaches_subscribers_once_listening(bus):
+  async def scenario():
+    pubsub = await bus.pubsub()
+    await pubsub.subscribe("chat_messages")
+    await anyio.to_thread.run_sync(bus.publish_many_sync, [("chat_messages", b"1"), ("chat_events", b"2"), ("chat_messages", b"3")])
+    received = [await pubsub.get_message(timeout=1) for _ in range(2)]
+    assert [message["data"] for message in received] == [b"1", b"3"]
+    assert await pubsub.get_message(timeout=0.05) is None
+
+  asyncio.run(scenario())
+
+
+def test_relay_keeps_rows_until_the_listener_starts(bus, engine, db, monkeypatch):
+  monkeypatch.setattr(chat_outbox, "SessionLocal", sessionmaker(bind=engine))
+  monkeypatch.setattr(settings, "chat_outbox_poll_ms", 10)
+  chat_outbox.enqueue(db, "message_deleted", {"id": "early"})
+  db.commit()
+
+  def pending() -> int:
+    db.expire_all()
+    return db.scalar(select(func.count()).select_from(ChatOutbox))
+
+  with pytest.raises(chat_bus.BusNotReady):
+    chat_outbox.relay_once(10)
+  assert pending() == 1
+
+  async def scenario():
+    relay = asyncio.create_task(chat_outbox.run_relay())
+    try:
+      # The relay keeps polling through BusNotReady without dropping the row
+      await asyncio.sleep(0.1)
+      assert not relay.done()
+      assert await anyio.to_thread.run_sync(pending) == 1
+
+      pubsub = await bus.pubsub()
+      await pubsub.subscribe("chat_events")
+      message = await pubsub.get_message(timeout=2)
+      payload, _ = wire.decode(message["data"])
+      assert payload["data"]["id"] == "early"
+      # Deleted once published
+      for _ in range(100):
+        if not await anyio.to_thread.run_sync(pending):
+          break
+        await asyncio.sleep(0.01)
+    finally:
+      relay.cancel()
+      await asyncio.gather(relay, return_exceptions=True)
+
+  asyncio.run(scenario())
+  assert pending() == 0
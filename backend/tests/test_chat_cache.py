@@ -0,0 +1,86 @@
+"""The recent-messages cache against fakeredis: fills, pushes and the races between them."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+
+from app.core.config import get_settings
+from app.models.chat import ChatMessage
+from app.models.user import User
+from app.services import chat_cache
+
+settings = get_settings()
+
+
+def _user(db) -> User:
+  user = User(email="cache@example.org", hashed_password="!", first_name="Cache", last_name="Test")
+  db.add(user)
+  db.commit()
+  return user
+
+
+def _message(db, user, text, minutes_ago=0) -> ChatMessage:
+  message = ChatMessage(
+    sender_id=user.id, sender_name=user.first_name, text=text,
+    created_at=datetime.now(timezone.utc) - timedelta(minutes=minutes_ago),
+  )
+  db.add(message)
+  db.commit()
+  return message
+
+
+def _texts(rows) -> list[str]:
+  return [row["text"] for row in rows]
+
+
+def test_cold_read_fills_and_later_pushes_are_served(db, fake_redis):
+  user = _user(db)
+  _message(db, user, "first", minutes_ago=1)
+  assert _texts(chat_cache.get_recent_messages(db, 10)) == ["first"]
+  assert fake_redis.exists("chat:recent:complete")
+
+  asyncio.run(chat_cache.push_message(_message(db, user, "second")))
+  assert fake_redis.llen("chat:recent") == 2
+  assert _texts(chat_cache.get_recent_messages(db, 10)) == ["first", "second"]
+
+
+def test_fill_racing_a_new_message_is_dropped(db, fake_redis, monkeypatch):
+  user = _user(db)
+  _message(db, user, "old", minutes_ago=1)
+  load = chat_cache._load_from_db
+
+  def load_then_race(*args, **kwargs):
+    rows = load(*args, **kwargs)
+    # Stored and pushed after the fill read the database, before it writes the cache
+    asyncio.run(chat_cache.push_message(_message(db, user, "raced")))
+    return rows
+
+  monkeypatch.setattr(chat_cache, "_load_from_db", load_then_race)
+  chat_cache.get_recent_messages(db, 10)
+  assert not fake_redis.exists("chat:recent", "chat:recent:complete")
+
+  monkeypatch.setattr(chat_cache, "_load_from_db", load)
+  assert _texts(chat_cache.get_recent_messages(db, 10)) == ["old", "raced"]
+
+
+def test_fill_racing_an_invalidation_is_dropped(db, fake_redis, monkeypatch):
+  user = _user(db)
+  _message(db, user, "deleted", minutes_ago=1)
+  load = chat_cache._load_from_db
+
+  def load_then_invalidate(*args, **kwargs):
+    rows = load(*args, **kwargs)
+    chat_cache.invalidate()
+    return rows
+
+  monkeypatch.setattr(chat_cache, "_load_from_db", load_then_invalidate)
+  chat_cache.get_recent_messages(db, 10)
+  assert not fake_redis.exists("chat:recent", "chat:recent:complete")
+
+
+def test_version_and_generation_keys_expire(db, fake_redis):
+  user = _user(db)
+  message = _message(db, user, "hello")
+  asyncio.run(chat_cache.push_message(message))
+  chat_cache.remove_message(message.id)
+  assert 0 < fake_redis.ttl("chat:recent:version") <= settings.chat_cache_ttl_seconds
+  chat_cache.invalidate()
+  assert 0 < fake_redis.ttl(chat_cache.GENERATION_KEY) <= settings.chat_cache_ttl_seconds
@@ -0,0 +1,105 @@
+"""Idempotent chat sends: the client_id cache, the database backstop and key pruning."""
+import asyncio
+from datetime import datetime, timedelta, timezone
+from types import SimpleNamespace
+
+import pytest
+from sqlalchemy import select
+from sqlalchemy.orm import sessionmaker
+
+from app.core.config import get_settings
+from app.models.chat import ChatMessage, ChatMessageKey
+from app.models.user import User
+from app.routers import chat as chat_router
+from app.services import chat_dedupe
+
+settings = get_settings()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+  now = SimpleNamespace(value=1000.0)
+  monkeypatch.setattr(chat_dedupe.time, "monotonic", lambda: now.value)
+  monkeypatch.setattr(chat_dedupe, "_local", chat_dedupe.OrderedDict())
+  return now
+
+
+def _user(db) -> User:
+  user = User(email="dedupe@example.org", hashed_password="!", first_name="Dedupe", last_name="Test")
+  db.add(user)
+  db.commit()
+  return user
+
+
+def test_remembered_ids_expire_after_the_window(clock):
+  asyncio.run(chat_dedupe.remember("user", "client-1", "message-1"))
+  assert asyncio.run(chat_dedupe.lookup("user", "client-1")) == "message-1"
+  assert asyncio.run(chat_dedupe.lookup("other", "client-1")) is None
+  clock.value += settings.chat_dedupe_ttl_seconds + 1
+  assert asyncio.run(chat_dedupe.lookup("user", "client-1")) is None
+
+
+def test_local_cache_is_bounded(clock, monkeypatch):
+  monkeypatch.setattr(chat_dedupe, "LOCAL_CACHE_SIZE", 3)
+  for i in range(5):
+    asyncio.run(chat_dedupe.remember("user", f"client-{i}", f"message-{i}"))
+  assert [client_id for _, client_id in chat_dedupe._local] == ["client-2", "client-3", "client-4"]
+
+
+def test_a_retried_client_id_returns_the_stored_message(engine, db, monkeypatch):
+  monkeypatch.setattr(chat_router, "SessionLocal", sessionmaker(bind=engine))
+  user = _user(db)
+  chat, data, existing_id = chat_router._store_message(user.id, None, "hello", "client-1")
+  assert existing_id is None and data["id"] == chat.id
+  assert chat_dedupe.stored_message_id(db, user.id, "client-1") == chat.id
+
+  # The cache missed (another worker, or evicted): the unique key catches the retry
+  assert chat_router._store_message(user.id, None, "hello", "client-1") == (None, None, chat.id)
+  assert chat_router._store_message(user.id, None, "hello", None)[2] is None
+  db.expire_all()
+  assert [row.text for row in db.scalars(select(ChatMessage))] == ["hello", "hello"]
+
+
+def _keys(db, user, ages_seconds):
+  now = datetime.now(timezone.utc)
+  db.add_all([
+    ChatMessageKey(sender_id=user.id, client_id=f"client-{age}", message_id=f"message-{age}",
+                   created_at=now - timedelta(seconds=age))
+    for age in ages_seconds
+  ])
+  db.commit()
+
+
+def _remaining(db) -> list[str]:
+  db.expire_all()
+  return sorted(db.scalars(select(ChatMessageKey.client_id)))
+
+
+def test_prune_keys_deletes_keys_past_the_window(db):
+  user = _user(db)
+  ttl = settings.chat_dedupe_ttl_seconds
+  _keys(db, user, [10, ttl - 60, ttl + 60, ttl * 3])
+  assert chat_dedupe.prune_keys(db) == 2
+  assert _remaining(db) == ["client-10", f"client-{ttl - 60}"]
+
+
+def test_pruning_runs_on_its_own_schedule(engine, db, monkeypatch):
+  """Keys are pruned by their own job, not by chat retention (off by default)"""
+  monkeypatch.setattr(chat_dedupe, "SessionLocal", sessionmaker(bind=engine))
+  user = _user(db)
+  ttl = settings.chat_dedupe_ttl_seconds
+  _keys(db, user, [10, ttl + 60])
+
+  async def scenario():
+    job = asyncio.create_task(chat_dedupe.run_key_pruning_periodically(0.05))
+    try:
+      for _ in range(100):
+        await asyncio.sleep(0.02)
+        if len(_remaining(db)) == 1:
+          break
+    finally:
+      job.cancel()
+      await asyncio.gather(job, return_exceptions=True)
+
+  asyncio.run(scenario())
+  assert _remaining(db) == ["client-10"]
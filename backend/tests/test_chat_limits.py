@@ -0,0 +1,122 @@
+"""Chat rate limiting (token buckets per socket and per user) and slow-consumer detection."""
+import asyncio
+import queue
+from types import SimpleNamespace
+
+import pytest
+
+from app.core.config import get_settings
+from app.services import chat_limits
+
+settings = get_settings()
+
+
+@pytest.fixture
+def clock(monkeypatch):
+  """A controllable time.monotonic/time.time for the buckets"""
+  now = SimpleNamespace(value=1000.0)
+  monkeypatch.setattr(chat_limits.time, "monotonic", lambda: now.value)
+  monkeypatch.setattr(chat_limits.time, "time", lambda: now.value)
+  monkeypatch.setattr(chat_limits, "_sid_buckets", {})
+  monkeypatch.setattr(chat_limits, "_user_buckets", {})
+  monkeypatch.setattr(chat_limits, "_user_buckets_swept", now.value)
+  return now
+
+
+def _allowed(sid: str, user_id: str, times: int) -> int:
+  async def send():
+    return sum([await chat_limits.allow_message(sid, user_id) for _ in range(times)])
+
+  return asyncio.run(send())
+
+
+def test_bucket_allows_the_burst_then_refills_at_the_rate(clock):
+  bucket = chat_limits.TokenBucket(rate=2, burst=3)
+  assert [bucket.take() for _ in range(4)] == [True, True, True, False]
+  clock.value += 0.5
+  assert bucket.take() and not bucket.take()
+  clock.value += 60
+  assert sum(bucket.take() for _ in range(10)) == 3
+
+
+def test_socket_limit_applies_per_sid(clock, monkeypatch):
+  monkeypatch.setattr(settings, "chat_user_rate_limit_per_second", 0)
+  burst = settings.chat_rate_limit_burst
+  assert _allowed("sid-1", "user", burst + 5) == burst
+  assert _allowed("sid-2", "user", 1) == 1
+  chat_limits.forget("sid-1")
+  assert _allowed("sid-1", "user", 1) == 1
+
+
+def test_user_limit_spans_sockets(clock, monkeypatch):
+  monkeypatch.setattr(settings, "chat_rate_limit_per_second", 0)
+  burst = settings.chat_user_rate_limit_burst
+  assert _allowed("sid-1", "user", burst // 2) + _allowed("sid-2", "user", burst) == burst
+  assert _allowed("sid-3", "other", 1) == 1
+
+
+def test_idle_user_buckets_are_swept(clock, monkeypatch):
+  monkeypatch.setattr(settings, "chat_rate_limit_per_second", 0)
+  for i in range(100):
+    _allowed("sid", f"user-{i}", 1)
+  assert len(chat_limits._user_buckets) == 100
+  clock.value += settings.chat_user_rate_limit_burst / settings.chat_user_rate_limit_per_second
+  _allowed("sid", "active", 1)
+  assert list(chat_limits._user_buckets) == ["active"]
+
+
+def test_redis_user_bucket_is_shared(clock, monkeypatch):
+  fakeredis = pytest.importorskip("fakeredis")
+  pytest.importorskip("lupa")
+  server = fakeredis.FakeServer()
+
+  async def get_redis():
+    return fakeredis.FakeAsyncRedis(server=server)
+
+  monkeypatch.setattr(chat_limits, "REDIS_ENABLED", True)
+  monkeypatch.setattr(chat_limits, "get_redis", get_redis)
+  monkeypatch.setattr(settings, "chat_rate_limit_per_second", 0)
+  burst = settings.chat_user_rate_limit_burst
+  assert _allowed("sid-1", "user", burst + 5) == burst
+  clock.value += 1 / settings.chat_user_rate_limit_per_second
+  assert _allowed("sid-2", "user", 2) == 1
+  assert 0 < fakeredis.FakeRedis(server=server).ttl(f"{chat_limits.USER_BUCKET_PREFIX}user")
+
+
+def _sio(rooms: dict[str, list[str]], queued: dict[str, int]):
+  """Just enough of an AsyncServer: room participants and engine.io socket queues"""
+  disconnected = []
+
+  def get_participants(namespace, room):
+    return [(f"sid-{eio_sid}", eio_sid) for eio_sid in rooms.get(room, [])]
+
+  sockets = {}
+  for eio_sid, size in queued.items():
+    sockets[eio_sid] = SimpleNamespace(queue=queue.Queue())
+    for _ in range(size):
+      sockets[eio_sid].queue.put(None)
+
+  async def disconnect(sid):
+    disconnected.append(sid)
+
+  sio = SimpleNamespace(
+    manager=SimpleNamespace(get_participants=get_participants),
+    eio=SimpleNamespace(sockets=sockets),
+    disconnect=disconnect,
+  )
+  return sio, disconnected
+
+
+def test_slow_consumers_only_checks_the_room(monkeypatch):
+  limit = settings.chat_outbound_queue_limit
+  sio, disconnected = _sio(
+    {"room": ["a", "b"], "other": ["c"]},
+    {"a": limit + 1, "b": 0, "c": limit + 1},
+  )
+  monkeypatch.setattr(settings, "chat_slow_consumer_policy", "drop")
+  assert asyncio.run(chat_limits.slow_consumers(sio, "room")) == ["sid-a"]
+  assert disconnected == []
+
+  monkeypatch.setattr(settings, "chat_slow_consumer_policy", "disconnect")
+  assert asyncio.run(chat_limits.slow_consumers(sio, "other")) == ["sid-c"]
+  assert disconnected == ["sid-c"]
@@ -0,0 +1,88 @@
+"""The chat outbox relay: publish order, retries after a failed publish and cache updates."""
+import pytest
+from sqlalchemy import func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.models.chat import ChatMessage, ChatOutbox
+from app.models.user import User
+from app.services import chat_broadcast, chat_cache, chat_outbox
+from app.utils.serializers import serialize_chat_message
+
+
+@pytest.fixture
+def published(engine, monkeypatch):
+  """Relay against the test database; collects what it publishes"""
+  published = []
+  monkeypatch.setattr(chat_outbox, "SessionLocal", sessionmaker(bind=engine))
+  monkeypatch.setattr(chat_broadcast, "publish_many_sync", lambda events: published.extend(events))
+  return published
+
+
+def _pending(db) -> int:
+  db.expire_all()
+  return db.scalar(select(func.count()).select_from(ChatOutbox))
+
+
+def _enqueue(db, *events):
+  for event, data, room_id in events:
+    chat_outbox.enqueue(db, event, data, room_id)
+  db.commit()
+
+
+def test_events_are_published_in_order_with_their_sequence(db, published):
+  _enqueue(db, *[("message_deleted", {"id": f"m{i}"}, None) for i in range(5)])
+  assert chat_outbox.relay_once(3) == 3
+  assert _pending(db) == 2
+  assert chat_outbox.relay_once(3) == 2
+  assert chat_outbox.relay_once(3) == 0
+
+  assert [data["id"] for _, data, _ in published] == [f"m{i}" for i in range(5)]
+  seqs = [data["seq"] for _, data, _ in published]
+  assert seqs == sorted(seqs) and len(set(seqs)) == 5
+  assert _pending(db) == 0
+
+
+def test_failed_publish_keeps_the_rows_for_a_retry(db, published, monkeypatch):
+  _enqueue(db, ("message_deleted", {"id": "a"}, None), ("message_deleted", {"id": "b"}, "room"))
+
+  def unavailable(events):
+    raise ConnectionError("redis is down")
+
+  monkeypatch.setattr(chat_broadcast, "publish_many_sync", unavailable)
+  with pytest.raises(ConnectionError):
+    chat_outbox.relay_once(10)
+  assert _pending(db) == 2
+
+  monkeypatch.setattr(chat_broadcast, "publish_many_sync", lambda events: published.extend(events))
+  assert chat_outbox.relay_once(10) == 2
+  assert [(data["id"], room_id) for _, data, room_id in published] == [("a", None), ("b", "room")]
+  assert _pending(db) == 0
+
+
+def test_relayed_events_update_the_cache(db, published, fake_redis):
+  user = User(email="outbox@example.org", hashed_password="!", first_name="Outbox", last_name="Test")
+  db.add(user)
+  db.commit()
+  messages = [ChatMessage(sender_id=user.id, sender_name="Outbox", text=text) for text in ("kept", "edited", "deleted")]
+  db.add_all(messages)
+  db.commit()
+  assert len(chat_cache.get_recent_messages(db, 10)) == 3
+
+  kept, edited, deleted = messages
+  edited.text = "edited twice"
+  _enqueue(
+    db,
+    ("message_updated", {**serialize_chat_message(edited), "edited": True}, None),
+    ("message_deleted", {"id": deleted.id}, None),
+  )
+  db.delete(deleted)
+  db.commit()
+  chat_outbox.relay_once(10)
+  assert fake_redis.exists("chat:recent:complete")
+  cached = chat_cache.get_recent_messages(db, 10)
+  assert [(row["id"], row["text"]) for row in cached] == [(kept.id, "kept"), (edited.id, "edited twice")]
+  assert all("edited" not in row for row in cached)
+
+  _enqueue(db, ("messages_cleared", {}, None))
+  chat_outbox.relay_once(10)
+  assert not fake_redis.exists("chat:recent", "chat:recent:complete")
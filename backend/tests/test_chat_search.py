@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+from app.models.chat import ChatMessage, rebuild_sqlite_search
+from app.models.user import User, UserRole
+from app.services import chat_search
+
+
+def _seed(db) -> User:
+  user = User(email="sender@example.org", hashed_password="x", first_name="Ada", last_name="Lovelace",
+              role=UserRole.ALUMNI)
+  db.add(user)
+  db.flush()
+  now = datetime.now(timezone.utc)
+  texts = ["meeting tomorrow"] * 12 + ["meeting meeting tomorrow"] * 6 + ["the meeting moved to tomorrow"] * 7
+  for i, text in enumerate(texts):
+    # Pairs share a timestamp too, so ties go all the way down to the id
+    db.add(ChatMessage(room_id=None, sender_id=user.id, sender_name="Ada", text=text,
+                       created_at=now - timedelta(minutes=i // 2)))
+  db.commit()
+  return user
+
+
+def test_pages_cover_tied_ranks_exactly_once(db):
+  _seed(db)
+  seen, ranks, cursor, pages = [], [], None, 0
+  while True:
+    results, cursor = chat_search.search_messages(db, "meeting", [None], limit=4, cursor=cursor)
+    seen += [result["id"] for result in results]
+    ranks += [result["rank"] for result in results]
+    pages += 1
+    if cursor is None:
+      break
+    assert pages < 20, "pagination does not terminate"
+
+  assert len(set(ranks)) < len(ranks), "the seed should produce tied ranks"
+  assert len(seen) == 25
+  assert len(set(seen)) == 25
+  assert ranks == sorted(ranks, reverse=True)
+
+
+def test_cursor_round_trip_and_invalid_cursor():
+  created_at = datetime(2026, 1, 2, 3, 4, 5, tzinfo=timezone.utc)
+  cursor = chat_search.encode_cursor(0.0607927106320858, created_at, "abc")
+  assert chat_search.decode_cursor(cursor) == (0.0607927106320858, created_at, "abc")
+  with pytest.raises(ValueError):
+    chat_search.decode_cursor("not-a-cursor")
+
+
+def test_rebuild_after_a_table_copy_renumbers_rowids(db, engine):
+  """What an Alembic batch migration does on SQLite: copy the rows into a new table"""
+  if engine.dialect.name != "sqlite":
+    pytest.skip("the FTS5 index is SQLite only")
+  user = _seed(db)
+  now = datetime.now(timezone.utc)
+  for i in range(5):
+    db.add(ChatMessage(room_id=None, sender_id=user.id, sender_name="Ada", text=f"zebra crossing {i}",
+                       created_at=now - timedelta(days=1, minutes=i)))
+  db.commit()
+
+  with engine.begin() as conn:
+    create = conn.exec_driver_sql("SELECT sql FROM sqlite_master WHERE name = 'chat_messages'").scalar()
+    conn.exec_driver_sql("CREATE TABLE _chat_messages_copy AS SELECT * FROM chat_messages ORDER BY created_at")
+    conn.exec_driver_sql("DROP TABLE chat_messages")
+    conn.exec_driver_sql(create)
+    conn.exec_driver_sql("INSERT INTO chat_messages SELECT * FROM _chat_messages_copy")
+    conn.exec_driver_sql("DROP TABLE _chat_messages_copy")
+
+  def texts(q: str) -> list[str]:
+    return [result["text"] for result in chat_search.search_messages(db, q, [None], limit=50)[0]]
+
+  assert not all("zebra" in text for text in texts("zebra")), "the copy should have broken the index"
+  with engine.begin() as conn:
+    assert rebuild_sqlite_search(conn)
+  assert sorted(texts("zebra")) == [f"zebra crossing {i}" for i in range(5)]
+  # The dropped triggers are back: new rows are indexed
+  db.add(ChatMessage(room_id=None, sender_id=user.id, sender_name="Ada", text="zebra again", created_at=now))
+  db.commit()
+  assert "zebra again" in texts("zebra")
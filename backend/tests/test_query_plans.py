@@ -0,0 +1,166 @@
+"""Do the listing, report and delete endpoints use their indexes?
+
+Migrates the app's throwaway SQLite database to head, seeds it and runs ``ANALYZE``, then
+calls each endpoint (and the upload collector) while recording the statements it
+executes, and asks the planner (``EXPLAIN QUERY PLAN``) how it runs them. The statements
+are the ones the routers and services really issue, so a query change that loses its
+index fails here.
+"""
+import random
+import re
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from sqlalchemy import event, insert
+
+from conftest import BACKEND_DIR
+
+USERS = 2000
+
+# (method, path, indexes at least one of the request's statements must use); the
+# chat deletes come last because they remove the seeded messages
+CHECKS = [
+  ("GET", "/api/alumni", {"ix_users_role_first_name"}),
+  ("GET", "/api/admin/users", {"ix_users_created_at"}),
+  ("GET", "/api/reports/stats", {"ix_users_role_first_name", "ix_users_active"}),
+  ("GET", "/api/reports/cohort", {"ix_alumni_profiles_cohort"}),
+  ("GET", "/api/reports/trends", {"ix_users_created_at"}),
+  ("GET", "/api/events", {"ix_events_date"}),
+  ("GET", "/api/notices", {"ix_notices_created_at"}),
+  ("GET", "/api/chat/messages", {"ix_chat_messages_room_id_created_at"}),
+  ("DELETE", "/api/admin/users/{user_id}", {"ix_chat_messages_sender_id_created_at"}),
+  # The clear endpoint deletes in batches in a background task
+  ("DELETE", "/api/chat/messages", {"ix_chat_messages_created_at"}),
+]
+
+
+def _migrate(database_url: str):
+  from alembic import command
+  from alembic.config import Config
+
+  # No ini file: alembic.ini's logging setup would disable the app's loggers
+  config = Config()
+  config.set_main_option("script_location", str(BACKEND_DIR / "alembic"))
+  config.set_main_option("sqlalchemy.url", database_url)
+  command.upgrade(config, "head")
+
+
+def _seed(conn, users: int) -> tuple[str, str]:
+  """Returns the id of an admin and of an alumnus with messages"""
+  from app.models.alumni import AlumniProfile
+  from app.models.chat import ChatMessage
+  from app.models.event import Event
+  from app.models.notice import Notice
+  from app.models.user import User, UserRole
+
+  rng = random.Random(42)
+  now = datetime.now(timezone.utc)
+  user_rows = [
+    {
+      "id": str(uuid.uuid4()), "email": f"seed{i}@example.org", "hashed_password": "x",
+      "first_name": f"First{rng.randrange(10**6):06d}", "last_name": f"Last{i}",
+      "role": UserRole.ADMIN if i % 100 == 0 else UserRole.ALUMNI, "active": rng.random() < 0.9,
+      "created_at": now - timedelta(days=rng.randrange(1500)), "updated_at": now,
+    }
+    for i in range(users)
+  ]
+  conn.execute(insert(User), user_rows)
+  conn.execute(insert(AlumniProfile), [
+    {"id": str(uuid.uuid4()), "user_id": row["id"], "cohort": f"{2000 + rng.randrange(25)}", "skills": [],
+     "updated_at": now}
+    for row in user_rows
+  ])
+  conn.execute(insert(Event), [
+    {"id": str(uuid.uuid4()), "title": f"Event {i}", "description": "", "venue": "",
+     "date": now + timedelta(days=rng.randrange(-700, 300)), "created_at": now,
+     "poster_path": f"posters/seed{i}.png" if i % 3 == 0 else None}
+    for i in range(users // 10)
+  ])
+  conn.execute(insert(Notice), [
+    {"id": str(uuid.uuid4()), "title": f"Notice {i}", "content": "", "created_at": now - timedelta(hours=i)}
+    for i in range(users // 10)
+  ])
+  conn.execute(insert(ChatMessage), [
+    {"id": str(uuid.uuid4()), "room_id": None, "sender_id": rng.choice(user_rows)["id"], "sender_name": "Seed",
+     "text": f"message {i}", "created_at": now - timedelta(minutes=rng.randrange(60 * 24 * 700))}
+    for i in range(users * 4)
+  ])
+  return user_rows[0]["id"], user_rows[1]["id"]
+
+
+@pytest.fixture(scope="module")
+def seeded_app():
+  from fastapi.testclient import TestClient
+
+  from app.core.config import get_settings
+  from app.core.database import engine
+  from app.core.security import create_access_token
+  from app.main import app
+
+  _migrate(str(get_settings().database_url))
+  with engine.begin() as conn:
+    admin_id, alumnus_id = _seed(conn, USERS)
+    conn.exec_driver_sql("ANALYZE")
+  token = create_access_token({"sub": admin_id, "role": "admin"})
+  with TestClient(app, headers={"Authorization": f"Bearer {token}"}) as client:
+    yield client, engine, {"user_id": alumnus_id}
+
+
+def _plan_indexes(engine, statements) -> set[str]:
+  used = set()
+  with engine.connect() as conn:
+    for statement, parameters in statements:
+      rows = conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters).fetchall()
+      plan = "\n".join(str(row[-1]) for row in rows)
+      used |= set(re.findall(r"USING (?:COVERING )?INDEX (\w+)", plan))
+  return used
+
+
+@contextmanager
+def _recording(engine):
+  """Collect the (statement, parameters) the engine executes inside the block"""
+  statements = []
+
+  def record(conn, cursor, statement, parameters, context, executemany):
+    if not executemany:
+      statements.append((statement, parameters))
+
+  event.listen(engine, "before_cursor_execute", record)
+  try:
+    yield statements
+  finally:
+    event.remove(engine, "before_cursor_execute", record)
+
+
+def test_endpoints_use_their_indexes(seeded_app):
+  client, engine, ids = seeded_app
+  missing = {}
+  for method, path, expected in CHECKS:
+    with _recording(engine) as statements:
+      response = client.request(method, path.format(**ids))
+    assert response.status_code == 200, (path, response.text)
+    assert statements, f"{method} {path} ran no statements"
+
+    used = _plan_indexes(engine, statements)
+    if not expected <= used:
+      missing[f"{method} {path}"] = {"expected": sorted(expected), "used": sorted(used)}
+  assert not missing, missing
+
+
+def test_upload_gc_uses_the_poster_path_index(seeded_app, tmp_path):
+  from sqlalchemy.orm import Session
+
+  from app.services.upload_gc import collect_orphaned_uploads
+
+  _, engine, _ = seeded_app
+  directory = tmp_path / "posters"
+  directory.mkdir()
+  for i in range(20):
+    (directory / f"seed{i}.png").write_bytes(b"poster")
+  with _recording(engine) as statements, Session(engine) as db:
+    report = collect_orphaned_uploads(db, grace_seconds=0, dry_run=True, directory=directory)
+  assert report["scanned"] == 20 and report["orphaned"] == 13
+  used = _plan_indexes(engine, statements)
+  assert "ix_events_poster_path" in used, used
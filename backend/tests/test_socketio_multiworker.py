@@ -0,0 +1,203 @@
+"""Socket.IO delivery across worker processes with ``CHAT_SOCKETIO_MANAGER=redis``.
+
+Starts two uvicorn workers against a fakeredis TCP server (the same stand-in
+``benchmarks.chat_load`` uses) and a shared SQLite file, connects one client to each and
+checks that emits made on one worker reach the client connected to the other.
+"""
+import asyncio
+import os
+import socket
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+
+import pytest
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("aiohttp")  # python-socketio's asyncio client
+import httpx  # noqa: E402
+import socketio  # noqa: E402
+
+from conftest import BACKEND_DIR  # noqa: E402
+
+TIMEOUT = 10
+
+
+def _free_port() -> int:
+  with socket.socket() as s:
+    s.bind(("127.0.0.1", 0))
+    return s.getsockname()[1]
+
+
+def _seed(database_url: str) -> tuple[dict, str]:
+  """Users a and b, and a group room b belongs to; returns their tokens and the room id"""
+  from sqlalchemy import create_engine
+  from sqlalchemy.orm import Session
+
+  from app.core.security import create_access_token, token_claims
+  from app.models import alumni, chat, event, notice, user  # noqa: F401  every table
+  from app.models.base import Base
+
+  engine = create_engine(database_url)
+  Base.metadata.create_all(engine)
+  with Session(engine) as db:
+    users = {
+      name: user.User(email=f"{name}@example.org", hashed_password="!", first_name=name.upper(), last_name="Test")
+      for name in ("a", "b")
+    }
+    db.add_all(users.values())
+    db.flush()
+    room = chat.ChatRoom(name="Group", kind="group", created_by_id=users["b"].id)
+    db.add(room)
+    db.flush()
+    db.add(chat.ChatRoomMember(room_id=room.id, user_id=users["b"].id))
+    db.commit()
+    tokens = {name: create_access_token(token_claims(u)) for name, u in users.items()}
+    room_id = room.id
+  engine.dispose()
+  return tokens, room_id
+
+
+@pytest.fixture(scope="module")
+def cluster(tmp_path_factory):
+  port = _free_port()
+  server = fakeredis.TcpFakeServer(("127.0.0.1", port), server_type="redis")
+  threading.Thread(target=server.serve_forever, daemon=True).start()
+
+  database_url = f"sqlite:///{tmp_path_factory.mktemp('multiworker') / 'chat.db'}"
+  tokens, room_id = _seed(database_url)
+  env = dict(
+    os.environ,
+    DATABASE_URL=database_url,
+    REDIS_URL=f"redis://127.0.0.1:{port}/0",
+    CHAT_SOCKETIO_MANAGER="redis",
+    DB_CREATE_ALL_ON_STARTUP="false",
+    BOOTSTRAP_ADMIN_ON_STARTUP="false",
+    METRICS_ENABLED="false",
+  )
+  ports = [_free_port(), _free_port()]
+  procs = [
+    subprocess.Popen(
+      [sys.executable, "-m", "uvicorn", "app.main:app", "--port", str(worker_port), "--log-level", "warning"],
+      cwd=BACKEND_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+    for worker_port in ports
+  ]
+  try:
+    deadline = time.time() + 30
+    for worker_port in ports:
+      while True:
+        try:
+          urllib.request.urlopen(f"http://127.0.0.1:{worker_port}/health", timeout=1)
+          break
+        except OSError:
+          if time.time() > deadline:
+            pytest.fail(f"Worker on port {worker_port} did not start")
+          time.sleep(0.1)
+    yield {
+      "urls": [f"http://127.0.0.1:{worker_port}" for worker_port in ports],
+      "redis_url": env["REDIS_URL"],
+      "tokens": tokens,
+      "room_id": room_id,
+    }
+  finally:
+    for proc in procs:
+      proc.terminate()
+    for proc in procs:
+      try:
+        proc.wait(timeout=10)
+      except subprocess.TimeoutExpired:
+        proc.kill()
+    server.shutdown()
+
+
+class Recorder:
+  """Socket.IO client remembering every event it receives"""
+
+  def __init__(self):
+    self.client = socketio.AsyncClient(reconnection=False)
+    self.events: list[tuple[str, object]] = []
+    self._changed = asyncio.Event()
+    self.client.on("*", self._record)
+
+  async def _record(self, event, data):
+    self.events.append((event, data))
+    self._changed.set()
+
+  async def connect(self, url: str, token: str):
+    await self.client.connect(url, auth={"token": token}, transports=["websocket"], wait_timeout=TIMEOUT)
+
+  async def wait_for(self, event: str, match=lambda data: True):
+    async def received():
+      while True:
+        for name, data in self.events:
+          if name == event and match(data):
+            return data
+        self._changed.clear()
+        await self._changed.wait()
+
+    return await asyncio.wait_for(received(), TIMEOUT)
+
+
+def _run(coro):
+  return asyncio.run(coro)
+
+
+def test_message_sent_on_one_worker_reaches_the_other(cluster):
+  async def scenario():
+    a, b = Recorder(), Recorder()
+    await a.connect(cluster["urls"][0], cluster["tokens"]["a"])
+    await b.connect(cluster["urls"][1], cluster["tokens"]["b"])
+    try:
+      ack = await a.client.call("message", {"text": "hello from worker A"}, timeout=TIMEOUT)
+      received = await b.wait_for("message", lambda data: data.get("id") == ack["id"])
+      assert received["text"] == "hello from worker A"
+    finally:
+      await a.client.disconnect()
+      await b.client.disconnect()
+
+  _run(scenario())
+
+
+def test_emit_to_sid_and_user_room_reaches_the_other_worker(cluster):
+  """What ``sio.emit(..., room=sid)`` on a worker that does not hold the socket does: publish
+  on the client manager channel, for the worker that holds it to deliver"""
+  async def scenario():
+    b = Recorder()
+    await b.connect(cluster["urls"][1], cluster["tokens"]["b"])
+    emitter = socketio.AsyncRedisManager(cluster["redis_url"], channel="socketio", write_only=True)
+    try:
+      await emitter.emit("direct", {"to": "sid"}, room=b.client.get_sid())
+      assert await b.wait_for("direct") == {"to": "sid"}
+      await emitter.emit("direct_user", {"to": "user"}, room=f"user_{_subject(cluster['tokens']['b'])}")
+      assert await b.wait_for("direct_user") == {"to": "user"}
+    finally:
+      await b.client.disconnect()
+
+  _run(scenario())
+
+
+def test_room_leave_on_one_worker_removes_sockets_on_the_other(cluster):
+  async def scenario():
+    b = Recorder()
+    await b.connect(cluster["urls"][1], cluster["tokens"]["b"])
+    try:
+      async with httpx.AsyncClient(base_url=cluster["urls"][0]) as http:
+        response = await http.delete(
+          f"/api/chat/rooms/{cluster['room_id']}/members/me",
+          headers={"Authorization": f"Bearer {cluster['tokens']['b']}"},
+        )
+      assert response.status_code == 200
+      assert await b.wait_for("room_left") == {"room_id": cluster["room_id"]}
+    finally:
+      await b.client.disconnect()
+
+  _run(scenario())
+
+
+def _subject(token: str) -> str:
+  from app.core.security import decode_access_token
+
+  return decode_access_token(token)["sub"]
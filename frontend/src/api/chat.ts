@@ -5,24 +5,60 @@ export async function getChatMessages(limit: number = 50) {
   return request(`/api/chat/messages?limit=${limit}`, { method: 'GET' });
 }
 
-export function createChatSocket(userId: string): Socket {
+export function createChatSocket(): Socket {
   const apiUrl = process.env.REACT_APP_API_URL || 'http://localhost:8000';
   const socketUrl = apiUrl.replace(/\/$/, '');
   
-  return io(socketUrl, {
-    auth: {
-      user_id: userId
-    },
+  const socket = io(socketUrl, {
+    // Read on every (re)connect so a fresh login is picked up
+    auth: (cb) => cb({ token: localStorage.getItem('token') }),
     transports: ['websocket', 'polling'],
     reconnection: true,
     reconnectionDelay: 1000,
     reconnectionDelayMax: 5000,
     reconnectionAttempts: Infinity
   });
+
+  // A worker shutting down disconnects its clients on purpose, which socket.io does not
+  // retry by itself; reconnect after a random delay so they spread over the other workers
+  socket.on('disconnect', (reason) => {
+    if (reason === 'io server disconnect') {
+      setTimeout(() => socket.connect(), 500 + Math.random() * 2000);
+    }
+  });
+  return socket;
+}
+
+export interface MessageAck {
+  id: string | null;  // null when rate limited
+  client_id: string | null;
+  duplicate: boolean;
+  rate_limited?: boolean;
+}
+
+export function newClientMessageId(): string {
+  return typeof crypto !== 'undefined' && 'randomUUID' in crypto
+    ? crypto.randomUUID()
+    : `${Date.now()}-${Math.random().toString(36).slice(2)}`;
+}
+
+// Resending with the same clientId is safe: the server stores and broadcasts it once
+export function sendChatMessage(
+  socket: Socket,
+  text: string,
+  clientId: string = newClientMessageId(),
+  onAck?: (ack: MessageAck) => void
+) {
+  const payload = { text, client_id: clientId };
+  if (onAck) {
+    socket.emit('message', payload, onAck);
+  } else {
+    socket.emit('message', payload);
+  }
 }
 
-export function sendChatMessage(socket: Socket, text: string) {
-  socket.emit('message', { text });
+export function sendTyping(socket: Socket, typing: boolean) {
+  socket.emit('typing', { typing });
 }
 
 export async function editChatMessage(messageId: string, text: string) {
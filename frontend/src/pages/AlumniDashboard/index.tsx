@@ -63,7 +63,7 @@ export default function AlumniDashboard() {
   useEffect(() => {
     if (!user?.id) return;
     
-    const socketInstance = createChatSocket(user.id);
+    const socketInstance = createChatSocket();
     setSocket(socketInstance);
 
     socketInstance.on('connect', () => {
@@ -3,11 +3,12 @@ import { useNavigate } from 'react-router-dom';
 import { Socket } from 'socket.io-client';
 import { colors } from '../../theme/colors';
 import { useAuth } from '../../hooks/useAuth';
-import { getChatMessages, createChatSocket, sendChatMessage, editChatMessage, deleteChatMessage, clearAllMessages } from '../../api/chat';
+import { getChatMessages, createChatSocket, newClientMessageId, sendChatMessage, sendTyping, editChatMessage, deleteChatMessage, clearAllMessages } from '../../api/chat';
 import Header from '../../components/layout/Header';
 
 interface Message {
   id?: string;
+  room_id?: string | null;
   sender: string;
   sender_id?: string;
   text: string;
@@ -15,6 +16,10 @@ interface Message {
   edited?: boolean;
 }
 
+// The server repeats a typing state at most once a second; treat silence as stopped
+const TYPING_EXPIRY_MS = 3000;
+const TYPING_RESEND_MS = 1000;
+
 export default function Chat() {
   const { user } = useAuth();
   const navigate = useNavigate();
@@ -25,6 +30,10 @@ export default function Chat() {
   const [loading, setLoading] = useState(true);
   const [editingId, setEditingId] = useState<string | null>(null);
   const [editText, setEditText] = useState('');
+  const [typingUsers, setTypingUsers] = useState<Record<string, { name: string; expires: number }>>({});
+  const lastTypingSent = useRef(0);
+  // Sent messages the server has not acknowledged yet, by client message id
+  const pendingSends = useRef(new Map<string, string>());
   const messagesEndRef = useRef<HTMLDivElement>(null);
 
   // Redirect to login if not authenticated
@@ -64,12 +73,16 @@ export default function Chat() {
     if (!user?.id) return;
     
     console.log('Connecting to Socket.IO with user ID:', user.id);
-    const socketInstance = createChatSocket(user.id);
+    const socketInstance = createChatSocket();
     setSocket(socketInstance);
 
     socketInstance.on('connect', () => {
       console.log('Socket.IO connected successfully');
       setIsConnected(true);
+      // Retry sends that were cut off by a reconnect; the server drops repeats
+      pendingSends.current.forEach((pendingText, clientId) => {
+        sendChatMessage(socketInstance, pendingText, clientId, () => pendingSends.current.delete(clientId));
+      });
     });
 
     socketInstance.on('disconnect', (reason) => {
@@ -86,30 +99,69 @@ export default function Chat() {
       console.log('Chat connection confirmed:', data);
     });
 
-    socketInstance.on('message', (msg: Message) => {
-      console.log('Received message:', msg);
-      setMsgs((prev) => {
-        // Prevent duplicates by checking message ID
-        if (msg.id && prev.some(m => m.id === msg.id)) {
-          return prev;
+    const handlers: Record<string, (data: any) => void> = {
+      message: (msg: Message) => {
+        console.log('Received message:', msg);
+        // This page shows the general room; cohort and group rooms arrive with a room_id
+        if (msg.room_id) return;
+        setMsgs((prev) => {
+          // Prevent duplicates by checking message ID
+          if (msg.id && prev.some(m => m.id === msg.id)) {
+            return prev;
+          }
+          return [...prev, msg];
+        });
+      },
+      message_updated: (msg: Message) => {
+        console.log('Message updated:', msg);
+        setMsgs((prev) => prev.map(m => m.id === msg.id ? msg : m));
+      },
+      message_deleted: (data: { id: string }) => {
+        console.log('Message deleted:', data.id);
+        setMsgs((prev) => prev.filter(m => m.id !== data.id));
+      },
+      messages_cleared: () => {
+        console.log('All messages cleared');
+        setMsgs([]);
+      },
+      typing: (data: { room_id?: string | null; user_id: string; name: string; typing: boolean }) => {
+        if (data.room_id || data.user_id === user?.id) return;
+        setTypingUsers((prev) => {
+          const next = { ...prev };
+          if (data.typing) {
+            next[data.user_id] = { name: data.name, expires: Date.now() + TYPING_EXPIRY_MS };
+          } else {
+            delete next[data.user_id];
+          }
+          return next;
+        });
+      },
+    };
+
+    // Edit/delete/clear events are relayed at least once and carry a sequence number;
+    // drop any we have already applied (a repeated clear would wipe newer messages)
+    const seenSeqs = new Set<number>();
+    Object.entries(handlers).forEach(([event, handler]) => {
+      handlers[event] = (data: any) => {
+        if (typeof data?.seq === 'number') {
+          if (seenSeqs.has(data.seq)) return;
+          seenSeqs.add(data.seq);
+          if (seenSeqs.size > 1000) seenSeqs.delete(seenSeqs.values().next().value as number);
         }
-        return [...prev, msg];
-      });
+        handler(data);
+      };
     });
 
-    socketInstance.on('message_updated', (msg: Message) => {
-      console.log('Message updated:', msg);
-      setMsgs((prev) => prev.map(m => m.id === msg.id ? msg : m));
-    });
+    Object.entries(handlers).forEach(([event, handler]) => socketInstance.on(event, handler));
 
-    socketInstance.on('message_deleted', (data: { id: string }) => {
-      console.log('Message deleted:', data.id);
-      setMsgs((prev) => prev.filter(m => m.id !== data.id));
+    // The server may coalesce several events into one batch; replay them in order
+    socketInstance.on('message_batch', (batch: { event: string; data: any }[]) => {
+      batch.forEach(({ event, data }) => handlers[event]?.(data));
     });
 
-    socketInstance.on('messages_cleared', () => {
-      console.log('All messages cleared');
-      setMsgs([]);
+    socketInstance.on('rate_limited', (data: { message: string }) => {
+      console.warn('Chat rate limited:', data.message);
+      alert(data.message);
     });
 
     socketInstance.on('error', (error) => {
@@ -124,6 +176,31 @@ export default function Chat() {
     };
   }, [user]);
 
+  // Drop typing indicators whose sender went quiet
+  useEffect(() => {
+    const timer = setInterval(() => {
+      setTypingUsers((prev) => {
+        const now = Date.now();
+        const live = Object.entries(prev).filter(([, entry]) => entry.expires > now);
+        return live.length === Object.keys(prev).length ? prev : Object.fromEntries(live);
+      });
+    }, 1000);
+    return () => clearInterval(timer);
+  }, []);
+
+  function handleTextChange(value: string) {
+    setText(value);
+    if (!socket?.connected) return;
+    const now = Date.now();
+    if (!value.trim()) {
+      if (lastTypingSent.current) sendTyping(socket, false);
+      lastTypingSent.current = 0;
+    } else if (now - lastTypingSent.current >= TYPING_RESEND_MS) {
+      sendTyping(socket, true);
+      lastTypingSent.current = now;
+    }
+  }
+
   function send() {
     if (!isConnected || !socket) {
       alert('Chat connection not available. Please wait for the connection to be established.');
@@ -136,8 +213,11 @@ export default function Chat() {
     if (!text.trim()) return;
     
     try {
-      sendChatMessage(socket, text.trim());
+      const clientId = newClientMessageId();
+      pendingSends.current.set(clientId, text.trim());
+      sendChatMessage(socket, text.trim(), clientId, () => pendingSends.current.delete(clientId));
       setText('');
+      lastTypingSent.current = 0;
     } catch (err) {
       console.error('Error sending message:', err);
       alert('Failed to send message. Please try again.');
@@ -359,11 +439,17 @@ export default function Chat() {
             <div ref={messagesEndRef} />
           </div>
 
+          {Object.keys(typingUsers).length > 0 && (
+            <p style={{ color: '#666', fontSize: '13px', fontStyle: 'italic', margin: '0 0 6px' }}>
+              {Object.values(typingUsers).map((entry) => entry.name).join(', ')}
+              {Object.keys(typingUsers).length === 1 ? ' is typing…' : ' are typing…'}
+            </p>
+          )}
           <div style={{ display: 'flex', gap: '10px' }}>
             <input
               value={text}
               style={{ padding: '12px', flex: 1, border: `2px solid ${colors.black}`, borderRadius: '8px', fontSize: '16px' }}
-              onChange={(e) => setText(e.target.value)}
+              onChange={(e) => handleTextChange(e.target.value)}
               onKeyPress={handleKeyPress}
               placeholder="Type a message..."
               disabled={!isConnected}